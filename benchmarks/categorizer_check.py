@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Offline check of the local topic categorizer's labels and confidences.
+
+Rows the keyword classifier can decide must keep their label above the
+TopicCategorizer threshold. Rows made of generic words without a category
+specific term ("systems programming", "quantum computing") must fall below
+it, so they are sent to GPT-4. Exits with an error when a check fails:
+
+    python benchmarks/categorizer_check.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.topic_categorizer import KeywordTopicClassifier  # noqa: E402
+
+# topics -> label, or None when the row must go to the LLM
+CASES = {
+    "deep learning, pytorch, computer vision": "Machine Learning",
+    "postgres, query optimization": "Databases",
+    "react, node.js, css": "Web development",
+    "machine learning, databases": "Machine Learning, Databases",
+    "startups, kubernetes": "N/A",
+    "learning rust": "N/A",
+    "N/A": "N/A",
+    "systems programming": None,
+    "data visualization": None,
+    "quantum computing": None,
+    "pytorch, quantum computing": None,
+}
+
+
+def check(min_confidence):
+    failures = []
+    classified = KeywordTopicClassifier().classify(list(CASES))
+    for (topics, expected), label, confidence in zip(
+        CASES.items(), classified["label"], classified["confidence"]
+    ):
+        if expected is None:
+            passed = confidence < min_confidence
+            message = f"{topics!r} goes to the LLM (confidence {confidence:.2f})"
+        else:
+            passed = label == expected and confidence >= min_confidence
+            message = f"{topics!r} is {expected!r} locally (got {label!r}, confidence {confidence:.2f})"
+        print(f"{'ok  ' if passed else 'FAIL'} {message}")
+        if not passed:
+            failures.append(message)
+    return failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--min-confidence", type=float, default=0.6, help="threshold of TopicCategorizer")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    failures = check(args.min_confidence)
+    if failures:
+        print(f"{len(failures)} checks failed")
+        sys.exit(1)
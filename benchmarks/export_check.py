@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Offline check of the results export on tables shaped like EvaDB's SELECT * output.
+
+Exports a two-repo run (shared tables, each repo keeping only its own
+stargazers) and a batch-mode repo (tables without github_username) through
+results_store.export_tables with a stand-in cursor, then checks the partitions
+and the aggregate counts. Exits with an error when a check fails:
+
+    python benchmarks/export_check.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.results_store import export_tables, open_aggregates, read_results  # noqa: E402
+
+
+class TableCursor:
+    """Answers "SELECT * FROM table;" with a frame whose columns are prefixed with the lowercase table name, as EvaDB does."""
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def query(self, query):
+        table = query.split("FROM", 1)[1].strip().rstrip(";").strip()
+        rows_df = self.tables[table]
+        prefixed = rows_df.rename(columns=lambda column: f"{table.lower()}.{column}")
+        return type("Result", (), {"df": lambda self: prefixed})()
+
+
+def stage_tables(prefix, usernames, with_usernames=True):
+    """Details and insight tables of the users, with EvaDB row IDs."""
+    row_ids = list(range(1, len(usernames) + 1))
+    details = pd.DataFrame(
+        {
+            "_row_id": row_ids,
+            "user_name": [f"User {username}" for username in usernames],
+            "user_location": ["Berlin, Germany", "Bengaluru", "Paris"][: len(usernames)],
+            "user_repos": "",
+            "user_starred_repos": [f"{username}/lib|Python|200;org/popular|Python|5000" for username in usernames],
+        }
+    )
+    insights = pd.DataFrame(
+        {
+            "_row_id": row_ids,
+            "name": [f"User {username}" for username in usernames],
+            "country": "N/A",
+            "city": "N/A",
+            "email": "N/A",
+            "occupation": "Engineer",
+            "programming_languages": "Python",
+            "topics_of_interest": "deep learning, postgres",
+            "social_media": "N/A",
+        }
+    )
+    gpt4 = insights.drop(columns=["topics_of_interest"]).assign(response="Machine Learning, Databases")
+    tables = {"StargazerDetails": details, "StargazerInsights": insights, "StargazerInsightsGPT4": gpt4}
+    if with_usernames:
+        tables = {name: table.assign(github_username=usernames) for name, table in tables.items()}
+    return {f"{prefix}_{name}": table for name, table in tables.items()}
+
+
+def check(results_dir):
+    failures = []
+
+    def expect(condition, message):
+        print(f"{'ok  ' if condition else 'FAIL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    stargazers = {"repo_a": ["alice", "bob"], "repo_b": ["bob", "carol"]}
+    shared = TableCursor(stage_tables("AllRepos", ["alice", "bob", "carol"]))
+    for repo, usernames in stargazers.items():
+        export_tables(shared, "AllRepos", repo, set(usernames), results_dir=results_dir)
+    batch = TableCursor(stage_tables("repo_c", ["dave", "erin"], with_usernames=False))
+    export_tables(batch, "repo_c", "repo_c", results_dir=results_dir)
+
+    for dataset in ["details", "insights_gpt35", "insights_gpt4"]:
+        rows_df = read_results(dataset, results_dir=results_dir)
+        for repo, usernames in stargazers.items():
+            exported = sorted(rows_df.loc[rows_df["repo"] == repo, "github_username"])
+            expect(exported == sorted(usernames), f"{dataset} of {repo} has {exported}")
+        expect((rows_df["repo"] == "repo_c").sum() == 2, f"{dataset} of the batch-mode repo has 2 rows")
+
+    insights_df = read_results("insights_gpt35", repos=["repo_a"], results_dir=results_dir)
+    countries = dict(zip(insights_df["github_username"], insights_df["country"]))
+    expect(countries == {"alice": "Germany", "bob": "India"}, f"countries of repo_a from the profiles: {countries}")
+
+    aggregates = open_aggregates(results_dir)
+    try:
+        expect(aggregates.users("repo_b", "category") == 2, "aggregates of repo_b count 2 users")
+        expect(aggregates.users("repo_c", "category") == 2, "aggregates of the batch-mode repo count 2 rows")
+        starred = aggregates.counts("repo_a", "starred_repo").to_dict()
+        expect(starred.get("org/popular") == 2, f"starred repos of repo_a: {starred}")
+    finally:
+        aggregates.close()
+    return failures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results-dir", help="keep the exported datasets here instead of a temporary directory")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.results_dir:
+        failures = check(args.results_dir)
+    else:
+        with tempfile.TemporaryDirectory() as results_dir:
+            failures = check(results_dir)
+    if failures:
+        print(f"{len(failures)} checks failed")
+        sys.exit(1)
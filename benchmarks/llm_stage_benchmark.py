@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for the two LLM stages (GPT35 extraction via
+ChatGPT, GPT4 categorization via ChatGPTMultirow) against the local mock server.
+
+Reports rows/sec, requests/row and p50/p95/p99 call latency per stage and row count:
+
+    python benchmarks/llm_stage_benchmark.py --rows 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai_server import MockOpenAIServer  # noqa: E402
+from functions.chatgpt import ChatGPT  # noqa: E402
+from functions.chatgpt_batch import ChatGPTMultirow  # noqa: E402
+from utils.prompts import CATEGORIZATION_PROMPT, EXTRACTION_PROMPT  # noqa: E402
+
+_TOPIC_POOL = [
+    "deep learning", "computer vision", "pytorch", "postgres", "query optimization",
+    "react", "frontend", "vector databases", "kubernetes", "startups", "rust", "nlp",
+]
+
+
+def synthetic_profiles(num_rows, duplicate_rate, rng):
+    """Scraped profile texts; a duplicate_rate fraction repeats earlier rows."""
+    rows = []
+    for i in range(num_rows):
+        if rows and rng.random() < duplicate_rate:
+            rows.append(rng.choice(rows))
+            continue
+        topics = ", ".join(rng.sample(_TOPIC_POOL, 3))
+        rows.append(f"User {i}\nuser{i}\nWorks on {topics}\n{rng.randint(0, 5000)} followers")
+    return rows
+
+
+def synthetic_topics(num_rows, duplicate_rate, rng):
+    """topics_of_interest values; a duplicate_rate fraction repeats earlier rows."""
+    rows = []
+    for i in range(num_rows):
+        if rows and rng.random() < duplicate_rate:
+            rows.append(rng.choice(rows))
+            continue
+        rows.append(", ".join(rng.sample(_TOPIC_POOL, 3)) + f", project-{i}")
+    return rows
+
+
+def read_call_metrics(metrics_path):
+    if not os.path.exists(metrics_path):
+        return []
+    with open(metrics_path) as metrics_file:
+        return [json.loads(line) for line in metrics_file]
+
+
+def run_stage(build_function, prompt, contents, server, metrics_dir, label):
+    """
+    Builds the LLM function with build_function() once the metrics paths point into
+    metrics_dir; its telemetry reads them when the function is set up.
+    """
+    metrics_path = os.path.join(metrics_dir, f"{label}.jsonl")
+    os.environ["LLM_METRICS_PATH"] = metrics_path
+    os.environ["LLM_METRICS_PROM_PATH"] = os.path.join(metrics_dir, f"{label}_{{stage}}.prom")
+    function = build_function()
+
+    text_df = pd.DataFrame({"query": [prompt] * len(contents), "content": contents})
+    requests_before = server.requests
+    error = None
+    start = time.perf_counter()
+    try:
+        function.forward(text_df)
+    except Exception as e:
+        error = str(e)
+    wall = time.perf_counter() - start
+
+    calls = read_call_metrics(metrics_path)
+    latencies = [call["latency_s"] for call in calls] or [0.0]
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    requests = server.requests - requests_before
+    return {
+        "stage": label.split("_")[0],
+        "rows": len(contents),
+        "wall_s": round(wall, 3),
+        "rows_per_s": round(len(contents) / wall, 1),
+        "requests": requests,
+        "requests_per_row": round(requests / len(contents), 4),
+        "latency_p50_s": round(float(p50), 4),
+        "latency_p95_s": round(float(p95), 4),
+        "latency_p99_s": round(float(p99), 4),
+        "error": error,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--stages", nargs="+", default=["extraction", "categorization"])
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--latency-median-ms", type=float, default=2)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--misalign-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    server = MockOpenAIServer(
+        port=0,
+        latency_median=args.latency_median_ms / 1000,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        misalign_rate=args.misalign_rate,
+        seed=args.seed,
+    ).start()
+    os.environ["OPENAI_API_BASE"] = server.url
+    os.environ["OPENAI_KEY"] = "mock"
+    os.environ["OPENAI_THROTTLE_SECONDS"] = "0"
+
+    rng = random.Random(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        for num_rows in args.rows:
+            if "extraction" in args.stages:
+                results.append(
+                    run_stage(
+                        lambda: ChatGPT(model="gpt-3.5-turbo-16k"),
+                        EXTRACTION_PROMPT,
+                        synthetic_profiles(num_rows, args.duplicate_rate, rng),
+                        server,
+                        metrics_dir,
+                        f"extraction_{num_rows}",
+                    )
+                )
+            if "categorization" in args.stages:
+                results.append(
+                    run_stage(
+                        lambda: ChatGPTMultirow(model="gpt-4-0613"),
+                        CATEGORIZATION_PROMPT,
+                        synthetic_topics(num_rows, args.duplicate_rate, rng),
+                        server,
+                        metrics_dir,
+                        f"categorization_{num_rows}",
+                    )
+                )
+    server.stop()
+
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI chat completions endpoint.
+
+Answers deterministically in the formats the stargazer pipeline expects:
+the "name: ..." block parsed by StringToDataframe with the fields an extraction
+prompt lists (the category too for the fused prompts), and one category row per
+input row (separated by blank lines) for the GPT-4 categorization prompt. Latency, 429 rate limits with Retry-After and
+misaligned batch answers can be simulated.
+
+Point the LLM functions at it with:
+
+    OPENAI_API_BASE=http://127.0.0.1:8000/v1 OPENAI_KEY=mock python stargazers.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+_COUNTRIES = ["United States", "India", "China", "Germany", "United Kingdom", "Brazil", "N/A"]
+_CITIES = ["San Francisco", "Bangalore", "Beijing", "Berlin", "London", "Sao Paulo", "N/A"]
+_OCCUPATIONS = ["Software Engineer", "PhD student", "Data Scientist", "CTO", "N/A"]
+_LANGUAGES = ["Python", "Python, C++", "JavaScript", "Java, JavaScript", "N/A"]
+_TOPICS = [
+    "deep learning, computer vision, pytorch",
+    "postgres, query optimization, distributed databases",
+    "react, frontend, web applications",
+    "large language models, vector databases",
+    "startups, product management",
+    "N/A",
+]
+
+_EXTRACTION_FIELDS = [
+    "name", "country", "city", "email", "occupation", "programming_languages", "topics_of_interest", "social_media",
+]
+
+_CATEGORY_KEYWORDS = {
+    "Machine Learning": ["learning", "vision", "pytorch", "language model", "nlp", "ai"],
+    "Databases": ["database", "postgres", "sql", "query"],
+    "Web development": ["react", "frontend", "web", "javascript"],
+}
+
+
+def _pick(options, seed, salt):
+    digest = hashlib.md5(f"{salt}:{seed}".encode()).digest()
+    return options[digest[0] % len(options)]
+
+
+_FIELDS_REQUEST = re.compile(r"Extract the following fields from the text: ([\w, ]+)")
+
+
+def requested_fields(instructions):
+    """The field names an extraction prompt asks for, all 8 profile fields if it does not list them."""
+    found = _FIELDS_REQUEST.search(instructions)
+    if not found:
+        return list(_EXTRACTION_FIELDS)
+    return [field.strip() for field in found.group(1).split(",") if field.strip()]
+
+
+def extraction_answer(content, fields=None):
+    """Returns the "field: value" block of the requested fields (all 8 profile fields by default)."""
+    lines = [line for line in content.splitlines() if line.strip()]
+    topics = _pick(_TOPICS, content, "topics")
+    values = {
+        "name": lines[0].strip() if lines else "N/A",
+        "country": _pick(_COUNTRIES, content, "country"),
+        "city": _pick(_CITIES, content, "city"),
+        "email": "N/A",
+        "occupation": _pick(_OCCUPATIONS, content, "occupation"),
+        "programming_languages": _pick(_LANGUAGES, content, "languages"),
+        "topics_of_interest": topics,
+        "social_media": "N/A",
+        "category": categorize_row(topics),
+    }
+    return "\n".join(f"{field}: {values.get(field, 'N/A')}" for field in fields or _EXTRACTION_FIELDS)
+
+
+def categorize_row(row):
+    row = row.lower()
+    categories = [
+        category
+        for category, keywords in _CATEGORY_KEYWORDS.items()
+        if any(keyword in row for keyword in keywords)
+    ]
+    return ", ".join(categories) if categories else "N/A"
+
+
+def categorization_answer(content):
+    """Returns one category row per input row, rows separated by two new lines."""
+    return "\n\n".join(categorize_row(row) for row in content.split("\n\n"))
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class MockOpenAIServer:
+    """
+    Threaded HTTP server implementing POST /v1/chat/completions.
+
+    Arguments:
+        latency_median (float) : Median simulated latency in seconds (log-normal distribution).
+        latency_sigma (float) : Sigma of the log-normal latency distribution.
+        rate_limit_rate (float) : Probability of answering a request with 429 Too Many Requests.
+        retry_after (float) : Retry-After header value in seconds sent with 429 responses.
+        misalign_rate (float) : Probability of dropping or duplicating a row in a batch answer.
+        seed (int) : Seed for the simulated latency, rate limit and misalignment draws.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=8000,
+        latency_median=0.005,
+        latency_sigma=0.5,
+        rate_limit_rate=0.0,
+        retry_after=1.0,
+        misalign_rate=0.0,
+        seed=0,
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.misalign_rate = misalign_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.misaligned = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                status, body, headers = server.handle(request)
+                self._reply(status, body, headers)
+
+            def _reply(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _draw(self):
+        with self.lock:
+            self.requests += 1
+            latency = self.random.lognormvariate(0, self.latency_sigma) * self.latency_median
+            rate_limited = self.random.random() < self.rate_limit_rate
+            misaligned = self.random.random() < self.misalign_rate
+            if rate_limited:
+                self.rate_limited += 1
+            return latency, rate_limited, misaligned
+
+    def handle(self, request):
+        latency, rate_limited, misaligned = self._draw()
+        time.sleep(latency)
+        if rate_limited:
+            return (
+                429,
+                {
+                    "error": {
+                        "message": "Rate limit reached for requests",
+                        "type": "requests",
+                        "code": "rate_limit_exceeded",
+                    }
+                },
+                {"Retry-After": str(self.retry_after)},
+            )
+
+        messages = request.get("messages", [])
+        # the pipeline passes its instructions either as the system prompt or as the task
+        instructions = " ".join(m["content"] for m in messages)
+        context = next(
+            (
+                m["content"].replace("Here is some context : ", "", 1)
+                for m in messages
+                if m.get("role") == "user" and m["content"].startswith("Here is some context")
+            ),
+            "",
+        )
+
+        if "Categorize the topics" in instructions:
+            answer = categorization_answer(context)
+            if misaligned:
+                rows = answer.split("\n\n")
+                rows = rows[:-1] if len(rows) > 1 else rows + rows
+                answer = "\n\n".join(rows)
+                with self.lock:
+                    self.misaligned += 1
+        else:
+            answer = extraction_answer(context, requested_fields(instructions))
+
+        prompt_tokens = sum(_estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = _estimate_tokens(answer)
+        body = {
+            "id": f"chatcmpl-mock-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+        return 200, body, {}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-median-ms", type=float, default=5)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--misalign-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = MockOpenAIServer(
+        host=args.host,
+        port=args.port,
+        latency_median=args.latency_median_ms / 1000,
+        latency_sigma=args.latency_sigma,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        misalign_rate=args.misalign_rate,
+        seed=args.seed,
+    )
+    print(f"Mock OpenAI server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
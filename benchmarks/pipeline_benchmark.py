@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+End-to-end scaling benchmark of the streaming stargazer pipeline on synthetic data.
+
+For every size, serves that many synthetic stargazers (GitHub API and profile
+pages for the browser, benchmarks/synthetic_github.py) and canned LLM answers
+(benchmarks/mock_openai_server.py) locally, runs the full pipeline with
+`stargazers.py --streaming --profile` in a scratch directory, and appends the
+throughput of every stage, the peak memory and the wall time of the run to a
+JSON lines history:
+
+    python benchmarks/pipeline_benchmark.py --users 1000 10000 100000
+
+Record the current numbers as the baseline, then fail (exit code 1) when a later
+run is slower or bigger than the baseline by more than the tolerance, or when
+there is no baseline for its size and mode:
+
+    python benchmarks/pipeline_benchmark.py --users 1000 --save-baseline
+    python benchmarks/pipeline_benchmark.py --users 1000 --tolerance 0.2
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.mock_openai_server import MockOpenAIServer  # noqa: E402
+from benchmarks.synthetic_github import SyntheticGitHub  # noqa: E402
+
+HISTORY_PATH = os.path.join(REPO_DIR, "benchmarks", "pipeline_history.jsonl")
+BASELINE_PATH = os.path.join(REPO_DIR, "benchmarks", "pipeline_baseline.json")
+# What stargazers.py needs in its working directory: itself and the function implementations
+_RUN_FILES = ["stargazers.py", "functions", "utils"]
+
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=REPO_DIR)
+    return result.stdout.strip() or None
+
+
+def run_pipeline(workdir, env, args, log_path):
+    """
+    Runs the streaming pipeline in workdir and returns (exit code, wall seconds,
+    peak RSS in MB of the pipeline process and its waited-for children).
+    """
+    command = [
+        sys.executable, "stargazers.py", "--streaming", "--profile", "--profile-timings-only",
+        "--details-workers", str(args.details_workers), "--scrape-workers", str(args.scrape_workers),
+    ] + (["--fused"] if args.fused else [])
+    start = time.perf_counter()
+    with open(log_path, "w") as log_file:
+        process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+        # wait4 rather than wait: the resource usage of this child only, not of earlier runs
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - start
+    # ru_maxrss is in kilobytes on Linux
+    return process.returncode, wall, usage.ru_maxrss / 1024
+
+
+def read_report(workdir):
+    """The profile report of the run in workdir, or None when it did not write one."""
+    reports = sorted(glob.glob(os.path.join(workdir, "results", "profile", "*", "report.json")))
+    if not reports:
+        return None
+    with open(reports[-1]) as report_file:
+        return json.load(report_file)
+
+
+def summarize(num_users, exit_code, wall, peak_rss_mb, report, args):
+    """One history record: totals, the phases of the run and the throughput of every streaming stage."""
+    report = report or {}
+    streaming = report.get("streaming", {})
+    stages = {}
+    for stats in streaming.get("stages", []):
+        busy = stats["busy_s"]
+        stages[stats["stage"]] = {
+            "items": stats["items"],
+            "failed": stats["failed"],
+            "busy_s": busy,
+            # per worker, so the number does not depend on the other stages
+            "rows_per_s": round(stats["items"] / busy, 2) if busy > 0 else None,
+            "input_wait_s": stats["input_wait_s"],
+            "output_wait_s": stats["output_wait_s"],
+        }
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "users": num_users,
+        "mode": "fused" if args.fused else "two-step",
+        "exit_code": exit_code,
+        "wall_s": round(wall, 2),
+        "users_per_s": round(num_users / wall, 2),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "streaming_wall_s": round(streaming.get("wall_s", 0.0), 2),
+        "phases": {name: round(stats["wall_s"], 2) for name, stats in report.get("stages", {}).items()},
+        "calls": {name: stats["calls"] for name, stats in report.get("calls", {}).items()},
+        "stages": stages,
+    }
+
+
+def benchmark(num_users, args):
+    """Runs the pipeline on num_users synthetic stargazers and returns its history record."""
+    github = SyntheticGitHub(num_users, port=0, latency_ms=args.github_latency_ms, seed=args.seed).start()
+    llm = MockOpenAIServer(port=0, latency_median=args.llm_latency_median_ms / 1000, seed=args.seed).start()
+    workdir = tempfile.mkdtemp(prefix=f"stargazers-{num_users}-")
+    try:
+        for name in _RUN_FILES:
+            os.symlink(os.path.join(REPO_DIR, name), os.path.join(workdir, name))
+        settings = {
+            "REPO_URL": f"https://github.com/{github.repo}",
+            "REPO_URLS": "",
+            "GITHUB_API": "",
+            "MAX_STARGAZERS": str(num_users),
+            "GITHUB_API_URL": github.url,
+            "GITHUB_WEB_URL": github.url,
+            "GITHUB_THROTTLE_SECONDS": "0",
+            "GITHUB_REQUEST_INTERVAL": "0",
+            "OPENAI_API_BASE": llm.url,
+            "OPENAI_KEY": "mock",
+            "OPENAI_THROTTLE_SECONDS": "0",
+        }
+        # stargazers.py exits without a .env; the same settings in the environment win over the user's
+        with open(os.path.join(workdir, ".env"), "w") as env_file:
+            env_file.writelines(f'{key}="{value}"\n' for key, value in settings.items())
+        env = {**os.environ, **settings}
+
+        log_path = os.path.join(args.logs, f"pipeline-{num_users}.log")
+        print(f"Running the pipeline on {num_users} synthetic stargazers (log: {log_path})")
+        exit_code, wall, peak_rss_mb = run_pipeline(workdir, env, args, log_path)
+        record = summarize(num_users, exit_code, wall, peak_rss_mb, read_report(workdir), args)
+        record["github_requests"] = dict(github.requests)
+        record["llm_requests"] = llm.requests
+        return record
+    finally:
+        github.stop()
+        llm.stop()
+        if args.keep_workdir:
+            print(f"Kept the run directory {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def regressions(record, baseline, tolerance):
+    """The metrics of a run worse than its baseline by more than tolerance, as messages."""
+    found = []
+    limit = 1 + tolerance
+    for metric in ("wall_s", "peak_rss_mb"):
+        if baseline.get(metric) and record[metric] > baseline[metric] * limit:
+            found.append(f"{metric} {record[metric]} > {baseline[metric]} (baseline)")
+    for stage, stats in baseline.get("stages", {}).items():
+        current = record["stages"].get(stage, {}).get("rows_per_s")
+        if stats.get("rows_per_s") and (current is None or current * limit < stats["rows_per_s"]):
+            found.append(f"{stage} rows/s {current} < {stats['rows_per_s']} (baseline)")
+    return found
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--fused", action="store_true", help="run the fused extraction + categorization mode")
+    parser.add_argument("--details-workers", type=int, default=4)
+    parser.add_argument("--scrape-workers", type=int, default=4)
+    parser.add_argument("--github-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-latency-median-ms", type=float, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON lines file the runs are appended to")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON file of the reference run of every size")
+    parser.add_argument("--save-baseline", action="store_true", help="store these runs as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown or growth over the baseline")
+    parser.add_argument("--logs", default=tempfile.gettempdir(), help="directory of the pipeline logs")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the EvaDB data and results of the runs")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    records = []
+    for num_users in args.users:
+        record = benchmark(num_users, args)
+        records.append(record)
+        with open(args.history, "a") as history_file:
+            history_file.write(json.dumps(record) + "\n")
+
+    rows = [
+        {
+            "users": record["users"],
+            "mode": record["mode"],
+            "exit_code": record["exit_code"],
+            "wall_s": record["wall_s"],
+            "users_per_s": record["users_per_s"],
+            "peak_rss_mb": record["peak_rss_mb"],
+            **{f"{stage}_rows_per_s": stats["rows_per_s"] for stage, stats in record["stages"].items()},
+        }
+        for record in records
+    ]
+    print(pd.DataFrame(rows).to_string(index=False))
+    print(f"Appended {len(records)} runs to {args.history}")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baselines = json.load(baseline_file)
+
+    failed = [record for record in records if record["exit_code"] != 0]
+    if args.save_baseline:
+        if failed:
+            print("Not saving the baseline, some runs failed")
+        else:
+            baselines.update({f"{record['mode']}-{record['users']}": record for record in records})
+            with open(args.baseline, "w") as baseline_file:
+                json.dump(baselines, baseline_file, indent=2)
+            print(f"Saved the baseline of {len(records)} runs to {args.baseline}")
+
+    regressed = False
+    for record in failed:
+        print(f"{record['users']} users: the pipeline exited with code {record['exit_code']}")
+        regressed = True
+    if not args.save_baseline:
+        for record in records:
+            baseline = baselines.get(f"{record['mode']}-{record['users']}")
+            if baseline is None:
+                # without a baseline there is nothing to compare against, which must not pass as "no regression"
+                print(
+                    f"{record['users']} users: no {record['mode']} baseline in {args.baseline}, "
+                    "record one with --save-baseline"
+                )
+                regressed = True
+                continue
+            for message in regressions(record, baseline, args.tolerance):
+                print(f"{record['users']} users: regression, {message}")
+                regressed = True
+    if regressed:
+        sys.exit(1)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Startup time benchmark: import time of stargazers.py and every function module,
+each measured in a fresh interpreter, plus the wall time of optional commands.
+
+A no-op or incremental run (all tables and functions already in EvaDB) should
+start in about a second:
+
+    python benchmarks/startup_benchmark.py --command "python stargazers.py" --max-seconds 1.5
+"""
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "evadb",
+    "functions.github_stargazers",
+    "functions.github_user_details",
+    "functions.webpage_text_extractor",
+    "functions.text_compactor",
+    "functions.chatgpt",
+    "functions.chatgpt_batch",
+    "functions.topic_categorizer",
+    "functions.string_to_dataframe",
+    "utils.stargazer_stages",
+]
+
+_IMPORT_SNIPPET = (
+    "import sys, time; sys.path.insert(0, {repo!r}); start = time.perf_counter(); "
+    "import {module}; print(time.perf_counter() - start)"
+)
+
+
+def time_import(module, repeat):
+    """Median import time of a module in fresh interpreters, or the error of the last attempt."""
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SNIPPET.format(repo=REPO_DIR, module=module)],
+            capture_output=True,
+            text=True,
+            cwd=REPO_DIR,
+        )
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings), None
+
+
+def time_command(command, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run(shlex.split(command), capture_output=True, text=True, cwd=REPO_DIR)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return statistics.median(timings), f"exit code {result.returncode}"
+    return statistics.median(timings), None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--command", action="append", default=[], help="command to time, e.g. a no-op run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, help="exit with an error if a command is slower")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    results = []
+    for module in args.modules:
+        seconds, error = time_import(module, args.repeat)
+        results.append({"kind": "import", "target": module, "seconds": seconds, "error": error})
+    for command in args.command:
+        seconds, error = time_command(command, args.repeat)
+        results.append({"kind": "command", "target": command, "seconds": seconds, "error": error})
+
+    for result in results:
+        seconds = "-" if result["seconds"] is None else f"{result['seconds']:.3f}s"
+        error = f"  ({result['error']})" if result["error"] else ""
+        print(f"{result['kind']:<8} {result['target']:<40} {seconds:>9}{error}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    slow = [
+        result
+        for result in results
+        if result["kind"] == "command"
+        and args.max_seconds is not None
+        and result["seconds"] > args.max_seconds
+    ]
+    if slow:
+        print(f"{len(slow)} commands took longer than {args.max_seconds}s")
+        sys.exit(1)
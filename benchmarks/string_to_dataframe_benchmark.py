@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compares the vectorized StringToDataframe parser with the original row loop
+(iterrows + split on ":") on synthetic GPT-3.5 responses:
+
+    python benchmarks/string_to_dataframe_benchmark.py --rows 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai_server import extraction_answer  # noqa: E402
+from functions.string_to_dataframe import _OUTPUT_COLUMNS, parse_responses  # noqa: E402
+
+
+def row_loop_parse(input_df):
+    """The original StringToDataframe.forward, kept as the baseline."""
+    keys_list = []
+    values_list = []
+    for _, row in input_df.iterrows():
+        lines = row["response"].strip().split("\n")
+        keys = []
+        values = []
+        for line in lines:
+            parts = line.split(":")
+            if len(parts) == 2:
+                keys.append(parts[0].strip())
+                values.append(parts[1].strip())
+            if len(parts) > 2:
+                keys.append(parts[0].strip())
+                values.append("".join(parts[i].strip() for i in range(1, len(parts))))
+        keys_list.append(keys)
+        values_list.append(values)
+    return pd.DataFrame(values_list, columns=keys_list[0])
+
+
+def synthetic_responses(num_rows):
+    """One mock GPT-3.5 answer per synthetic user; names are unique, other fields repeat."""
+    return [extraction_answer(f"User {i}\nuser{i}") for i in range(num_rows)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = []
+    for num_rows in args.rows:
+        input_df = pd.DataFrame({"response": synthetic_responses(num_rows)})
+
+        start = time.perf_counter()
+        row_loop_parse(input_df)
+        row_loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parse_responses(input_df["response"], _OUTPUT_COLUMNS)
+        vectorized = time.perf_counter() - start
+
+        results.append(
+            {
+                "rows": num_rows,
+                "row_loop_s": round(row_loop, 3),
+                "vectorized_s": round(vectorized, 3),
+                "speedup": round(row_loop / vectorized, 1),
+                "vectorized_rows_per_s": round(num_rows / vectorized),
+            }
+        )
+    print(pd.DataFrame(results).to_string(index=False))
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the GitHub API and profile pages, with synthetic stargazers.
+
+Serves one repo (synthetic/project by default) starred by num_users generated
+users through the endpoints PyGithub calls for the stargazer pipeline, and a
+rendered profile page per user with the h-card and user-profile-frame blocks
+the browser screenshots:
+
+    GET /repos/{owner}/{name}                 the repo
+    GET /repos/{owner}/{name}/stargazers      pages of stargazers (page, per_page)
+    GET /users/{login}                        the profile
+    GET /users/{login}/repos                  their own repos
+    GET /users/{login}/starred                the repos they starred
+    GET /{login}                              the HTML profile page
+
+Every user is derived from the seed and their number on request, so any number
+of users is served without holding them in memory. Users have a persona
+(machine learning, databases, web, other) driving their bio, languages and
+starred repos, so the topics, locations and co-stars have realistic structure.
+
+Point the pipeline at it with:
+
+    GITHUB_API_URL=http://127.0.0.1:8001 GITHUB_WEB_URL=http://127.0.0.1:8001 GITHUB_THROTTLE_SECONDS=0 \\
+        REPO_URL=https://github.com/synthetic/project python stargazers.py --streaming
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_FIRST_NAMES = ["Ana", "Wei", "Priya", "Lukas", "Sofia", "Kenji", "Omar", "Emma", "Rahul", "Chloe", "Mateus", "Yuki"]
+_LAST_NAMES = ["Silva", "Chen", "Sharma", "Müller", "Rossi", "Tanaka", "Haddad", "Smith", "Gupta", "Martin", "Kim"]
+# free-text locations as users write them, a few the gazetteer cannot resolve
+_LOCATIONS = [
+    "Berlin, Germany", "San Francisco, CA", "SF Bay Area", "Bengaluru", "Bangalore, India", "Beijing, China",
+    "London, UK", "São Paulo, Brazil", "New York", "Toronto, Canada", "Paris", "Tokyo, Japan", "Atlanta, GA",
+    "Seattle, WA", "Shanghai", "Zürich, Switzerland", "Earth", "localhost", "", "",
+]
+_OCCUPATIONS = ["Software Engineer", "PhD student", "Data Scientist", "CTO", "Backend developer", "Researcher"]
+
+# persona: (share of users, bio topics, own repo languages, starred repo prefix)
+_PERSONAS = {
+    "ml": (0.35, ["deep learning", "computer vision", "pytorch", "large language models", "nlp"], ["Python", "C++"]),
+    "db": (0.25, ["postgres", "query optimization", "distributed databases", "vector databases"], ["C++", "Java"]),
+    "web": (0.25, ["react", "frontend", "web applications", "node.js", "design systems"], ["JavaScript"]),
+    "other": (0.15, ["startups", "product management", "open source", "devops"], ["Go", "Rust", ""]),
+}
+_POPULAR_REPOS_PER_PERSONA = 200
+_PAGE_SIZE = 30
+
+
+def _persona(rng):
+    draw = rng.random()
+    for persona, (share, _, _) in _PERSONAS.items():
+        if draw < share:
+            return persona
+        draw -= share
+    return "other"
+
+
+def _popular_repo(persona, rank):
+    """A starred repo of a persona; lower ranks are starred by more users."""
+    topics = _PERSONAS[persona][1]
+    languages = [language for language in _PERSONAS[persona][2] if language] or ["Python"]
+    return {
+        "full_name": f"{persona}-org{rank % 17}/{topics[rank % len(topics)].replace(' ', '-')}-{rank}",
+        "language": languages[rank % len(languages)],
+        "stargazers_count": 100_000 // (rank + 1) + 100,
+        "fork": False,
+    }
+
+
+def _endpoint(parts):
+    """Name of the endpoint of a request path, for the request counts: "repos/stargazers", "users/starred", "page"."""
+    if parts[:1] in (["repos"], ["users"]):
+        skip = 3 if parts[0] == "repos" else 2
+        return "/".join([parts[0]] + parts[skip:])
+    return "page"
+
+
+class SyntheticGitHub:
+    """
+    Threaded HTTP server implementing the GitHub endpoints and profile pages above.
+
+    Arguments:
+        num_users (int) : Number of stargazers of the repo.
+        repo (str) : Full name (owner/name) of the starred repo.
+        latency_ms (float) : Simulated latency of every API request in milliseconds.
+        seed (int) : Seed of the generated users.
+    """
+
+    def __init__(self, num_users, host="127.0.0.1", port=8001, repo="synthetic/project", latency_ms=0.0, seed=0):
+        self.num_users = num_users
+        self.repo = repo
+        self.latency = latency_ms / 1000
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.requests = {}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                status, body, headers = server.handle(url.path, query)
+                if isinstance(body, str):
+                    payload, content_type = body.encode(), "text/html; charset=utf-8"
+                else:
+                    payload, content_type = json.dumps(body).encode(), "application/json; charset=utf-8"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def login(self, number):
+        return f"stargazer{number:07d}"
+
+    def _number(self, login):
+        """The number of a generated user, or None for an unknown login."""
+        if not login.startswith("stargazer") or not login[len("stargazer"):].isdigit():
+            return None
+        number = int(login[len("stargazer"):])
+        return number if number < self.num_users else None
+
+    def user(self, number):
+        """The generated profile of a user: the API fields plus persona, topics, repos and starred repos."""
+        rng = random.Random(f"{self.seed}:{number}")
+        login = self.login(number)
+        persona = _persona(rng)
+        _, topics, languages = _PERSONAS[persona]
+        name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}" if rng.random() < 0.8 else None
+        occupation = rng.choice(_OCCUPATIONS)
+        user_topics = rng.sample(topics, 3)
+        bio = f"{occupation} working on {', '.join(user_topics)}" if rng.random() < 0.7 else None
+
+        repos = []
+        for index in range(rng.randint(0, 4)):
+            repos.append(
+                {
+                    "full_name": f"{login}/{user_topics[index % 3].replace(' ', '-')}-{index}",
+                    "language": rng.choice(languages) or None,
+                    "stargazers_count": int(rng.paretovariate(1.2)) * 3,
+                    "fork": rng.random() < 0.2,
+                }
+            )
+        # a Zipf-like pick of the popular repos of the persona, and some of the others
+        starred = {}
+        num_starred = rng.randint(3, 15)
+        while len(starred) < num_starred:
+            other = rng.random() < 0.15
+            repo = _popular_repo(
+                rng.choice(list(_PERSONAS)) if other else persona,
+                min(int(rng.paretovariate(0.8)) - 1, _POPULAR_REPOS_PER_PERSONA - 1),
+            )
+            starred[repo["full_name"]] = repo
+
+        return {
+            "login": login,
+            "id": 1_000_000 + number,
+            "name": name,
+            "company": f"@{rng.choice(['acme', 'initech', 'umbrella', 'hooli'])}" if rng.random() < 0.4 else None,
+            "blog": f"https://{login}.dev" if rng.random() < 0.3 else "",
+            "location": rng.choice(_LOCATIONS) or None,
+            "email": f"{login}@example.com" if rng.random() < 0.25 else None,
+            "bio": bio,
+            "twitter_username": login if rng.random() < 0.2 else None,
+            "followers": int(rng.paretovariate(1.1)),
+            "following": rng.randint(0, 200),
+            "public_repos": len(repos),
+            "updated_at": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z",
+            "persona": persona,
+            "occupation": occupation,
+            "topics": user_topics,
+            "repos": repos,
+            "starred": list(starred.values()),
+        }
+
+    def _user_json(self, user):
+        fields = ["login", "id", "name", "company", "blog", "location", "email", "bio", "twitter_username",
+                  "followers", "following", "public_repos", "updated_at"]
+        return {
+            **{field: user[field] for field in fields},
+            "type": "User",
+            "url": f"{self.url}/users/{user['login']}",
+            "html_url": f"{self.url}/{user['login']}",
+        }
+
+    def _repo_json(self, repo):
+        owner, name = repo["full_name"].split("/")
+        return {
+            "id": zlib.crc32(repo["full_name"].encode()),
+            "name": name,
+            "full_name": repo["full_name"],
+            "owner": {"login": owner, "type": "User", "url": f"{self.url}/users/{owner}"},
+            "language": repo["language"],
+            "stargazers_count": repo["stargazers_count"],
+            "fork": repo["fork"],
+            "url": f"{self.url}/repos/{repo['full_name']}",
+            "html_url": f"{self.url}/{repo['full_name']}",
+        }
+
+    def _page(self, items, path, query):
+        """One page of a list and the Link header PyGithub follows to the next one."""
+        page = max(int(query.get("page", 1)), 1)
+        per_page = min(int(query.get("per_page", _PAGE_SIZE)), 100)
+        start = (page - 1) * per_page
+        headers = {}
+        if start + per_page < len(items):
+            headers["Link"] = f'<{self.url}{path}?page={page + 1}&per_page={per_page}>; rel="next"'
+        return items[start : start + per_page], headers
+
+    def profile_page(self, user):
+        """The profile page, large print so the OCR reads it like a real one."""
+        escape = lambda value: html.escape(str(value)) if value else ""  # noqa: E731
+        card = [f"<h1>{escape(user['name'])}</h1>", f"<h2>{escape(user['login'])}</h2>", f"<p>{escape(user['bio'])}</p>"]
+        card += [f"<p>{escape(value)}</p>" for value in (user["company"], user["location"], user["blog"]) if value]
+        if user["twitter_username"]:
+            card.append(f"<p>@{escape(user['twitter_username'])}</p>")
+        card.append(f"<p>{user['followers']} followers · {user['following']} following</p>")
+        readme = [
+            f"<p>Hi, I am {escape(user['name'] or user['login'])}, {escape(user['occupation'])}.</p>",
+            f"<p>Interested in {escape(', '.join(user['topics']))}.</p>",
+        ]
+        readme += [
+            f"<p>{escape(repo['full_name'])} {escape(repo['language'])} {repo['stargazers_count']} stars</p>"
+            for repo in user["repos"]
+        ]
+        return (
+            "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            "<style>body{font-family:sans-serif;font-size:28px;display:flex;gap:40px;padding:40px}"
+            ".h-card{width:500px}#user-profile-frame{width:1100px}</style></head><body>"
+            f"<div class='h-card'>{''.join(card)}</div>"
+            f"<div id='user-profile-frame'>{''.join(readme)}</div>"
+            "</body></html>"
+        )
+
+    def handle(self, path, query):
+        time.sleep(self.latency)
+        parts = [part for part in path.split("/") if part]
+        with self.lock:
+            endpoint = _endpoint(parts)
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+        not_found = 404, {"message": "Not Found"}, {}
+        if parts[:1] == ["repos"] and "/".join(parts[1:3]) == self.repo:
+            if len(parts) == 3:
+                repo = {"full_name": self.repo, "language": "Python", "stargazers_count": self.num_users, "fork": False}
+                return 200, self._repo_json(repo), {}
+            if parts[3:] == ["stargazers"]:
+                numbers, headers = self._page(range(self.num_users), path, query)
+                stargazers = [
+                    {"login": self.login(number), "id": 1_000_000 + number, "type": "User",
+                     "url": f"{self.url}/users/{self.login(number)}"}
+                    for number in numbers
+                ]
+                return 200, stargazers, headers
+            return not_found
+
+        if parts[:1] == ["users"] and len(parts) >= 2:
+            number = self._number(parts[1])
+            if number is None:
+                return not_found
+            user = self.user(number)
+            if len(parts) == 2:
+                return 200, self._user_json(user), {}
+            if parts[2:] in (["repos"], ["starred"]):
+                repos, headers = self._page(user[parts[2]], path, query)
+                return 200, [self._repo_json(repo) for repo in repos], headers
+            return not_found
+
+        if len(parts) == 1:
+            number = self._number(parts[0])
+            if number is not None:
+                return 200, self.profile_page(self.user(number)), {}
+        return not_found
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repo", default="synthetic/project")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = SyntheticGitHub(
+        args.users, host=args.host, port=args.port, repo=args.repo, latency_ms=args.latency_ms, seed=args.seed
+    )
+    print(f"Synthetic GitHub with {args.users} stargazers of {args.repo} listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
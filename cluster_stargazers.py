@@ -0,0 +1,55 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from utils.clustering import ClusterIndex, build_index
+from utils.results_store import RESULTS_DIR
+
+pd.set_option("display.max_colwidth", None)
+pd.set_option("display.expand_frame_repr", False)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Segments of the stargazers and users like a given one")
+    parser.add_argument("--build", action="store_true", help="(re)build the index from the results datasets")
+    parser.add_argument("--repos", nargs="+", help="repo names to include when building; default: all")
+    parser.add_argument("--segments", type=int, default=12, help="number of segments")
+    parser.add_argument("--dims", type=int, default=64, help="dimensions of the user embeddings")
+    parser.add_argument("--lists", type=int, help="inverted lists of the index (default: 4 x sqrt(users))")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the sampling, SVD and k-means")
+    parser.add_argument("--like", help="print the users most similar to this GitHub username")
+    parser.add_argument("--segment", type=int, help="print the users of this segment")
+    parser.add_argument("-k", type=int, default=10, help="number of similar users")
+    parser.add_argument("--nprobe", type=int, default=8, help="inverted lists searched per query")
+    args = parser.parse_args()
+
+    index_dir = os.path.join(RESULTS_DIR, "clusters")
+    if args.build or not os.path.exists(os.path.join(index_dir, "index.json")):
+        start = time.perf_counter()
+        index = build_index(
+            index_dir,
+            repos=args.repos,
+            num_segments=args.segments,
+            dims=args.dims,
+            num_lists=args.lists,
+            seed=args.seed,
+        )
+        print(f"Indexed {index.meta['users']} users in {time.perf_counter() - start:.1f}s -> {index_dir}")
+    else:
+        index = ClusterIndex(index_dir)
+
+    if args.like:
+        start = time.perf_counter()
+        similar = index.similar_users(args.like, k=args.k, nprobe=args.nprobe)
+        print(f"Users like {args.like} (segment {index.segment(args.like)}, "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms):")
+        print(similar.to_string())
+    elif args.segment is not None:
+        print("\n".join(index.members(args.segment)))
+    else:
+        segments = index.segments()
+        segments["terms"] = segments["terms"].map(", ".join)
+        print(segments.to_string())
@@ -18,7 +18,6 @@ import os
 import time
 
 import pandas as pd
-from retry import retry
 
 from evadb.catalog.catalog_type import NdArrayType
 from evadb.functions.abstract.abstract_function import AbstractFunction
@@ -27,9 +26,13 @@ from evadb.functions.decorators.io_descriptors.data_types import (
     PandasDataframe,
 )
 from evadb.utils.generic_utils import try_to_import_openai
-import tiktoken
 from tqdm import tqdm
 
+from utils.llm_inputs import fan_out, group_unique_inputs, print_dedup_summary
+from utils.llm_telemetry import BudgetExceededError, LLMTelemetry
+from utils.retry_policy import RetryPolicy
+from utils.text_compaction import token_encoding
+
 _VALID_CHAT_COMPLETION_MODEL = [
     "gpt-3.5-turbo",
     "gpt-3.5-turbo-16k",
@@ -42,6 +45,9 @@ class ChatGPTMultirow(AbstractFunction):
     Arguments:
         model (str) : ID of the OpenAI model to use. Refer to '_VALID_CHAT_COMPLETION_MODEL' for a list of supported models.
         temperature (float) : Sampling temperature to use in the model. Higher value results in a more random output.
+        empty_response (str) : Canned answer returned without a model call for empty or N/A content.
+        budget_usd (float) : Optional spend limit in USD over all the batches of this function. Defaults to the LLM_BUDGET_USD environment variable.
+        budget_tokens (int) : Optional token limit over all the batches of this function. Defaults to the LLM_BUDGET_TOKENS environment variable.
 
     Input Signatures:
         query (str)   : The task / question that the user wants the model to accomplish / respond.
@@ -86,12 +92,30 @@ class ChatGPTMultirow(AbstractFunction):
         self,
         model="gpt-3.5-turbo",
         temperature: float = 0,
+        empty_response: str = "N/A",
+        budget_usd: float = None,
+        budget_tokens: int = None,
     ) -> None:
         assert (
             model in _VALID_CHAT_COMPLETION_MODEL
         ), f"Unsupported ChatGPT {model}"
         self.model = model
         self.temperature = temperature
+        self.empty_response = empty_response
+        # one telemetry for every batch, so the budget and the metrics cover the whole stage
+        self.telemetry = LLMTelemetry(
+            stage=f"{self.name}-{self.model}",
+            model=self.model,
+            budget_usd=budget_usd,
+            budget_tokens=budget_tokens,
+        )
+        # shared backoff policy; rate limits pause every OpenAI caller in the process
+        self.retry_policy = RetryPolicy()
+        # only for the estimate printed before every call
+        self.encoding = token_encoding(self.model)
+        # counted over all forward() calls, so the throttle pauses after every 40 calls
+        # of the stage rather than at the start of every micro-batch
+        self.calls = 0
 
     @forward(
         input_signatures=[
@@ -119,12 +143,12 @@ class ChatGPTMultirow(AbstractFunction):
         try_to_import_openai()
         import openai
 
-        @retry(tries=6, delay=20)
-        def completion_with_backoff(**kwargs):
-            return openai.ChatCompletion.create(**kwargs)
+        # Pause between groups of requests to stay under the API rate limit
+        throttle_seconds = float(os.environ.get('OPENAI_THROTTLE_SECONDS', 30))
 
-        # Register API key
+        # Register API key and optional endpoint (e.g. a local mock server)
         openai.api_key = os.environ.get('OPENAI_KEY')
+        openai.api_base = os.environ.get('OPENAI_API_BASE', openai.api_base)
         assert len(openai.api_key) != 0, (
             "Please set your OpenAI API key in evadb.yml file (third_party,"
             " open_api_key) or environment variable (OPENAI_KEY)"
@@ -140,32 +164,30 @@ class ChatGPTMultirow(AbstractFunction):
         if len(text_df.columns) > 2:
             prompt = text_df.iloc[0, 2]
 
-        # openai api currently supports answers to a single prompt only
-        completion_tokens = 0
-        prompt_tokens = 0
+        # identical rows are sent to the model only once; the task query is
+        # shared by the whole batch, so rows are keyed on the first query
+        unique_inputs, positions = group_unique_inputs(
+            [queries[0]] * len(content), content
+        )
+        print_dedup_summary(len(positions), unique_inputs, positions)
 
-        # divide content into batches of 20
+        # divide content into batches of 10
         batch_size = 10
-        content = content.tolist()
+        content = [row for _, row in unique_inputs]
         content_batched = [
             content[i : i + batch_size] for i in range(0, len(content), batch_size)
         ]
 
         all_results = []
-        for i, batch in tqdm(enumerate(content_batched)):
-            if i % 40 == 0:
-                print(f"Completed {i} batches")
-                # Avoid hitting API limit
-                time.sleep(30)
+        for batch in tqdm(content_batched):
             all_content = ""
             for row in batch:
                 all_content += row
                 all_content += "\n\n"
 
             all_content = all_content[:-4]
-            encoding = tiktoken.encoding_for_model(self.model)
-            num_tokens = len(encoding.encode(all_content))
-            num_tokens += len(encoding.encode(queries[0]))
+            num_tokens = len(self.encoding.encode(all_content))
+            num_tokens += len(self.encoding.encode(queries[0]))
             print(f"Estimated input prompt tokens: {num_tokens}")
             params = {
                 "model": self.model,
@@ -194,44 +216,53 @@ class ChatGPTMultirow(AbstractFunction):
                 ],
             )
 
-            response = completion_with_backoff(**params)
+            if self.telemetry.budget_exhausted():
+                # the remaining rows are answered None, see below
+                print(self.telemetry.budget_message())
+                break
+            start = time.time()
+            response, retries = self.retry_policy.call(
+                openai.ChatCompletion.create, **params
+            )
+            latency = time.time() - start
+            # recorded before the answer is checked, a misaligned answer is paid for too
+            self.telemetry.record_call(
+                latency=latency,
+                prompt_tokens=response["usage"]["prompt_tokens"],
+                completion_tokens=response["usage"]["completion_tokens"],
+                retries=retries,
+                rows=len(batch),
+            )
+            self.calls += 1
             answer = response.choices[0].message.content
             results = answer.split("\n\n")
             if len(results) != len(batch):
+                self.telemetry.finish()
                 raise Exception(
                     f"WARNING: batch size is {len(batch)} but results are {len(results)}"
                 )
 
             all_results.extend(results)
 
-            completion_tokens += response["usage"]["completion_tokens"]
-            prompt_tokens += response["usage"]["prompt_tokens"]
+            if self.calls % 40 == 0:
+                print(f"Completed {self.calls} batches")
+                # Avoid hitting API limit
+                time.sleep(throttle_seconds)
 
-        if len(all_results) != len(queries):
+        if len(all_results) != len(unique_inputs) and not self.telemetry.budget_exhausted():
             raise Exception(
                 "Length of results and queries do not match, please improve your prompt"
             )
 
-        df = pd.DataFrame({"response": all_results})
-
-        print(f"Total tokens used: {completion_tokens + prompt_tokens}")
-        print(f"Completion tokens used: {completion_tokens}")
-        print(f"Prompt tokens used: {prompt_tokens}")
-        pricing = {
-            "gpt-3.5-turbo": {"prompt": 0.0015, "completion": 0.002},
-            "gpt-3.5-turbo-16k": {"prompt": 0.003, "completion": 0.004},
-            "gpt-4-0613": {"prompt": 0.03, "completion": 0.06},
-        }
-        print(
-            f"Prompt tokens price: ${pricing[self.model]['prompt'] * prompt_tokens/1000}"
-        )
-        print(
-            f"Completion tokens price: ${pricing[self.model]['completion'] * completion_tokens/1000}"
+        df = pd.DataFrame(
+            {"response": fan_out(all_results, positions, self.empty_response)}
         )
-        price = (
-            pricing[self.model]["prompt"] * prompt_tokens
-            + pricing[self.model]["completion"] * completion_tokens
-        ) / 1000
-        print(f"Total Price: ${price}")
+
+        self.telemetry.finish()
+
+        if df["response"].isna().any():
+            # unanswered rows must not be stored as answers; the caller keeps the
+            # paid answers from the error or, in a SQL query, stores nothing
+            raise BudgetExceededError(self.telemetry.budget_message(), df)
 
         return df
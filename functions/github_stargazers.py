@@ -1,12 +1,53 @@
+import itertools
+import os
+import time
+
 import pandas as pd
-from tqdm import tqdm
-from github import Github
 
 from evadb.catalog.catalog_type import NdArrayType, ColumnType
 from evadb.functions.abstract.abstract_function import AbstractFunction
 from evadb.functions.decorators.decorators import forward, setup
 from evadb.functions.decorators.io_descriptors.data_types import PandasDataframe
 
+from utils.github_client import github_client
+from utils.profiling import PROFILER
+
+# The sampling mode needs the full list of large repos
+MAX_STARGAZERS = int(os.environ.get("MAX_STARGAZERS", 1000))
+PAGE_SIZE = 100
+
+
+def iter_stargazers(repository, limit=MAX_STARGAZERS, newest_first=False):
+    """
+    Yields the logins of the stargazers of a PyGithub repository, one API page at a time.
+    With newest_first, the pages are read from the last one back and each page is
+    reversed, so the latest limit stargazers come first however many stars the repo has.
+    """
+    stargazers = repository.get_stargazers()
+    if newest_first:
+        page_numbers = range((repository.stargazers_count - 1) // PAGE_SIZE, -1, -1)
+    else:
+        page_numbers = itertools.count()
+    remaining = limit
+    for page_number in page_numbers:
+        if remaining <= 0:
+            return
+        start = time.perf_counter()
+        page = stargazers.get_page(page_number)
+        PROFILER.record("github.stargazers", time.perf_counter() - start)
+        if not page:
+            if newest_first:
+                # stargazers_count can run ahead of the list when users unstar
+                continue
+            return
+        logins = [stargazer.login for stargazer in page]
+        if newest_first:
+            logins.reverse()
+        yield logins[:remaining]
+        remaining -= len(logins)
+        if not newest_first and len(page) < PAGE_SIZE:
+            return
+
 
 class GithubStargazers(AbstractFunction):
     """
@@ -16,6 +57,8 @@ class GithubStargazers(AbstractFunction):
     Input Signatures:
         repo_url (str) : The URL of the GitHub repository to scrape stargazers from.
         github_token (str) : GitHub personal access token for authentication.
+        order (str) : Optional. "recent" lists the latest MAX_STARGAZERS stargazers,
+                      newest first; anything else the first ones, in star order.
 
     Output Signatures:
         stargazers (str) : A list of GitHub usernames who have starred the repository.
@@ -40,8 +83,8 @@ class GithubStargazers(AbstractFunction):
     @forward(
         input_signatures=[
             PandasDataframe(
-                columns=["repo_url", "github_token"],
-                column_types=[ColumnType.TEXT, ColumnType.TEXT],
+                columns=["repo_url", "github_token", "order"],
+                column_types=[ColumnType.TEXT, ColumnType.TEXT, ColumnType.TEXT],
                 column_shapes=[(1,), (1,), (1,)],
             )
         ],
@@ -61,13 +104,12 @@ class GithubStargazers(AbstractFunction):
         # Extract inputs from the DataFrame
         repo_url = input_df.iloc[0, 0]
         github_token = input_df.iloc[0, 1]
+        newest_first = input_df.shape[1] > 2 and input_df.iloc[0, 2] == "recent"
 
         # Initialize GitHub API client
-        if github_token:
-            github = Github(github_token)
-        else:
-            github = Github()
+        github = github_client(github_token, per_page=PAGE_SIZE)
 
+        stargazers = []
         try:
             # Parse the repository URL to extract owner and repo name
             parts = repo_url.strip("/").split("/")
@@ -76,8 +118,8 @@ class GithubStargazers(AbstractFunction):
 
             # Get the repository and its stargazers
             repository = github.get_repo(f"{owner}/{repo_name}")
-            stargazers = []
-            stargazers = [stargazer.login for stargazer in repository.get_stargazers()[:1000]]
+            for logins in iter_stargazers(repository, newest_first=newest_first):
+                stargazers.extend(logins)
 
         except Exception as e:
             print(f"Error: {str(e)}")
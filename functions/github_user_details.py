@@ -1,13 +1,100 @@
 import pandas as pd
-from github import Github
 import time
-import concurrent.futures
 
 from evadb.catalog.catalog_type import ColumnType
 from evadb.functions.abstract.abstract_function import AbstractFunction
 from evadb.functions.decorators.decorators import forward, setup
 from evadb.functions.decorators.io_descriptors.data_types import PandasDataframe
 
+from utils.github_client import GITHUB_THROTTLE_SECONDS, github_client
+from utils.profiling import PROFILER
+from utils.repo_lists import compact_repos, encode_repos
+
+CHUNK_SIZE = 100
+_DETAIL_COLUMNS = [
+    "user_name", "user_login",
+    "user_following", "user_followers",
+    "user_email",
+    "user_id",
+    "user_location", "user_bio",
+    "user_company", "user_blog", "user_url", "user_twitter_username",
+    "user_repos", "user_starred_repos",
+]
+
+
+def fetch_user_details(github, github_username):
+    """
+    Returns the profile of one user, with the 20 most starred of their own repos
+    (not forks, 10+ stars) and of the first 10 repos they starred (100+ stars) as
+    compact repo lists.
+    """
+    return user_details(github.get_user(github_username))
+
+
+def user_details(user):
+    """The details of fetch_user_details from a PyGithub user already fetched."""
+    start = time.perf_counter()
+    user_repos = compact_repos(
+        (repo for repo in user.get_repos() if repo.fork is False), min_stars=10
+    )
+    # only the first page of starred repos, as before
+    starred_repos = compact_repos(
+        (repo for index, repo in enumerate(user.get_starred()) if index < 10), min_stars=100
+    )
+    details = {
+        "user_name": user.name,
+        "user_login": user.login,
+        "user_following": user.following,
+        "user_followers": user.followers,
+        "user_email": user.email,
+        "user_id": user.id,
+        "user_location": user.location,
+        "user_bio": user.bio,
+        "user_company": user.company,
+        "user_blog": user.blog,
+        "user_url": user.url,
+        "user_twitter_username": user.twitter_username,
+        "user_repos": encode_repos(user_repos),
+        "user_starred_repos": encode_repos(starred_repos),
+    }
+    PROFILER.record("github.user_details", time.perf_counter() - start)
+    return details
+
+
+def iter_user_details(github, github_usernames, chunk_size=CHUNK_SIZE, throttle_every=10):
+    """
+    Yields the details of the users as DataFrames of up to chunk_size rows.
+
+    Sleeps GITHUB_THROTTLE_SECONDS per user, 30s every throttle_every users by
+    default, to stay below the API limit, and retries a user once after 5 minutes when the API call fails.
+    A user who fails twice gets a row of nulls, so every user has one row in input order.
+    """
+    rows = []
+    i = 0
+    for i, github_username in enumerate(github_usernames, start=1):
+        if i % throttle_every == 0:
+            print(f"Downloading details of user: {i}")
+            time.sleep(GITHUB_THROTTLE_SECONDS * throttle_every)
+
+        for attempt in range(2):
+            try:
+                rows.append(fetch_user_details(github, github_username))
+                break
+            except Exception as e:
+                print(f"Error: {str(e)}")
+                if attempt == 1:
+                    # a row of nulls keeps the output aligned with the input users
+                    rows.append(dict.fromkeys(_DETAIL_COLUMNS))
+                    break
+                # sleep for 5 minutes
+                time.sleep(300)
+
+        if len(rows) >= chunk_size:
+            yield pd.DataFrame(rows, columns=_DETAIL_COLUMNS)
+            rows = []
+    if rows or i == 0:
+        yield pd.DataFrame(rows, columns=_DETAIL_COLUMNS)
+
 
 class GithubUserDetails(AbstractFunction):
     """
@@ -31,8 +118,8 @@ class GithubUserDetails(AbstractFunction):
         user_blog (str) : The blog URL of the GitHub user.
         user_url (str) : The URL of the GitHub user's profile.
         user_twitter_username (str) : The Twitter username of the GitHub user.
-        user_repos (list) : A list of dictionaries representing the user's repositories with 10+ stars.
-        user_starred (list) : A list of dictionaries representing repositories starred by the user with 10+ stars.
+        user_repos (str) : The user's 20 most starred repositories with 10+ stars, most starred first, as "owner/name|language|stars;...".
+        user_starred (str) : Repositories starred by the user with 100+ stars, in the same format.
 
     Example Usage:
         You can use this function to retrieve details about a GitHub user as follows:
@@ -92,135 +179,18 @@ class GithubUserDetails(AbstractFunction):
         if input_df.empty or input_df.iloc[0, 0] is None:
             raise ValueError("GitHub username must be provided.")
 
-        # Extract inputs from the DataFrame
-        github_username = input_df.iloc[0, 0]
+        # Extract the token from the DataFrame, the usernames are read below
         github_token = input_df.iloc[0, 1]
 
         # Initialize GitHub API client
-        if github_token:
-            github = Github(github_token)
-        else:
-            github = Github()
-
-        # Create an empty list to store user details
-        user_details_list = []
-
-        # Define a function to fetch user details for a range of rows
-        def fetch_user_details_range(start_index, end_index):
-
-            # Process a range of rows from start_index to end_index
-            api_limit_error = False
-            i = 0
-            for index in range(start_index, end_index):
-                i = i + 1
-
-                # Avoid hitting API limit
-                if i != 0 and i % 10 == 0:
-                    print(f"Downloading details of user: {i}")
-                    time.sleep(30)
-
-                if api_limit_error == True:
-                    api_limit_error = False
-                    index = index - 1
-
-                github_username = input_df.iloc[index]["github_username"]
-
-                try:
-                    # Retrieve the user object
-                    user = github.get_user(github_username)
-
-                    # Gather user details into separate variables
-                    user_name = user.name
-                    user_login = user.login
-                    user_following = user.following
-                    user_followers = user.followers
-                    user_email = user.email
-                    user_id = user.id
-                    user_location = user.location
-                    user_bio = user.bio
-                    user_company = user.company
-                    user_blog = user.blog
-                    user_url = user.url
-                    user_twitter_username = user.twitter_username
-
-                    # Repos of user with 10+ stars
-                    user_repos =  user.get_repos()
-                    user_created_repos = []
-                    for repo in user_repos:
-                        if repo.fork is False:
-                            if repo.stargazers_count > 10:
-                                user_created_repos.append({
-                                    repo.name,
-                                    repo.description,
-                                    repo.html_url,
-                                    repo.language
-                                })
-
-                    # Repos starred by user with 10+ stars
-                    starred_repos = user.get_starred()
-                    user_starred_repos = []
-                    j = 0
-                    for repo in starred_repos:
-                        j = j + 1
-                        if j > 10:
-                            break
-                        if repo.stargazers_count > 100:
-                            user_starred_repos.append({
-                                repo.name,
-                                repo.description,
-                                repo.html_url,
-                                repo.language
-                            })
-
-                    # Gather user details into a dictionary
-                    user_details = {
-                        "user_name": user.name,
-                        "user_login": user.login,
-                        "user_following": user.following,
-                        "user_followers": user.followers,
-                        "user_email": user.email,
-                        "user_id": user.id,
-                        "user_location": user.location,
-                        "user_bio": user.bio,
-                        "user_company": user.company,
-                        "user_blog": user.blog,
-                        "user_url": user.url,
-                        "user_twitter_username": user.twitter_username,
-                        "user_repos": f"{user_created_repos}",
-                        "user_starred_repos": f"{user_starred_repos}"
-                    }
-
-                    # Append user details to the list
-                    user_details_list.append(user_details)
-
-                except Exception as e:
-                    print(f"Error: {str(e)}")
-                    api_limit_error = True
-                    # sleep for 5 minutes
-                    time.sleep(300)
-
-        num_workers = 1
-        num_rows = len(input_df)
-        rows_per_worker = num_rows // num_workers
-
-        print(f"Downloading details of {num_rows} users")
-
-        # Create a list of tuples defining the ranges for each worker
-        # Include any remaining rows in the last worker's range
-        worker_ranges = [
-            (i * rows_per_worker, (i + 1) * rows_per_worker) 
-            for i in range(num_workers)
-        ]
-        worker_ranges[-1] = (worker_ranges[-1][0], num_rows)
-
-        # Iterate over rows in the input DataFrame using ThreadPoolExecutor
-        with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
-            for start_index, end_index in worker_ranges:
-                executor.submit(
-                    fetch_user_details_range, start_index, end_index
-                )
-
-        # Create a DataFrame from the list of user details
-        user_details_df = pd.DataFrame(user_details_list)
-
-        return user_details_df
\ No newline at end of file
+        github = github_client(github_token)
+
+        print(f"Downloading details of {len(input_df)} users")
+
+        # EvaDB expects one frame per input batch, so the compact rows of the whole
+        # batch are held until it returns, as chunks and then concatenated. Only the
+        # PyGithub objects of a user are dropped as soon as their row is built; the
+        # streaming mode, which stores users as they come, is the one with flat memory.
+        chunks = iter_user_details(github, input_df["github_username"])
+        return pd.concat(list(chunks), ignore_index=True)
+
@@ -1,3 +1,6 @@
+import re
+
+import numpy as np
 import pandas as pd
 
 from evadb.catalog.catalog_type import ColumnType
@@ -5,6 +8,76 @@ from evadb.functions.abstract.abstract_function import AbstractFunction
 from evadb.functions.decorators.decorators import forward, setup
 from evadb.functions.decorators.io_descriptors.data_types import PandasDataframe
 
+
+_OUTPUT_COLUMNS = [
+    "name", "country", "city", "email",
+    "occupation",
+    "programming_languages",
+    "topics_of_interest",
+    "social_media",
+]
+
+
+# Field name spellings the model uses besides the column name itself
+_FIELD_ALIASES = {
+    "topic_of_interest": "topics_of_interest",
+    "topics": "topics_of_interest",
+    "programming_language": "programming_languages",
+    "languages": "programming_languages",
+    "social_media_links": "social_media",
+}
+
+# Separator line inserted between responses, never produced by the model
+_ROW_MARKER = "\x1e"
+_KEY_SEPARATORS = re.compile(r"[ _]+")
+
+
+def _parse_line(line, column_of):
+    """Returns the column index and value of a "field: value" line, or (-1, None)."""
+    key, separator, value = line.partition(":")
+    if not separator:
+        return -1, None
+    # only the first colon splits, so URLs in the value stay intact
+    key = _KEY_SEPARATORS.sub("_", key.strip(" \t*-#").lower())
+    column = column_of.get(_FIELD_ALIASES.get(key, key), -1)
+    return column, value.strip() or "N/A"
+
+
+def parse_responses(responses, columns):
+    """
+    Parses LLM responses made of "field: value" lines into a DataFrame with the
+    given columns. Fields are matched by name, so missing or reordered fields
+    never shift values into the wrong column; missing fields are filled with N/A.
+
+    All responses are split into lines in one pass and the lines are factorized,
+    so each distinct line ("email: N/A", "country: India", ...) is parsed once
+    and the values are scattered into the output array with numpy indexing.
+    """
+    responses = [r if isinstance(r, str) else "" for r in responses]
+    lines = (_ROW_MARKER + "\n" + ("\n" + _ROW_MARKER + "\n").join(responses)).split("\n")
+    codes, unique_lines = pd.factorize(np.array(lines, dtype=object))
+
+    column_of = {column: i for i, column in enumerate(columns)}
+    unique_columns = np.full(len(unique_lines), -1)
+    unique_values = np.empty(len(unique_lines), dtype=object)
+    for i, line in enumerate(unique_lines):
+        unique_columns[i], unique_values[i] = _parse_line(line, column_of)
+
+    # row of every line; each response starts with a marker line
+    marker_code = np.flatnonzero(unique_lines == _ROW_MARKER)[0]
+    rows = np.cumsum(codes == marker_code) - 1
+    line_columns = unique_columns[codes]
+
+    # scatter in reverse so the first occurrence of a repeated field wins
+    keep = np.flatnonzero(line_columns >= 0)[::-1]
+    values = np.full((len(responses), len(columns)), "N/A", dtype=object)
+    values[rows[keep], line_columns[keep]] = unique_values[codes[keep]]
+
+    output_dataframe = pd.DataFrame(values, columns=columns)
+
+    return output_dataframe
+
+
 class StringToDataframe(AbstractFunction):
     """
     Arguments:
@@ -56,41 +129,4 @@ class StringToDataframe(AbstractFunction):
         if input_df.empty or input_df.iloc[0] is None:
             raise ValueError("Input string must be provided.")
 
-        # Initialize lists for columns
-        keys_list = []
-        values_list = []
-
-        # Iterate over rows of the input DataFrame
-        for _, row in input_df.iterrows():
-            response = row["response"]
-
-            # Split the input string into lines
-            lines = response.strip().split("\n")
-
-            # Initialize lists for columns in this row
-            keys = []
-            values = []
-
-            # Parse the lines and extract key-value pairs
-            for line in lines:
-                parts = line.split(":")
-                if len(parts) == 2:
-                    key = parts[0].strip()
-                    value = parts[1].strip()
-                    keys.append(key)
-                    values.append(value)
-                if len(parts) > 2:
-                    key = parts[0].strip()
-                    # value = parts[1].strip() + parts[2].strip()
-                    value = [parts[i].strip() for i in range(1, len(parts))]
-                    value = "".join(value)
-                    keys.append(key)
-                    values.append(value)
-
-            keys_list.append(keys)
-            values_list.append(values)
-
-        # Create a DataFrame from the parsed data
-        output_dataframe = pd.DataFrame(values_list, columns=keys_list[0])
-
-        return output_dataframe
\ No newline at end of file
+        return parse_responses(input_df["response"], _OUTPUT_COLUMNS)
@@ -0,0 +1,57 @@
+from evadb.catalog.catalog_type import ColumnType
+from evadb.functions.abstract.abstract_function import AbstractFunction
+from evadb.functions.decorators.decorators import forward, setup
+from evadb.functions.decorators.io_descriptors.data_types import PandasDataframe
+
+from functions.string_to_dataframe import _OUTPUT_COLUMNS, parse_responses
+
+
+class StringToInsights(AbstractFunction):
+    """
+    Arguments:
+        None
+
+    Input Signatures:
+        input_string (str) : The response of the fused extraction and categorization prompt.
+
+    Output Signatures:
+        output_dataframe (DataFrame) : The 8 extracted profile fields plus the topic category.
+
+    Example Usage:
+        You can use this function to parse the answer of a single structured LLM call per user:
+
+        SELECT StringToInsights(GPTFused("{LLM_prompt}", compact_text))
+        FROM repo_StargazerCompactText;
+    """
+
+    @property
+    def name(self) -> str:
+        return "StringToInsights"
+
+    @setup(cacheable=False)
+    def setup(self) -> None:
+        # Any setup or initialization can be done here if needed
+        pass
+
+    @forward(
+        input_signatures=[
+            PandasDataframe(
+                columns=["extracted_text"],
+                column_types=[ColumnType.TEXT],
+                column_shapes=[(None,)],
+            )
+        ],
+        output_signatures=[
+            PandasDataframe(
+                columns=_OUTPUT_COLUMNS + ["category"],
+                column_types=[ColumnType.TEXT] * 9,
+                column_shapes=[(None,)] * 9,
+            )
+        ],
+    )
+    def forward(self, input_df):
+        # Ensure input is provided
+        if input_df.empty or input_df.iloc[0] is None:
+            raise ValueError("Input string must be provided.")
+
+        return parse_responses(input_df["response"], _OUTPUT_COLUMNS + ["category"])
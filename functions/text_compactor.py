@@ -0,0 +1,89 @@
+import pandas as pd
+
+from evadb.catalog.catalog_type import ColumnType
+from evadb.functions.abstract.abstract_function import AbstractFunction
+from evadb.functions.decorators.decorators import forward, setup
+from evadb.functions.decorators.io_descriptors.data_types import PandasDataframe
+
+from utils.text_compaction import compact_text, token_encoding
+
+
+class TextCompactor(AbstractFunction):
+    """
+    Arguments:
+        model (str) : ID of the OpenAI model whose tokenizer is used to count tokens.
+        max_tokens (int) : Token budget per row. Longer rows are truncated to this budget.
+
+    Input Signatures:
+        extracted_text (str) : The OCR text extracted from a GitHub user profile.
+
+    Output Signatures:
+        compact_text (str) : The text without GitHub UI boilerplate, duplicate fragments and excess whitespace,
+                             capped at the token budget.
+        original_tokens (int) : The number of tokens in the input text.
+        tokens_saved (int) : The number of prompt tokens saved for this row.
+
+    Example Usage:
+        You can use this function to shrink scraped profile text before sending it to an LLM:
+
+        CREATE TABLE repo_StargazerCompactText AS
+        SELECT github_username, TextCompactor(extracted_text)
+        FROM repo_StargazerScrapedDetails;
+    """
+
+    @property
+    def name(self) -> str:
+        return "TextCompactor"
+
+    @setup(cacheable=False, function_type="text-processing")
+    def setup(self, model="gpt-3.5-turbo", max_tokens=1000) -> None:
+        self.encoding = token_encoding(model)
+        self.max_tokens = int(max_tokens)
+
+    @forward(
+        input_signatures=[
+            PandasDataframe(
+                columns=["extracted_text"],
+                column_types=[ColumnType.TEXT],
+                column_shapes=[(None,)],
+            )
+        ],
+        output_signatures=[
+            PandasDataframe(
+                columns=["compact_text", "original_tokens", "tokens_saved"],
+                column_types=[ColumnType.TEXT, ColumnType.INTEGER, ColumnType.INTEGER],
+                column_shapes=[(None,), (None,), (None,)],
+            )
+        ],
+    )
+    def forward(self, input_df):
+        # Ensure input is provided
+        if input_df.empty:
+            raise ValueError("Extracted text must be provided.")
+
+        compact_rows = []
+        original_tokens = []
+        tokens_saved = []
+        for text in input_df.iloc[:, 0]:
+            compact, original, compact_tokens = compact_text(
+                text, self.encoding, self.max_tokens
+            )
+            compact_rows.append(compact)
+            original_tokens.append(original)
+            tokens_saved.append(original - compact_tokens)
+
+        total_original = sum(original_tokens)
+        total_saved = sum(tokens_saved)
+        print(
+            f"Compacted {len(compact_rows)} rows: {total_saved} of "
+            f"{total_original} prompt tokens saved"
+            + (f" ({100 * total_saved / total_original:.1f}%)" if total_original else "")
+        )
+
+        return pd.DataFrame(
+            {
+                "compact_text": compact_rows,
+                "original_tokens": original_tokens,
+                "tokens_saved": tokens_saved,
+            }
+        )
@@ -0,0 +1,84 @@
+import pandas as pd
+
+from evadb.catalog.catalog_type import NdArrayType
+from evadb.functions.abstract.abstract_function import AbstractFunction
+from evadb.functions.decorators.decorators import forward, setup
+from evadb.functions.decorators.io_descriptors.data_types import PandasDataframe
+
+from functions.chatgpt_batch import ChatGPTMultirow
+from utils.llm_telemetry import BudgetExceededError
+from utils.topic_categorizer import KeywordTopicClassifier
+
+
+class TopicCategorizer(AbstractFunction):
+    """
+    Arguments:
+        model (str) : ID of the OpenAI model used for rows the local classifier is not confident about.
+        min_confidence (float) : Rows whose local confidence (mean margin of the topic votes) is below this value are sent to the model.
+                                 Use 0 to never call the model, or a value above 1 to send every row to the model.
+        budget_usd (float) : Optional spend limit in USD of the model calls, see ChatGPTMultirow.
+        budget_tokens (int) : Optional token limit of the model calls, see ChatGPTMultirow.
+
+    Input Signatures:
+        query (str)   : The categorization task passed to the model for low-confidence rows.
+        content (str) : The topics_of_interest of a user.
+
+    Output Signatures:
+        response (str) : The categories of the topics (Machine Learning, Databases, Web development) or N/A.
+
+    Example Usage:
+        Categorize topics locally and only ask GPT-4 about rows with unfamiliar topics:
+
+        SELECT TopicCategorizer("{LLM_prompt}", topics_of_interest)
+        FROM repo_StargazerInsights;
+    """
+
+    @property
+    def name(self) -> str:
+        return "TopicCategorizer"
+
+    @setup(cacheable=False, function_type="chat-completion", batchable=True)
+    def setup(self, model="gpt-4-0613", min_confidence=0.6, budget_usd=None, budget_tokens=None) -> None:
+        self.model = model
+        self.min_confidence = float(min_confidence)
+        self.classifier = KeywordTopicClassifier()
+        self.llm = ChatGPTMultirow(model=model, budget_usd=budget_usd, budget_tokens=budget_tokens)
+
+    @forward(
+        input_signatures=[
+            PandasDataframe(
+                columns=["query", "content"],
+                column_types=[NdArrayType.STR, NdArrayType.STR],
+                column_shapes=[(1,), (1,)],
+            )
+        ],
+        output_signatures=[
+            PandasDataframe(
+                columns=["response"],
+                column_types=[NdArrayType.STR],
+                column_shapes=[(1,)],
+            )
+        ],
+    )
+    def forward(self, text_df):
+        text_df = text_df.reset_index(drop=True)
+        local = self.classifier.classify(text_df.iloc[:, 1])
+        responses = local["label"].copy()
+
+        uncertain = local["confidence"] < self.min_confidence
+        num_uncertain = int(uncertain.sum())
+        print(
+            f"Categorized {len(text_df) - num_uncertain} of {len(text_df)} rows locally, "
+            f"skipped the LLM call for them; sending {num_uncertain} low-confidence rows to {self.model}"
+        )
+
+        if num_uncertain > 0:
+            try:
+                llm_df = self.llm.forward(text_df[uncertain].reset_index(drop=True))
+            except BudgetExceededError as e:
+                # the local labels and the paid answers go along with the error
+                responses[uncertain] = e.responses["response"].to_numpy()
+                raise BudgetExceededError(str(e), pd.DataFrame({"response": responses})) from e
+            responses[uncertain] = llm_df["response"].to_numpy()
+
+        return pd.DataFrame({"response": responses})
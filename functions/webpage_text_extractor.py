@@ -1,7 +1,6 @@
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.common.by import By
 import concurrent.futures
+import itertools
+import threading
 import pandas as pd
 import time
 from evadb.catalog.catalog_type import ColumnType
@@ -9,23 +8,44 @@ from evadb.functions.abstract.abstract_function import AbstractFunction
 from evadb.functions.decorators.decorators import forward, setup
 from evadb.functions.decorators.io_descriptors.data_types import PandasDataframe
 
-import easyocr
 from tqdm import tqdm
 
+from utils.github_client import profile_page_url
+from utils.profiling import PROFILER
 
-reader = easyocr.Reader(["en"], gpu=True)
+
+# selenium, easyocr and the OCR model are loaded on first use, not at import,
+# so registering this function or running without scraping stays fast
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_reader():
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            import easyocr
+
+            _reader = easyocr.Reader(["en"], gpu=True)
+    return _reader
 
 
 def scrape_user_page(url):
+    from selenium import webdriver
+    from selenium.webdriver.firefox.options import Options as FirefoxOptions
+    from selenium.webdriver.common.by import By
+
+    reader = get_reader()
     try:
         options = FirefoxOptions()
         options.add_argument("--headless")
 
-        driver = webdriver.Firefox(options=options)
+        with PROFILER.timed("browser.page_load"):
+            driver = webdriver.Firefox(options=options)
 
-        driver.set_window_size(1920, 1080)
-        # Open the GitHub user page
-        driver.get(f"https://github.com/{url}")
+            driver.set_window_size(1920, 1080)
+            # Open the GitHub user page
+            driver.get(profile_page_url(url))
         # driver.execute_script("document.body.style.zoom='120%'")
 
         # Capture the user profile section
@@ -45,9 +65,11 @@ def scrape_user_page(url):
         for info_block in user_info_blocks:
             screenshot = info_block.screenshot_as_png
             # with torch.cuda.device(gpu_id):
-            result = reader.readtext(screenshot, detail=0)
+            with PROFILER.timed("ocr.readtext"):
+                result = reader.readtext(screenshot, detail=0)
+            # one OCR fragment per line, so later stages can tell fragments apart
             for i in result:
-                extracted_text += i + " "
+                extracted_text += i + "\n"
 
         return extracted_text
 
@@ -71,6 +93,23 @@ def extract_text_from_url(url):
     return extracted_text
 
 
+CHUNK_SIZE = 50
+
+
+def iter_extracted_text(urls, num_workers=1, chunk_size=CHUNK_SIZE):
+    """
+    Yields the text of the pages as DataFrames of up to chunk_size rows. Only
+    one chunk of pages is submitted to the workers at a time.
+    """
+    urls = iter(urls)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        while True:
+            chunk = list(itertools.islice(urls, chunk_size))
+            if not chunk:
+                return
+            yield pd.DataFrame({"extracted_text": list(executor.map(extract_text_from_url, chunk))})
+
+
 class WebPageTextExtractor(AbstractFunction):
     """
     Arguments:
@@ -137,16 +176,14 @@ class WebPageTextExtractor(AbstractFunction):
         print(f"Extracting text from {num_urls} URLs using {num_workers} workers")
 
         start = time.time()
-        extracted_text_lists = []
-        # Use ThreadPoolExecutor for concurrent processing
-        with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
-            # Submit tasks to extract text from each URL
-            extracted_text_lists = list(
-                tqdm(executor.map(extract_text_from_url, urls), total=num_urls)
-            )
+        with tqdm(total=num_urls) as progress:
+            chunks = []
+            for chunk_df in iter_extracted_text(urls, num_workers):
+                chunks.append(chunk_df)
+                progress.update(len(chunk_df))
 
         # Create a DataFrame from the extracted text
-        extracted_text_df = pd.DataFrame({"extracted_text": extracted_text_lists})
+        extracted_text_df = pd.concat(chunks, ignore_index=True)
         end = time.time()
         print("time taken: {:.2f}s".format(end - start))
         return extracted_text_df
@@ -1,9 +1,22 @@
 #!/usr/bin/env python3
 from dotenv import load_dotenv
+import argparse
+import json
 import os
+import time
 import pandas as pd
 import evadb
 
+from utils.prompts import CATEGORIZATION_PROMPT, EXTRACTION_PROMPT, FUSED_PROMPT
+from functions.github_stargazers import MAX_STARGAZERS
+from utils.function_registry import FunctionRegistry
+from utils.github_client import github_client
+from utils.llm_inputs import is_trivially_empty
+from utils.profiling import PROFILER
+from utils.sampling import StratifiedSample, estimate_shares, required_size
+from utils.sharded_run import DEFAULT_QUEUE_PATH, run_sharded, run_worker
+from utils.stargazer_stages import add_spend, budgets_exhausted, remaining_budgets, run_streaming
+
 pd.set_option("display.max_columns", None)  # Show all columns
 pd.set_option("display.expand_frame_repr", False)
 pd.set_option("display.max_colwidth", None)
@@ -17,44 +30,439 @@ if not load_dotenv():
 
 # REPO DETAILS
 repo_url = os.environ.get('REPO_URL')
+# Optional: several repos analyzed together, separated by commas or whitespace
+repo_urls = os.environ.get('REPO_URLS', '').replace(',', ' ').split() or [repo_url]
 github_pat = os.environ.get('GITHUB_API')
+# Token budget per profile for the scraped text sent to GPT-3.5
+prompt_token_budget = int(os.environ.get('PROMPT_TOKEN_BUDGET', 1000))
+# Topic rows the local categorizer recognizes less than this fraction of go to GPT-4
+categorizer_min_confidence = float(os.environ.get('CATEGORIZER_MIN_CONFIDENCE', 0.6))
+# Model answering the fused extraction + categorization prompt (--fused)
+fused_model = os.environ.get('FUSED_MODEL', 'gpt-3.5-turbo-16k')
+
+# Prefix of the tables shared by all repos of a multi-repo run
+shared_tables_name = os.environ.get('SHARED_TABLES_NAME', 'AllRepos')
+
+
+def repo_name_of(url):
+    # Parse the repository URL to extract owner and repo name
+    parts = url.strip("/").split("/")
+    return parts[-1]
 
-# Parse the repository URL to extract owner and repo name
-parts = repo_url.strip("/").split("/")
-repo_name = parts[-1]
+
+repo_url = repo_url or repo_urls[0]
+repo_name = repo_name_of(repo_url)
 
 DEFAULT_CSV_PATH = f"{repo_name}.csv"
+# Order and MAX_STARGAZERS of every stored {repo}_StargazerList, next to the EvaDB catalog
+STARGAZER_LISTS_PATH = "evadb_data/stargazer_lists.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="LLM-powered analysis of GitHub stargazers")
+    parser.add_argument(
+        "--fused",
+        action="store_true",
+        help="extract the profile fields and the topic category with one LLM call per user",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="stream each stargazer through all stages instead of building one table at a time",
+    )
+    parser.add_argument(
+        "--repos",
+        nargs="+",
+        help="analyze several repo URLs together; each user is processed once (implies --streaming)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="record per-stage wall/CPU time, peak memory, external calls and cProfile dumps "
+        "to results/profile/<timestamp>/",
+    )
+    parser.add_argument(
+        "--profile-timings-only",
+        action="store_true",
+        help="with --profile, skip the cProfile dumps and memory tracing, which slow the run down",
+    )
+    parser.add_argument(
+        "--sharded",
+        action="store_true",
+        help="split the stargazers into units of a shared work queue processed by worker processes",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="only process units of the work queue, e.g. on another host sharing its filesystem",
+    )
+    parser.add_argument(
+        "--queue",
+        default=os.environ.get("WORK_QUEUE", DEFAULT_QUEUE_PATH),
+        help="SQLite file of the work queue (default: WORK_QUEUE or %(default)s)",
+    )
+    parser.add_argument(
+        "--shard-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes started on this host in sharded mode",
+    )
+    parser.add_argument("--unit-size", type=int, default=25, help="users per work unit")
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=600.0,
+        help="seconds after which a unit of a silent worker is handed to another",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=60.0,
+        help="seconds a --worker waits for new units before it exits",
+    )
+    parser.add_argument(
+        "--progressive",
+        action="store_true",
+        help="process stargazers in --order and refresh the distributions in "
+        "results/progressive/<repo>.json every --refresh-every users (implies --streaming)",
+    )
+    parser.add_argument(
+        "--order",
+        choices=["star", "recent", "followers", "random"],
+        default="recent",
+        help="processing order of --progressive",
+    )
+    parser.add_argument("--refresh-every", type=int, default=50, help="users between two progressive snapshots")
+    parser.add_argument(
+        "--sample",
+        action="store_true",
+        help="process a stratified random sample and estimate the country and topic "
+        "distributions with confidence intervals (implies --streaming)",
+    )
+    parser.add_argument("--initial-sample", type=int, default=200, help="users in the first sample")
+    parser.add_argument("--max-sample", type=int, help="stop growing the sample at this many users")
+    parser.add_argument(
+        "--target-margin",
+        type=float,
+        default=0.05,
+        help="grow the sample until every share is known within this margin",
+    )
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of the intervals")
+    parser.add_argument("--strata", type=int, default=5, help="star date strata of the sample")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the sample")
+    parser.add_argument(
+        "--details-workers",
+        type=int,
+        default=1,
+        help="concurrent GitHub API workers in streaming mode",
+    )
+    parser.add_argument(
+        "--scrape-workers",
+        type=int,
+        default=1,
+        help="concurrent browser/OCR workers in streaming mode",
+    )
+    return parser.parse_args()
+
+
+def stargazer_lists():
+    """The order and limit each stored {repo}_StargazerList was fetched with, by repo."""
+    if not os.path.exists(STARGAZER_LISTS_PATH):
+        return {}
+    with open(STARGAZER_LISTS_PATH) as lists_file:
+        return json.load(lists_file)
+
+
+def create_stargazer_list(cursor, url, order="star"):
+    """
+    Creates the {repo}_StargazerList table if needed and returns its usernames.
+    With order "recent" the list holds the latest MAX_STARGAZERS stargazers, newest
+    first, otherwise the first ones in star order. A list stored in the other order
+    or with another MAX_STARGAZERS is fetched again.
+    """
+    name = repo_name_of(url)
+    listing = {"order": "recent" if order == "recent" else "star", "limit": MAX_STARGAZERS}
+    lists = stargazer_lists()
+    if lists.get(name) != listing:
+        cursor.drop_table(f"{name}_StargazerList", if_exists=True).df()
+    with PROFILER.stage("stargazer_list"):
+        print(
+            cursor.query(
+                f"""
+           CREATE TABLE IF NOT EXISTS {name}_StargazerList AS
+           SELECT GithubStargazers("{url}", "{github_pat}", "{listing['order']}");
+        """
+            ).df()
+        )
+    lists[name] = listing
+    os.makedirs(os.path.dirname(STARGAZER_LISTS_PATH) or ".", exist_ok=True)
+    with open(STARGAZER_LISTS_PATH, "w") as lists_file:
+        json.dump(lists, lists_file, indent=2, sort_keys=True)
+
+    select_query = cursor.query(
+        f"SELECT github_username FROM {name}_StargazerList;"
+    ).df()
+
+    print(select_query)
+    return list(select_query.iloc[:, 0])
 
 
+def stargazer_count(url):
+    """Number of stargazers of the repo according to the GitHub API, or None if it can't be read."""
+    parts = url.strip("/").split("/")
+    try:
+        return github_client(github_pat).get_repo(f"{parts[-2]}/{parts[-1]}").stargazers_count
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return None
+
+
+def create_llm_table(cursor, table_name, select):
+    """
+    CREATE TABLE IF NOT EXISTS table_name AS select, for a select that calls an LLM.
+    If the query fails, e.g. when the LLM budget runs out before every row is
+    answered, any table it left behind is dropped. The next run then recomputes
+    it, instead of keeping unanswered rows as "N/A" answers.
+    """
+    try:
+        return cursor.query(f"CREATE TABLE IF NOT EXISTS {table_name} AS {select}").df()
+    except Exception:
+        cursor.drop_table(table_name, if_exists=True).df()
+        raise
+
+
+def export_results(cursor, tables_name, url, github_usernames=None):
+    """
+    Writes the tables to the partition of the repo at url in the results datasets,
+    optionally only for some users, and records the repo's owner/name.
+    """
+    # pyarrow is only needed once there are results to write
+    from utils.results_store import export_tables, record_full_name
+
+    name = repo_name_of(url)
+    export_tables(cursor, tables_name, name, github_usernames)
+    record_full_name(name, "/".join(url.strip("/").split("/")[-2:]))
+
+
+def run_multi_repo(cursor, urls, args):
+    """
+    Processes the union of the stargazers of several repos once into shared
+    {shared_tables_name}_* tables, then exports the insights of every repo.
+    """
+    stargazers = {repo_name_of(url): create_stargazer_list(cursor, url) for url in urls}
+    # every user is fetched, scraped and sent to the LLMs once, whatever the number of repos
+    unique_usernames = list(dict.fromkeys(
+        username for usernames in stargazers.values() for username in usernames
+    ))
+    total = sum(len(usernames) for usernames in stargazers.values())
+    print(
+        f"{total} stargazers across {len(urls)} repos, {len(unique_usernames)} unique users "
+        f"({total - len(unique_usernames)} duplicates skipped)"
+    )
+
+    with PROFILER.stage("streaming"):
+        run_streaming(
+            cursor,
+            shared_tables_name,
+            unique_usernames,
+            github_pat,
+            prompt_token_budget,
+            categorizer_min_confidence,
+            fused_model=fused_model if args.fused else None,
+            details_workers=args.details_workers,
+            scrape_workers=args.scrape_workers,
+            remove_missing=True,
+        )
+
+    for url in urls:
+        export_results(cursor, shared_tables_name, url, set(stargazers[repo_name_of(url)]))
+
+
+def sample_labels(cursor, name):
+    """Returns {distribution: {github_username: labels}} of the users in the insight tables."""
+    from utils.results_store import strip_table_prefixes, to_typed_frame
+
+    details_df = cursor.query(f"SELECT github_username, user_location FROM {name}_StargazerDetails;").df()
+    locations = dict(zip(details_df.iloc[:, 0], details_df.iloc[:, 1]))
+    gpt35_df = strip_table_prefixes(cursor.query(f"SELECT * FROM {name}_StargazerInsights;").df())
+    gpt35_df["user_location"] = gpt35_df["github_username"].map(locations)
+    gpt35_df = to_typed_frame(gpt35_df, "insights_gpt35")
+    gpt4_df = to_typed_frame(
+        cursor.query(f"SELECT * FROM {name}_StargazerInsightsGPT4;").df(), "insights_gpt4"
+    )
+    return {
+        "country": {
+            username: ["Unknown" if is_trivially_empty(country) else country]
+            for username, country in zip(gpt35_df["github_username"], gpt35_df["country"])
+        },
+        # users without any of the three categories count as Other, as in the pie chart
+        "topics": {
+            username: list(categories) or ["Other"]
+            for username, categories in zip(gpt4_df["github_username"], gpt4_df["categories"])
+        },
+    }
+
+
+def run_sampled(cursor, url, args):
+    """
+    Streams a stratified random sample of the stargazers and estimates the country
+    and topic distributions with confidence intervals. The sample grows until the
+    widest interval is within --target-margin or --max-sample users are processed.
+
+    The population is the stargazer list, i.e. the first MAX_STARGAZERS
+    stargazers. When the repo has more, the estimates describe those early
+    stargazers only, and the report says so.
+    """
+    name = repo_name_of(url)
+    github_usernames = create_stargazer_list(cursor, url)
+    stargazers_total = stargazer_count(url)
+    capped = stargazers_total is not None and stargazers_total > len(github_usernames)
+    population = f"{name} stargazers"
+    if capped:
+        population = f"the first {len(github_usernames)} of {stargazers_total} {name} stargazers"
+        print(
+            f"The stargazer list holds {population}, the estimates describe them only. "
+            f"Set MAX_STARGAZERS={stargazers_total} to sample from all of them."
+        )
+    sample = StratifiedSample(github_usernames, num_strata=args.strata, seed=args.seed)
+    max_size = min(args.max_sample or len(github_usernames), len(github_usernames))
+    size = min(args.initial_sample, max_size)
+
+    rounds = []
+    # the LLM budget covers all the rounds, each one gets what the earlier ones left
+    spent = {}
+    while True:
+        previous_size = len(sample)
+        sampled = sample.grow(size)
+        print(f"Sampling {len(sampled)} of {len(github_usernames)} stargazers")
+        with PROFILER.stage("streaming"):
+            stats = run_streaming(
+                cursor,
+                name,
+                sampled,
+                github_pat,
+                prompt_token_budget,
+                categorizer_min_confidence,
+                fused_model=fused_model if args.fused else None,
+                details_workers=args.details_workers,
+                scrape_workers=args.scrape_workers,
+                budgets=remaining_budgets(spent),
+            )
+        spent = add_spend(spent, stats["llm_spend"])
+
+        estimates = {}
+        responded = {}
+        for distribution, labels in sample_labels(cursor, name).items():
+            estimates[distribution], responded[distribution] = estimate_shares(
+                sample, labels, args.confidence
+            )
+        margin = max(
+            (estimate["margin"] for shares in estimates.values() for estimate in shares.values()),
+            default=float("inf"),
+        )
+        rounds.append({"sample_size": len(sample), "responded": responded, "max_margin": margin})
+        print(f"Widest {args.confidence:.0%} interval: ±{margin:.1%} (target ±{args.target_margin:.1%})")
+
+        if margin <= args.target_margin or len(sample) >= max_size or len(sample) == previous_size:
+            break
+        if stats["stopped"] or budgets_exhausted(remaining_budgets(spent)):
+            print("The LLM budget is used up, not growing the sample")
+            break
+        needed = max(
+            required_size(shares, args.target_margin, len(github_usernames), args.confidence)
+            for shares in estimates.values()
+        )
+        # grow by at least a quarter, so a poor first guess does not cost many rounds
+        size = min(max(needed, int(len(sample) * 1.25) + 1), max_size)
+
+    export_results(cursor, name, url)
+
+    report = {
+        "repo": name,
+        "population": len(github_usernames),
+        "stargazers": stargazers_total,
+        "population_capped": capped,
+        "sample_size": len(sample),
+        "strata": len(sample.strata),
+        "seed": args.seed,
+        "confidence": args.confidence,
+        "target_margin": args.target_margin,
+        "rounds": rounds,
+        "estimates": estimates,
+    }
+    path = os.path.join("results", f"{name}_estimates.json")
+    os.makedirs("results", exist_ok=True)
+    with open(path, "w") as estimates_file:
+        json.dump(report, estimates_file, indent=2)
+
+    for distribution, shares in estimates.items():
+        print(f"Estimated {distribution} distribution of {population}:")
+        for label, estimate in list(shares.items())[:15]:
+            print(
+                f"  {label:<30} {estimate['share']:>6.1%}  "
+                f"[{estimate['low']:.1%}, {estimate['high']:.1%}]"
+            )
+    print(f"Estimates written to {path}")
+    return report
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.worker:
+        # workers only need the GitHub and OpenAI credentials, not EvaDB
+        processed = run_worker(
+            args.queue,
+            github_pat,
+            details_workers=args.details_workers,
+            scrape_workers=args.scrape_workers,
+            lease_seconds=args.lease_seconds,
+            idle_timeout=args.idle_timeout,
+        )
+        print(f"✅ Worker processed {processed} units")
+        exit(0)
+
+    if args.profile:
+        PROFILER.enable(
+            os.path.join("results", "profile", time.strftime("%Y%m%d-%H%M%S")),
+            use_cprofile=not args.profile_timings_only,
+            trace_memory=not args.profile_timings_only,
+        )
     try:
         # establish evadb api cursor
         print("⏳ Connect to EvaDB...")
-        cursor = evadb.connect().cursor()
+        with PROFILER.stage("connect"):
+            cursor = evadb.connect().cursor()
         print("✅ Connected to EvaDB...")
 
-        cursor.query(
-            f"""
+        # CREATE OR REPLACE FUNCTION is skipped for unchanged implementations
+        functions = FunctionRegistry(cursor)
+
+        functions.register(
+            "GithubStargazers",
+            """
             CREATE OR REPLACE FUNCTION GithubStargazers
             INPUT (repo_url TEXT(1000), github_pat TEXT(1000))
             OUTPUT (github_username TEXT(1000))
             TYPE  Webscraping
             IMPL  'functions/github_stargazers.py';
-        """
-        ).df()
+        """,
+            "functions/github_stargazers.py",
+        )
 
-        cursor.query(
-            f"""
+        functions.register(
+            "WebPageTextExtractor",
+            """
             CREATE OR REPLACE FUNCTION WebPageTextExtractor
             INPUT (urls TEXT(1000))
             OUTPUT (extracted_text TEXT(1000))
             TYPE  Webscraping
             IMPL  'functions/webpage_text_extractor.py';
-        """
-        ).df()
+        """,
+            "functions/webpage_text_extractor.py",
+        )
 
-        cursor.query(
-            f"""
+        functions.register(
+            "GithubUserdetails",
+            """
             CREATE OR REPLACE FUNCTION GithubUserdetails
             INPUT (github_username TEXT(1000), github_pat TEXT(1000))
             OUTPUT (
@@ -75,10 +483,23 @@ if __name__ == "__main__":
             )
             TYPE  Webscraping
             IMPL  'functions/github_user_details.py';
-        """
-        ).df()
+        """,
+            "functions/github_user_details.py",
+        )
+
+        functions.register(
+            "TextCompactor",
+            f"""
+            CREATE OR REPLACE FUNCTION TextCompactor
+            IMPL  'functions/text_compactor.py'
+            MODEL 'gpt-3.5-turbo-16k'
+            MAX_TOKENS '{prompt_token_budget}';
+        """,
+            "functions/text_compactor.py",
+        )
 
-        cursor.query(
+        functions.register(
+            "StringToDataframe",
             """
             CREATE OR REPLACE FUNCTION StringToDataframe
             INPUT (input_string TEXT(1000))
@@ -94,146 +515,272 @@ if __name__ == "__main__":
             )
             TYPE  Webscraping
             IMPL  'functions/string_to_dataframe.py';
-        """
-        ).df()
+        """,
+            "functions/string_to_dataframe.py",
+        )
 
-        cursor.query(
+        functions.register(
+            "GPT35",
             """CREATE OR REPLACE FUNCTION GPT35
                 IMPL 'functions/chatgpt.py'
                 MODEL 'gpt-3.5-turbo-16k'
-            """
-        ).df()
+            """,
+            "functions/chatgpt.py",
+        )
 
-        cursor.query(
+        functions.register(
+            "GPT4",
             """CREATE OR REPLACE FUNCTION GPT4
                 IMPL 'functions/chatgpt_batch.py'
                 MODEL 'gpt-4-0613'
-            """
-        ).df()
+            """,
+            "functions/chatgpt_batch.py",
+        )
 
-        print(
-            cursor.query(
-                f"""
-           CREATE TABLE IF NOT EXISTS {repo_name}_StargazerList AS
-           SELECT GithubStargazers("{repo_url}", "{github_pat}");
-        """
-            ).df()
+        functions.register(
+            "TopicCategorizer",
+            f"""CREATE OR REPLACE FUNCTION TopicCategorizer
+                IMPL 'functions/topic_categorizer.py'
+                MODEL 'gpt-4-0613'
+                MIN_CONFIDENCE '{categorizer_min_confidence}'
+            """,
+            "functions/topic_categorizer.py",
         )
+        print(f"✅ Functions registered ({functions.skipped} unchanged, skipped)")
+
+        if args.repos:
+            repo_urls = args.repos
+            repo_url = repo_urls[0]
+            repo_name = repo_name_of(repo_url)
+
+        if len(repo_urls) > 1:
+            run_multi_repo(cursor, repo_urls, args)
+
+        elif args.sample:
+            run_sampled(cursor, repo_url, args)
+
+        elif args.sharded:
+            github_usernames = create_stargazer_list(cursor, repo_url)
+
+            with PROFILER.stage("sharded"):
+                run_sharded(
+                    cursor,
+                    repo_name,
+                    github_usernames,
+                    github_pat,
+                    prompt_token_budget,
+                    categorizer_min_confidence,
+                    fused_model=fused_model if args.fused else None,
+                    queue_path=args.queue,
+                    unit_size=args.unit_size,
+                    local_workers=args.shard_workers,
+                    lease_seconds=args.lease_seconds,
+                )
 
-        select_query = cursor.query(
-            f"SELECT * FROM {repo_name}_StargazerList;"
-        ).df()
+            export_results(cursor, repo_name, repo_url)
 
-        print(select_query)
+        elif args.streaming or args.progressive:
+            github_usernames = create_stargazer_list(
+                cursor, repo_url, args.order if args.progressive else "star"
+            )
 
-        print(
-            cursor.query(
+            aggregates = None
+            if args.progressive:
+                from utils.progressive import ProgressiveAggregates, order_stargazers
+
+                github_usernames = order_stargazers(
+                    cursor, repo_name, github_usernames, args.order, args.seed
+                )
+                aggregates = ProgressiveAggregates(
+                    repo_name,
+                    len(github_usernames),
+                    order=args.order,
+                    refresh_every=args.refresh_every,
+                    confidence=args.confidence,
+                )
+
+            with PROFILER.stage("streaming"):
+                run_streaming(
+                    cursor,
+                    repo_name,
+                    github_usernames,
+                    github_pat,
+                    prompt_token_budget,
+                    categorizer_min_confidence,
+                    fused_model=fused_model if args.fused else None,
+                    details_workers=args.details_workers,
+                    scrape_workers=args.scrape_workers,
+                    on_rows=aggregates.update if aggregates else None,
+                    remove_missing=True,
+                )
+            if aggregates:
+                aggregates.save(final=True)
+
+            export_results(cursor, repo_name, repo_url)
+
+        else:
+            create_stargazer_list(cursor, repo_url)
+
+            with PROFILER.stage("details"):
+                print(
+                    cursor.query(
+                        f"""
+                   CREATE TABLE IF NOT EXISTS {repo_name}_StargazerDetails AS
+                   SELECT github_username, GithubUserdetails(github_username, "{github_pat}")
+                   FROM {repo_name}_StargazerList;
+                """
+                    ).df()
+                )
+
+            select_query = cursor.query(
                 f"""
-           CREATE TABLE IF NOT EXISTS {repo_name}_StargazerDetails AS
-           SELECT GithubUserdetails(github_username, "{github_pat}")
-           FROM {repo_name}_StargazerList;
-        """
+            SELECT * FROM {repo_name}_StargazerDetails;
+            """
             ).df()
-        )
 
-        select_query = cursor.query(
-            f"""
-        SELECT * FROM {repo_name}_StargazerDetails;
-        """
-        ).df()
+            print(select_query)
 
-        print(select_query)
+            with PROFILER.stage("scrape"):
+                print(
+                    cursor.query(
+                        f"""
+                   CREATE TABLE IF NOT EXISTS {repo_name}_StargazerScrapedDetails AS
+                   SELECT github_username, WebPageTextExtractor(github_username)
+                   FROM {repo_name}_StargazerList;
+                """
+                    ).df()
+                )
 
-        print(
-            cursor.query(
+            select_query = cursor.query(
                 f"""
-           CREATE TABLE IF NOT EXISTS {repo_name}_StargazerScrapedDetails AS
-           SELECT github_username, WebPageTextExtractor(github_username)
-           FROM {repo_name}_StargazerList;
-        """
+                    SELECT *
+                    FROM {repo_name}_StargazerScrapedDetails;
+            """
             ).df()
-        )
 
-        select_query = cursor.query(
-            f"""
-                SELECT *
-                FROM {repo_name}_StargazerScrapedDetails;
-        """
-        ).df()
-
-        print("Processing insights...")
-        # cursor.query(f"DROP TABLE IF EXISTS {repo_name}_StargazerInsights;").df()
-
-        LLM_prompt = """You are given a block of disorganized text extracted from the GitHub user profile of a user using an automated web scraper. The goal is to get structured results from this data.
-                Extract the following fields from the text: name, country, city, email, occupation, programming_languages, topics_of_interest, social_media.
-                If some field is not found, just output fieldname: N/A. Always return all the 8 field names. DO NOT add any additional text to your output.
-                The topic_of_interest field must list a broad range of technical topics that are mentioned in any portion of the text.  This field is the most important, so add as much information as you can. Do not add non-technical interests.
-                The programming_languages field can contain one or more programming languages out of only the following 4 programming languages - Python, C++, JavaScript, Java. Do not include any other language outside these 4 languages in the output. If the user is not interested in any of these 4 programming languages, output N/A.
-                If the country is not available, use the city field to fill the country. For example, if the city is New York, fill the country as United States.
-                If there are social media links, including personal websites, add them to the social media section. Do NOT add social media links that are not present.
-                Here is an example (use it only for the output format, not for the content):
-
-                name: logicx
-                country: United States
-                city: Atlanta
-                email: abc@gatech.edu
-                occupation: PhD student at Georgia Tech
-                programming_languages: Python, Java
-                topics_of_interest: Google Colab, fake data generation, Postgres
-                social_media: https://www.logicx.io, https://www.twitter.com/logicx, https://www.linkedin.com/in/logicx
+            # Strip GitHub UI boilerplate and cap each profile at the token budget
+            with PROFILER.stage("compact"):
+                cursor.query(
+                    f"""
+                   CREATE TABLE IF NOT EXISTS {repo_name}_StargazerCompactText AS
+                   SELECT github_username, TextCompactor(extracted_text)
+                   FROM {repo_name}_StargazerScrapedDetails;
                 """
-        # GPT-35 fuzzy topics
-        cursor.query(
-            f"""
-            CREATE TABLE IF NOT EXISTS {repo_name}_StargazerInsights AS
-            SELECT StringToDataframe(
-                GPT35("{LLM_prompt}", extracted_text
+                ).df()
+
+            print("Processing insights...")
+            # cursor.query(f"DROP TABLE IF EXISTS {repo_name}_StargazerInsights;").df()
+
+            if args.fused:
+                # One structured call per user returns the 8 fields and the category
+                functions.register(
+                    "GPTFused",
+                    f"""CREATE OR REPLACE FUNCTION GPTFused
+                        IMPL 'functions/chatgpt.py'
+                        MODEL '{fused_model}'
+                    """,
+                    "functions/chatgpt.py",
                 )
-            )
-            FROM {repo_name}_StargazerScrapedDetails;
-        """
-        ).df()
 
-        select_query = cursor.query(
-            f"""
-                SELECT *
-                FROM {repo_name}_StargazerInsights;
-        """
-        ).df()
-
-        print(select_query)
-
-        select_query.to_csv(f"results/{repo_name}_insights_gpt35.csv", index=False)
-        # cursor.query(f"DROP TABLE IF EXISTS {repo_name}_StargazerInsightsGPT4;").df()
-        LLM_prompt = """You are given 10 rows of input, each row is separated by two new line characters.
-                     Categorize the topics listed in each row into one or more of the following 3 technical areas - Machine Learning, Databases, and Web development. If the topics listed are not related to any of these 3 areas, output a single N/A. Do not miss any input row. Do not add any additional text or numbers to your output.
-                     The output rows must be separated by two new line characters. Each input row must generate exactly one output row. For example, the input row [Recommendation systems, Deep neural networks, Postgres] must generate only the output row [Machine Learning, Databases].
-                     The input row [enterpreneurship, startups, venture capital] must generate the output row N/A.
-                     """
-
-        cursor.query(
-            f"""CREATE TABLE IF NOT EXISTS
-                 {repo_name}_StargazerInsightsGPT4 AS
-                    SELECT name,
-                            country,
-                            city,
-                            email,
-                            occupation,
-                            programming_languages,
-                            social_media,
-                            GPT4("{LLM_prompt}", topics_of_interest)
-                    FROM {repo_name}_StargazerInsights;
-        """
-        ).df()
+                functions.register(
+                    "StringToInsights",
+                    """
+                    CREATE OR REPLACE FUNCTION StringToInsights
+                    IMPL  'functions/string_to_insights.py';
+                """,
+                    "functions/string_to_insights.py",
+                )
 
-        select_query = cursor.query(
-            f"""
-                SELECT *
-                FROM {repo_name}_StargazerInsightsGPT4;
-        """
-        ).df()
+                LLM_prompt = FUSED_PROMPT
+                with PROFILER.stage("extract"):
+                    create_llm_table(
+                        cursor,
+                        f"{repo_name}_StargazerInsightsFused",
+                        f"""
+                        SELECT github_username, StringToInsights(
+                            GPTFused("{LLM_prompt}", compact_text
+                            )
+                        )
+                        FROM {repo_name}_StargazerCompactText;
+                    """,
+                    )
+
+                cursor.query(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {repo_name}_StargazerInsights AS
+                    SELECT github_username, name, country, city, email, occupation,
+                           programming_languages, topics_of_interest, social_media
+                    FROM {repo_name}_StargazerInsightsFused;
+                """
+                ).df()
+
+                cursor.query(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {repo_name}_StargazerInsightsGPT4 AS
+                    SELECT github_username, name, country, city, email, occupation,
+                           programming_languages, social_media, category AS response
+                    FROM {repo_name}_StargazerInsightsFused;
+                """
+                ).df()
+
+                export_results(cursor, repo_name, repo_url)
+
+            else:
+                LLM_prompt = EXTRACTION_PROMPT
+                # GPT-35 fuzzy topics
+                with PROFILER.stage("extract"):
+                    create_llm_table(
+                        cursor,
+                        f"{repo_name}_StargazerInsights",
+                        f"""
+                        SELECT github_username, StringToDataframe(
+                            GPT35("{LLM_prompt}", compact_text
+                            )
+                        )
+                        FROM {repo_name}_StargazerCompactText;
+                    """,
+                    )
+
+                select_query = cursor.query(
+                    f"""
+                        SELECT *
+                        FROM {repo_name}_StargazerInsights;
+                """
+                ).df()
+
+                print(select_query)
+
+                # cursor.query(f"DROP TABLE IF EXISTS {repo_name}_StargazerInsightsGPT4;").df()
+                LLM_prompt = CATEGORIZATION_PROMPT
+
+                with PROFILER.stage("categorize"):
+                    create_llm_table(
+                        cursor,
+                        f"{repo_name}_StargazerInsightsGPT4",
+                        f"""
+                                SELECT github_username,
+                                        name,
+                                        country,
+                                        city,
+                                        email,
+                                        occupation,
+                                        programming_languages,
+                                        social_media,
+                                        TopicCategorizer("{LLM_prompt}", topics_of_interest)
+                                FROM {repo_name}_StargazerInsights;
+                    """,
+                    )
+
+                select_query = cursor.query(
+                    f"""
+                        SELECT *
+                        FROM {repo_name}_StargazerInsightsGPT4;
+                """
+                ).df()
 
-        select_query.to_csv(f"results/{repo_name}_insights_gpt4.csv", index=False)
+                export_results(cursor, repo_name, repo_url)
 
     except Exception as e:
         print(f"❗️ EvaDB Session ended with an error: {e}")
+    finally:
+        PROFILER.write_report()
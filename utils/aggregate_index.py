@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+from collections import Counter
+
+import pandas as pd
+
+from utils.llm_inputs import is_trivially_empty
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_labels (
+    repo TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    github_username TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    PRIMARY KEY (repo, dimension, github_username)
+);
+CREATE TABLE IF NOT EXISTS counts (
+    repo TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    label TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (repo, dimension, label)
+);
+"""
+
+# Dimensions maintained for the rows of each results dataset
+DIMENSIONS = {
+    "insights_gpt35": ["country", "language", "topic"],
+    "insights_gpt4": ["category"],
+    "details": ["starred_repo"],
+}
+
+
+def _unique(labels):
+    return sorted(set(labels))
+
+
+def labels_of(typed_df, dataset, keys=None):
+    """
+    Returns {dimension: {github_username: labels}} for the rows of a typed results
+    frame (see results_store.to_typed_frame). Every label counts a user once.
+    keys replaces the usernames as the user of every row, e.g. for tables without them.
+    """
+    usernames = typed_df["github_username"] if keys is None else keys
+    if dataset == "insights_gpt35":
+        return {
+            "country": {
+                username: ["Unknown" if is_trivially_empty(country) else country]
+                for username, country in zip(usernames, typed_df["country"])
+            },
+            "language": {
+                username: _unique(languages)
+                for username, languages in zip(usernames, typed_df["programming_languages"])
+            },
+            "topic": {
+                username: _unique(topic.strip().lower() for topic in topics)
+                for username, topics in zip(usernames, typed_df["topics_of_interest"])
+            },
+        }
+    if dataset == "insights_gpt4":
+        # users without any of the three categories count as Other, as in the pie chart
+        return {
+            "category": {
+                username: _unique(categories) or ["Other"]
+                for username, categories in zip(usernames, typed_df["categories"])
+            }
+        }
+    if dataset == "details":
+        return {
+            "starred_repo": {
+                username: _unique(repo["name"] for repo in repos)
+                for username, repos in zip(usernames, typed_df["user_starred_repos"])
+            }
+        }
+    return {}
+
+
+class AggregateIndex:
+    """
+    Materialized label counts per repo (topic categories, countries, programming
+    languages, topics and starred repos) in a SQLite file next to the results.
+
+    The labels of every user are kept, so an update only applies the difference
+    between the stored and the new labels of the users that changed, joined or
+    left. Charts and reports read the counts of a repo without scanning its rows.
+
+    Arguments:
+        path (str) : SQLite file of the index, created if needed.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.executescript(_SCHEMA)
+
+    def update(self, repo, dimension, labels_by_user):
+        """
+        Sets the labels of all users of a repo in one dimension; users missing from
+        labels_by_user are removed. Returns the number of users whose labels changed.
+        """
+        stored = {
+            username: json.loads(labels)
+            for username, labels in self.connection.execute(
+                "SELECT github_username, labels FROM user_labels WHERE repo = ? AND dimension = ?",
+                (repo, dimension),
+            )
+        }
+        delta = Counter()
+        changed = {}
+        for username, labels in labels_by_user.items():
+            labels = list(labels)
+            previous = stored.get(username)
+            if previous == labels:
+                continue
+            delta.subtract(previous or [])
+            delta.update(labels)
+            changed[username] = labels
+        removed = set(stored) - set(labels_by_user)
+        for username in removed:
+            delta.subtract(stored[username])
+
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO user_labels VALUES (?, ?, ?, ?)",
+                [(repo, dimension, username, json.dumps(labels)) for username, labels in changed.items()],
+            )
+            self.connection.executemany(
+                "DELETE FROM user_labels WHERE repo = ? AND dimension = ? AND github_username = ?",
+                [(repo, dimension, username) for username in removed],
+            )
+            self.connection.executemany(
+                """
+                INSERT INTO counts VALUES (?, ?, ?, ?)
+                ON CONFLICT (repo, dimension, label) DO UPDATE SET count = count + excluded.count
+                """,
+                [(repo, dimension, label, count) for label, count in delta.items() if count != 0],
+            )
+            self.connection.execute(
+                "DELETE FROM counts WHERE repo = ? AND dimension = ? AND count <= 0", (repo, dimension)
+            )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return len(changed) + len(removed)
+
+    def update_from_frame(self, typed_df, dataset, repo, keys=None):
+        """Updates every dimension of a dataset from the typed rows of one repo partition."""
+        return {
+            dimension: self.update(repo, dimension, labels_by_user)
+            for dimension, labels_by_user in labels_of(typed_df, dataset, keys).items()
+        }
+
+    def remove(self, repo):
+        """Drops all labels and counts of a repo, whose charts are then counted from its results."""
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.execute("DELETE FROM user_labels WHERE repo = ?", (repo,))
+            self.connection.execute("DELETE FROM counts WHERE repo = ?", (repo,))
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def counts(self, repo, dimension, limit=None):
+        """Returns the label counts of a repo as a Series, most frequent first."""
+        query = "SELECT label, count FROM counts WHERE repo = ? AND dimension = ? ORDER BY count DESC, label"
+        params = (repo, dimension)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        rows = self.connection.execute(query, params).fetchall()
+        return pd.Series(
+            [count for _, count in rows], index=[label for label, _ in rows], dtype="int64", name=dimension
+        )
+
+    def users(self, repo, dimension):
+        """Number of users of a repo with labels in a dimension."""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM user_labels WHERE repo = ? AND dimension = ?", (repo, dimension)
+        ).fetchone()[0]
+
+    def repos(self):
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT repo FROM counts ORDER BY repo")]
+
+    def close(self):
+        self.connection.close()
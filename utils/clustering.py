@@ -0,0 +1,312 @@
+import json
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.results_store import RESULTS_DIR, iter_results_batches
+
+# Hashed feature space: no vocabulary is kept, whatever the number of topics and repos
+N_FEATURES = 2**18
+# Rows hashed, embedded or assigned at a time
+CHUNK_SIZE = 50_000
+# Rows the SVD and the k-means are fitted on; the others are only transformed
+FIT_SAMPLE = 100_000
+
+_WORD = re.compile(r"[a-z][a-z0-9+#.\-]{2,}")
+_STOP_WORDS = {
+    "and", "the", "for", "with", "from", "that", "this", "are", "you", "your", "our", "was", "not",
+    "but", "all", "who", "can", "has", "have", "into", "about", "love", "like", "also", "more",
+}
+
+
+def _words(text):
+    return [f"w:{word}" for word in _WORD.findall(text.lower()) if word not in _STOP_WORDS]
+
+
+def topic_tokens(topics, languages):
+    """Tokens of the insight fields: whole topics, their words and the programming languages."""
+    tokens = []
+    for topic in (topics if topics is not None else []):
+        topic = " ".join(str(topic).lower().split())
+        if topic:
+            tokens.append(f"topic:{topic}")
+            tokens.extend(_words(topic))
+    tokens.extend(f"lang:{language.lower()}" for language in languages if language is not None)
+    return tokens
+
+
+def detail_tokens(bio, starred_repos):
+    """Tokens of the GitHub details: the words of the bio and the starred repos."""
+    tokens = _words(bio) if isinstance(bio, str) else []
+    tokens.extend(f"repo:{repo['name'].lower()}" for repo in starred_repos if repo and repo["name"])
+    return tokens
+
+
+def _label(token):
+    """ "topic:deep learning" -> "deep learning", "repo:pytorch/pytorch" -> "★ pytorch/pytorch" """
+    kind, _, value = token.partition(":")
+    return f"★ {value}" if kind == "repo" else value
+
+
+def iter_user_tokens(repos=None, results_dir=None, batch_size=CHUNK_SIZE):
+    """
+    Yields (github_usernames, token lists) batches from the insights and details
+    datasets, read in bounded batches. A user's tokens may come in several batches.
+    """
+    for batch in iter_results_batches(
+        "insights_gpt35",
+        repos=repos,
+        columns=["github_username", "topics_of_interest", "programming_languages"],
+        batch_size=batch_size,
+        results_dir=results_dir,
+    ):
+        columns = batch.to_pydict()
+        yield columns["github_username"], [
+            topic_tokens(topics, languages or [])
+            for topics, languages in zip(columns["topics_of_interest"], columns["programming_languages"])
+        ]
+    for batch in iter_results_batches(
+        "details",
+        repos=repos,
+        columns=["github_username", "user_bio", "user_starred_repos"],
+        batch_size=batch_size,
+        results_dir=results_dir,
+    ):
+        columns = batch.to_pydict()
+        yield columns["github_username"], [
+            detail_tokens(bio, starred or [])
+            for bio, starred in zip(columns["user_bio"], columns["user_starred_repos"])
+        ]
+
+
+def build_features(token_batches, n_features=N_FEATURES):
+    """
+    Hashes the token batches into an L2-normalized TF-IDF CSR matrix with one row per user.
+
+    Returns:
+        usernames (ndarray) : The username of every row.
+        features (csr_matrix) : users × n_features, float32.
+    """
+    from sklearn.feature_extraction import FeatureHasher
+    from sklearn.preprocessing import normalize
+
+    hasher = FeatureHasher(n_features=n_features, input_type="string", alternate_sign=False)
+    row_of = {}
+    owners, chunks = [], []
+    for usernames, tokens in token_batches:
+        owners.append(np.fromiter((row_of.setdefault(username, len(row_of)) for username in usernames), np.int64))
+        chunks.append(hasher.transform(tokens).astype(np.float32))
+    if not chunks:
+        return np.array([], dtype=object), sparse.csr_matrix((0, n_features), dtype=np.float32)
+
+    # the insights and details rows of a user are summed into one row; a user
+    # tracked in several repos has proportional rows, which normalize the same
+    owners = np.concatenate(owners)
+    stacked = sparse.vstack(chunks, format="csr")
+    del chunks
+    merge = sparse.csr_matrix(
+        (np.ones(len(owners), dtype=np.float32), (owners, np.arange(len(owners)))), shape=(len(row_of), len(owners))
+    )
+    features = (merge @ stacked).tocsr()
+    del stacked
+
+    # sublinear tf, smoothed idf
+    np.log1p(features.data, out=features.data)
+    document_frequency = np.bincount(features.indices, minlength=n_features)
+    idf = np.log((1 + features.shape[0]) / (1 + document_frequency)).astype(np.float32) + 1
+    features.data *= idf[features.indices]
+    normalize(features, copy=False)
+    return np.array(list(row_of), dtype=object), features
+
+
+def _sample_rows(num_rows, size, seed):
+    if num_rows <= size:
+        return np.arange(num_rows)
+    return np.sort(np.random.default_rng(seed).choice(num_rows, size, replace=False))
+
+
+def _assign(kmeans, embeddings):
+    return np.concatenate(
+        [kmeans.predict(embeddings[start : start + CHUNK_SIZE]) for start in range(0, len(embeddings), CHUNK_SIZE)]
+    )
+
+
+def build_index(
+    output_dir=None,
+    repos=None,
+    num_segments=12,
+    dims=64,
+    num_lists=None,
+    n_features=N_FEATURES,
+    seed=0,
+    results_dir=None,
+):
+    """
+    Segments the stargazers and builds a nearest-neighbor index over them, on the CPU.
+
+    Users are hashed TF-IDF vectors of their topics, programming languages, bio
+    words and starred repos, embedded in dims dimensions with a truncated SVD
+    (LSA), so users with related but different topics or repos end up close.
+
+    - Segments: mini-batch k-means over the embeddings, each described by the
+      tokens that weigh most in its centroid.
+    - Index: an inverted file. A second, finer k-means (num_lists ≈ 4√users)
+      partitions the users, and the embeddings are stored grouped by list in
+      embeddings.npy, which queries memory-map, so only the probed lists are read.
+
+    The SVD and the k-means are fitted on a sample of FIT_SAMPLE users and applied
+    in chunks, so apart from the sparse features (about 8 bytes per token) the
+    memory does not grow with the number of users.
+
+    Returns the ClusterIndex written to output_dir (default results/clusters).
+    """
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.preprocessing import normalize
+    from sklearn.utils import murmurhash3_32
+
+    output_dir = output_dir or os.path.join(results_dir or RESULTS_DIR, "clusters")
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    usernames, features = build_features(iter_user_tokens(repos, results_dir), n_features)
+    num_users = len(usernames)
+    if num_users < 2:
+        raise ValueError("Need at least 2 users with insights or details to cluster")
+    dims = min(dims, num_users - 1)
+    num_segments = min(num_segments, num_users)
+    num_lists = min(num_lists or max(1, int(4 * np.sqrt(num_users))), num_users)
+
+    sample = _sample_rows(num_users, FIT_SAMPLE, seed)
+    svd = TruncatedSVD(n_components=dims, algorithm="randomized", random_state=seed).fit(features[sample])
+    embeddings = np.lib.format.open_memmap(
+        os.path.join(output_dir, "embeddings.tmp.npy"), mode="w+", dtype=np.float32, shape=(num_users, dims)
+    )
+    for start in range(0, num_users, CHUNK_SIZE):
+        chunk = svd.transform(features[start : start + CHUNK_SIZE])
+        embeddings[start : start + len(chunk)] = normalize(chunk)
+
+    segment_kmeans = MiniBatchKMeans(
+        n_clusters=num_segments, batch_size=4096, n_init=3, random_state=seed
+    ).fit(embeddings[sample])
+    segments = _assign(segment_kmeans, embeddings)
+    list_kmeans = MiniBatchKMeans(
+        n_clusters=num_lists, batch_size=4096, n_init=1, random_state=seed
+    ).fit(embeddings[sample])
+    lists = _assign(list_kmeans, embeddings)
+
+    # rows grouped by list, so a list is a contiguous slice of embeddings.npy
+    order = np.argsort(lists, kind="stable")
+    grouped = np.lib.format.open_memmap(
+        os.path.join(output_dir, "embeddings.npy.tmp"), mode="w+", dtype=np.float32, shape=(num_users, dims)
+    )
+    for start in range(0, num_users, CHUNK_SIZE):
+        grouped[start : start + CHUNK_SIZE] = embeddings[order[start : start + CHUNK_SIZE]]
+    grouped.flush()
+    del grouped, embeddings
+    os.replace(os.path.join(output_dir, "embeddings.npy.tmp"), os.path.join(output_dir, "embeddings.npy"))
+    os.remove(os.path.join(output_dir, "embeddings.tmp.npy"))
+
+    # segment descriptions: the hashed columns weighing most in every centroid,
+    # named after the most frequent token hashed into each of them
+    weights = segment_kmeans.cluster_centers_ @ svd.components_
+    top_columns = np.argsort(-weights, axis=1)[:, :30]
+    token_counts = {column: Counter() for column in np.unique(top_columns)}
+    for _, tokens in iter_user_tokens(repos, results_dir):
+        for token, count in Counter(token for user_tokens in tokens for token in set(user_tokens)).items():
+            # the column FeatureHasher puts the token in
+            column = abs(murmurhash3_32(token, seed=0)) % n_features
+            if column in token_counts:
+                token_counts[column][token] += count
+    sizes = np.bincount(segments, minlength=num_segments)
+    described = []
+    for segment, columns in enumerate(top_columns):
+        terms = list(dict.fromkeys(
+            _label(token_counts[column].most_common(1)[0][0]) for column in columns if token_counts[column]
+        ))
+        described.append({"segment": segment, "users": int(sizes[segment]), "terms": terms[:10]})
+
+    np.save(os.path.join(output_dir, "usernames.npy"), usernames[order].astype(str))
+    np.save(os.path.join(output_dir, "segments.npy"), segments[order].astype(np.int32))
+    np.save(os.path.join(output_dir, "list_centroids.npy"), normalize(list_kmeans.cluster_centers_).astype(np.float32))
+    np.save(os.path.join(output_dir, "list_offsets.npy"), np.searchsorted(lists[order], np.arange(num_lists + 1)))
+    with open(os.path.join(output_dir, "index.json"), "w") as index_file:
+        json.dump(
+            {
+                "users": num_users,
+                "dims": dims,
+                "lists": num_lists,
+                "n_features": n_features,
+                "repos": repos,
+                "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "build_s": round(time.perf_counter() - started, 1),
+                "segments": described,
+            },
+            index_file,
+            indent=2,
+        )
+    return ClusterIndex(output_dir)
+
+
+class ClusterIndex:
+    """
+    A persisted segmentation and nearest-neighbor index of the stargazers (see
+    build_index). Loading it memory-maps the embeddings, so opening an index of
+    1M users is instant and a query reads only the lists it probes.
+
+    Arguments:
+        index_dir (str) : Directory written by build_index.
+    """
+
+    def __init__(self, index_dir=None):
+        index_dir = index_dir or os.path.join(RESULTS_DIR, "clusters")
+        with open(os.path.join(index_dir, "index.json")) as index_file:
+            self.meta = json.load(index_file)
+        self.usernames = np.load(os.path.join(index_dir, "usernames.npy"), mmap_mode="r")
+        self.segment_of_row = np.load(os.path.join(index_dir, "segments.npy"), mmap_mode="r")
+        self.embeddings = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r")
+        self.list_centroids = np.load(os.path.join(index_dir, "list_centroids.npy"))
+        self.list_offsets = np.load(os.path.join(index_dir, "list_offsets.npy"))
+        self._rows = None
+
+    def row_of(self, github_username):
+        if self._rows is None:
+            self._rows = pd.Index(np.asarray(self.usernames, dtype=object))
+        if github_username not in self._rows:
+            raise KeyError(f"{github_username} is not in the index")
+        return self._rows.get_loc(github_username)
+
+    def segments(self):
+        """Segments with their number of users and describing terms."""
+        return pd.DataFrame(self.meta["segments"]).set_index("segment")
+
+    def segment(self, github_username):
+        return int(self.segment_of_row[self.row_of(github_username)])
+
+    def members(self, segment):
+        return [str(username) for username in self.usernames[np.flatnonzero(self.segment_of_row == segment)]]
+
+    def similar_users(self, github_username, k=10, nprobe=8):
+        """
+        The k users most similar to a stargazer (cosine of the embeddings), searched
+        in the nprobe lists whose centroids are closest to the user.
+        """
+        query = np.asarray(self.embeddings[self.row_of(github_username)])
+        nprobe = min(nprobe, len(self.list_centroids))
+        probed = np.argpartition(-(self.list_centroids @ query), nprobe - 1)[:nprobe]
+        rows = np.concatenate(
+            [np.arange(self.list_offsets[probe], self.list_offsets[probe + 1]) for probe in probed]
+        )
+        scores = np.concatenate(
+            [self.embeddings[self.list_offsets[probe] : self.list_offsets[probe + 1]] @ query for probe in probed]
+        )
+        keep = rows != self.row_of(github_username)
+        rows, scores = rows[keep], scores[keep]
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return pd.Series(scores[top], index=[str(username) for username in self.usernames[rows[top]]], name="similarity")
@@ -0,0 +1,32 @@
+import hashlib
+
+from utils.llm_inputs import is_trivially_empty
+
+
+def digest(*parts):
+    """
+    Returns a short, stable hash of the given values.
+
+    Empty values (None, NaN, "", "N/A", ...) hash the same, since they do not
+    survive a round trip through an EvaDB table unchanged.
+    """
+    sha = hashlib.sha256()
+    for part in parts:
+        text = "" if is_trivially_empty(part) else str(part)
+        sha.update(text.encode("utf-8"))
+        sha.update(b"\x1f")
+    return sha.hexdigest()[:32]
+
+
+def load_stage_rows(cursor, table_name):
+    """
+    Returns the rows of an existing stage table as {github_username: row},
+    or None if the table predates fingerprints.
+    """
+    rows_df = cursor.query(f"SELECT * FROM {table_name};").df()
+    rows_df.columns = [str(column).split(".")[-1] for column in rows_df.columns]
+    if "fingerprint" not in rows_df.columns or "github_username" not in rows_df.columns:
+        return None
+    rows_df = rows_df.drop(columns=["_row_id"], errors="ignore")
+    rows_df = rows_df.drop_duplicates("github_username", keep="last")
+    return {row["github_username"]: row for row in rows_df.to_dict("records")}
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+
+from utils.profiling import PROFILER
+
+_DEFAULT_REGISTRY_PATH = "evadb_data/function_hashes.json"
+
+
+class FunctionRegistry:
+    """
+    Registers EvaDB functions only when they changed since the last run.
+
+    CREATE OR REPLACE FUNCTION loads the implementation module every time. The
+    registry stores a hash of each statement and its implementation file next
+    to the EvaDB catalog, and skips the statement when both are unchanged and
+    the function is still in the catalog.
+
+    Arguments:
+        cursor : EvaDB cursor.
+        registry_path (str) : JSON file with the hashes. Defaults to the
+                              EVADB_FUNCTION_REGISTRY environment variable or
+                              evadb_data/function_hashes.json.
+    """
+
+    def __init__(self, cursor, registry_path=None):
+        self.cursor = cursor
+        self.registry_path = registry_path or os.environ.get(
+            "EVADB_FUNCTION_REGISTRY", _DEFAULT_REGISTRY_PATH
+        )
+        self.hashes = {}
+        if os.path.exists(self.registry_path):
+            with open(self.registry_path) as registry_file:
+                self.hashes = json.load(registry_file)
+        self._catalog = None
+        self.skipped = 0
+
+    def catalog(self):
+        if self._catalog is None:
+            functions_df = self.cursor.query("SHOW FUNCTIONS;").df()
+            self._catalog = {str(name).lower() for name in functions_df.iloc[:, 0]}
+        return self._catalog
+
+    def register(self, name, statement, impl_path):
+        """Runs the CREATE OR REPLACE FUNCTION statement unless nothing changed. Returns True if it ran."""
+        sha = hashlib.sha256(" ".join(statement.split()).encode("utf-8"))
+        with open(impl_path, "rb") as impl_file:
+            sha.update(impl_file.read())
+        digest = sha.hexdigest()
+
+        if self.hashes.get(name) == digest and name.lower() in self.catalog():
+            self.skipped += 1
+            return False
+
+        with PROFILER.timed("evadb.register_function"):
+            self.cursor.query(statement).df()
+        self.hashes[name] = digest
+        os.makedirs(os.path.dirname(self.registry_path) or ".", exist_ok=True)
+        with open(self.registry_path, "w") as registry_file:
+            json.dump(self.hashes, registry_file, indent=2, sort_keys=True)
+        return True
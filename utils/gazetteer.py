@@ -0,0 +1,167 @@
+import csv
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+from utils.llm_inputs import is_trivially_empty
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.csv")
+
+# Longest place name, in words, looked up in free text
+_MAX_WORDS = 5
+_SEPARATORS = re.compile(r"[,;/|()\[\]\n·•]+| - ")
+_NOISE = re.compile(r"[^a-z0-9'.\- ]+")
+
+
+def normalize(text):
+    """Lowercase ASCII without accents or stray punctuation: "  São Paulo!" -> "sao paulo"."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    return " ".join(_NOISE.sub(" ", text).split()).strip(" .-")
+
+
+@lru_cache(maxsize=None)
+def _index():
+    """
+    Loads the bundled gazetteer (countries, regions, cities and their aliases)
+    into two indexes: names looked up anywhere in a location, and codes of up
+    to three letters (ISO codes, US states, "UK", "SF") only matched as a whole
+    comma-separated part, so "in" or "me" in free text are not places.
+    """
+    entries = []
+    with open(GAZETTEER_PATH, newline="") as gazetteer_file:
+        for row in csv.DictReader(gazetteer_file):
+            if row["kind"] == "country":
+                entries.append((row["kind"], row["name"], row["name"], [row["country"]] + row["aliases"].split("|")))
+            else:
+                entries.append((row["kind"], row["name"], row["country"], row["aliases"].split("|")))
+
+    names, codes = {}, {}
+    for kind, name, country, aliases in entries:
+        for alias in [name] + aliases:
+            key = normalize(alias)
+            if not key:
+                continue
+            index = codes if len(key) <= 3 else names
+            index.setdefault(key, []).append((kind, name, country))
+    return names, codes
+
+
+def _match_names(part, names):
+    """Finds the longest known names in a part, left to right, without overlaps."""
+    words = part.split()
+    matches = []
+    start = 0
+    while start < len(words):
+        for length in range(min(_MAX_WORDS, len(words) - start), 0, -1):
+            candidates = names.get(" ".join(words[start : start + length]))
+            if candidates:
+                matches.append(candidates)
+                start += length
+                break
+        else:
+            start += 1
+    return matches
+
+
+@lru_cache(maxsize=100_000)
+def resolve_location(text):
+    """
+    Resolves a free-text location ("Berlin, DE", "Bengaluru", "SF Bay Area") to a
+    (city, country) pair of gazetteer names; either is None when not found.
+
+    The country is the first of: a country name or three-letter code, a region,
+    a two-letter code (the city's country if it is one of the code's meanings,
+    otherwise a US state or Canadian province, otherwise an ISO country), and
+    finally the country of the city. Names that are both a country and a region
+    (Georgia) are the region when the rest of the location is in its country.
+    """
+    if is_trivially_empty(text):
+        return None, None
+    names, codes = _index()
+    countries, regions, ambiguous, short_codes, cities = [], [], [], [], []
+    for part in _SEPARATORS.split(str(text)):
+        part = normalize(part)
+        if not part:
+            continue
+        if len(part) <= 3 and part in codes:
+            candidates = codes[part]
+            if len(part) == 3 and any(kind == "country" for kind, _, _ in candidates):
+                countries.extend(country for kind, _, country in candidates if kind == "country")
+            else:
+                short_codes.append(candidates)
+            continue
+        for candidates in _match_names(part, names):
+            kinds = {kind for kind, _, _ in candidates}
+            if kinds == {"country"}:
+                countries.append(candidates[0][2])
+            elif "country" in kinds:
+                ambiguous.append(candidates)
+            elif "region" in kinds:
+                regions.append(next(country for kind, _, country in candidates if kind == "region"))
+            else:
+                cities.append(candidates[0])
+
+    city = cities[0] if cities else None
+    evidence = set(regions) | ({city[2]} if city else set())
+    for candidates in short_codes:
+        evidence.update(country for _, _, country in candidates)
+
+    country = countries[0] if countries else None
+    if country is None and ambiguous:
+        candidates = ambiguous[0]
+        in_region = [c for kind, _, c in candidates if kind == "region" and c in evidence]
+        country = in_region[0] if in_region else next(c for kind, _, c in candidates if kind == "country")
+    if country is None and regions:
+        country = regions[0]
+    if country is None and short_codes:
+        candidates = short_codes[0]
+        meanings = [c for _, _, c in candidates]
+        if city is not None and city[2] in meanings:
+            country = city[2]
+        else:
+            by_kind = {kind: c for kind, _, c in reversed(candidates)}
+            country = by_kind.get("region") or by_kind.get("country") or by_kind.get("city")
+        if city is None and any(kind == "city" for kind, _, _ in candidates):
+            city = next(candidate for candidate in candidates if candidate[0] == "city")
+    if country is None and city is not None:
+        country = city[2]
+    return (city[1] if city else None), country
+
+
+def resolve_locations(locations):
+    """Resolves a Series of locations to a DataFrame of city and country, looking up every distinct value once."""
+    locations = pd.Series(locations)
+    codes, uniques = pd.factorize(locations, use_na_sentinel=True)
+    resolved = [resolve_location(location) for location in uniques]
+    cities = [resolved[code][0] if code >= 0 else None for code in codes]
+    countries = [resolved[code][1] if code >= 0 else None for code in codes]
+    return pd.DataFrame({"city": cities, "country": countries}, index=locations.index)
+
+
+def normalize_locations(city, country, user_location=None):
+    """
+    Returns the normalized (city, country) Series of insight rows.
+
+    The GitHub profile location decides when the gazetteer knows it. Otherwise
+    the city and country the LLM read from the profile page are looked up, and
+    a city the gazetteer does not know is kept as written.
+    """
+    from_fields = resolve_locations(
+        [
+            ", ".join(str(value) for value in (row_city, row_country) if not is_trivially_empty(value))
+            for row_city, row_country in zip(city, country)
+        ]
+    )
+    from_fields.index = city.index
+    resolved_country = from_fields["country"]
+    resolved_city = from_fields["city"].where(from_fields["city"].notna(), city)
+    if user_location is not None:
+        from_profile = resolve_locations(user_location)
+        from_profile.index = city.index
+        resolved_country = from_profile["country"].where(from_profile["country"].notna(), resolved_country)
+        resolved_city = from_profile["city"].where(from_profile["city"].notna(), resolved_city)
+    return resolved_city, resolved_country
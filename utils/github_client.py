@@ -0,0 +1,25 @@
+import os
+
+# Optional: another GitHub API and profile page host, e.g. the synthetic GitHub of
+# benchmarks/synthetic_github.py or a GitHub Enterprise server
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_WEB_URL = os.environ.get("GITHUB_WEB_URL", "https://github.com").rstrip("/")
+# Seconds between two users of a GitHub details worker, to stay below the API limit
+GITHUB_THROTTLE_SECONDS = float(os.environ.get("GITHUB_THROTTLE_SECONDS", 3))
+# Optional: minimum seconds between two API requests of a client (PyGithub waits 0.25s by default)
+GITHUB_REQUEST_INTERVAL = os.environ.get("GITHUB_REQUEST_INTERVAL")
+
+
+def github_client(github_pat=None, **kwargs):
+    """A PyGithub client of GITHUB_API_URL, authenticated when a token is given."""
+    from github import Github
+
+    if GITHUB_REQUEST_INTERVAL:
+        kwargs.setdefault("seconds_between_requests", float(GITHUB_REQUEST_INTERVAL))
+    if github_pat:
+        return Github(github_pat, base_url=GITHUB_API_URL, **kwargs)
+    return Github(base_url=GITHUB_API_URL, **kwargs)
+
+
+def profile_page_url(github_username):
+    return f"{GITHUB_WEB_URL}/{github_username}"
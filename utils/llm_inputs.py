@@ -0,0 +1,64 @@
+import pandas as pd
+
+
+# Inputs that carry no information for the model. Any of these (after
+# stripping whitespace and surrounding punctuation) get a canned answer.
+_EMPTY_MARKERS = {"", "n/a", "na", "none", "null", "nan", "[]", "{}"}
+
+
+def is_trivially_empty(text) -> bool:
+    """Returns True if the text is missing or only holds a placeholder like N/A."""
+    if text is None:
+        return True
+    if not isinstance(text, str):
+        if pd.isna(text):
+            return True
+        text = str(text)
+    return text.strip().strip(".,;:[](){}\"' ").lower() in _EMPTY_MARKERS
+
+
+def group_unique_inputs(queries, contents):
+    """
+    Groups identical (query, content) pairs so the model is called once per pair.
+
+    Returns:
+        unique_inputs (list) : The distinct (query, content) pairs, in first-seen order.
+        positions (list) : For every input row, the index into unique_inputs, or -1 if
+                           the row is trivially empty and must not be sent to the model.
+    """
+    unique_inputs = []
+    index_of = {}
+    positions = []
+    for query, content in zip(queries, contents):
+        if is_trivially_empty(content):
+            positions.append(-1)
+            continue
+        key = (query, content)
+        if key not in index_of:
+            index_of[key] = len(unique_inputs)
+            unique_inputs.append(key)
+        positions.append(index_of[key])
+    return unique_inputs, positions
+
+
+def fan_out(unique_answers, positions, empty_response="N/A"):
+    """
+    Expands the per-unique-input answers back to one answer per input row. Inputs
+    past the end of unique_answers (the calls stopped early) are answered None.
+    """
+    return [
+        empty_response if position < 0
+        else unique_answers[position] if position < len(unique_answers)
+        else None
+        for position in positions
+    ]
+
+
+def print_dedup_summary(num_rows, unique_inputs, positions):
+    num_empty = sum(1 for position in positions if position < 0)
+    num_calls_saved = num_rows - len(unique_inputs)
+    print(
+        f"Deduplicated {num_rows} rows into {len(unique_inputs)} unique inputs "
+        f"({num_empty} empty rows answered without a call, "
+        f"{num_calls_saved} model inputs skipped)"
+    )
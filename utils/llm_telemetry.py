@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from utils.profiling import PROFILER
+
+
+# USD per 1000 tokens
+PRICING = {
+    "gpt-3.5-turbo": {"prompt": 0.0015, "completion": 0.002},
+    "gpt-3.5-turbo-16k": {"prompt": 0.003, "completion": 0.004},
+    "gpt-4-0613": {"prompt": 0.03, "completion": 0.06},
+}
+
+# Upper bounds (seconds) of the Prometheus latency histogram buckets
+_LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120]
+
+_DEFAULT_METRICS_PATH = "results/llm_metrics.jsonl"
+_DEFAULT_PROMETHEUS_PATH = "results/llm_metrics_{stage}.prom"
+
+
+class BudgetExceededError(Exception):
+    """
+    Raised when the stage budget is used up before every row was answered.
+
+    responses holds the answers of the batch so far, one per input row, with None
+    for the rows left unanswered, so a caller can keep the paid answers. Callers
+    that store the whole batch must not store it, or the unanswered rows would
+    never be retried.
+    """
+
+    def __init__(self, message, responses=None):
+        super().__init__(message)
+        self.responses = responses
+
+
+def _optional_float(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def call_cost(model, prompt_tokens, completion_tokens):
+    """Returns the price in USD of a single call."""
+    price = PRICING[model]
+    return (
+        price["prompt"] * prompt_tokens + price["completion"] * completion_tokens
+    ) / 1000
+
+
+class LLMTelemetry:
+    """
+    Records latency, tokens, retries and cost of every LLM call made by one stage.
+
+    One instance lives as long as the stage (the LLM function), so its totals and
+    budget cover every batch the stage is called with, not just the last one.
+    Each call is appended as one JSON line to the metrics file, so a crashed or
+    stopped run still leaves its metrics behind. A dollar and/or token budget can be
+    set; once budget_exhausted() is true the stage stops issuing calls instead of
+    overspending, and raises BudgetExceededError with the answers so far.
+
+    Configuration is read from the environment unless passed explicitly:
+        LLM_METRICS_PATH : JSONL file for per-call records (default results/llm_metrics.jsonl).
+        LLM_METRICS_PROM_PATH : Prometheus text format file written at the end of the stage.
+                                A {stage} placeholder is replaced by the stage name.
+        LLM_BUDGET_USD : Maximum spend in USD for the stage.
+        LLM_BUDGET_TOKENS : Maximum prompt + completion tokens for the stage.
+    """
+
+    def __init__(
+        self,
+        stage,
+        model,
+        metrics_path=None,
+        prometheus_path=None,
+        budget_usd=None,
+        budget_tokens=None,
+    ):
+        self.stage = stage
+        self.model = model
+        self.metrics_path = metrics_path or os.environ.get(
+            "LLM_METRICS_PATH", _DEFAULT_METRICS_PATH
+        )
+        self.prometheus_path = prometheus_path or os.environ.get(
+            "LLM_METRICS_PROM_PATH", _DEFAULT_PROMETHEUS_PATH
+        )
+        self.budget_usd = _optional_float(
+            budget_usd if budget_usd is not None else os.environ.get("LLM_BUDGET_USD")
+        )
+        self.budget_tokens = _optional_float(
+            budget_tokens
+            if budget_tokens is not None
+            else os.environ.get("LLM_BUDGET_TOKENS")
+        )
+
+        self.latencies = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.rows = 0
+        self.cost = 0.0
+        self.start_time = time.time()
+        self.lock = threading.Lock()
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    def budget_exhausted(self):
+        if self.budget_usd is not None and self.cost >= self.budget_usd:
+            return True
+        if self.budget_tokens is not None and self.total_tokens >= self.budget_tokens:
+            return True
+        return False
+
+    def budget_message(self):
+        limits = []
+        if self.budget_usd is not None:
+            limits.append(f"${self.cost:.4f} of ${self.budget_usd} spent")
+        if self.budget_tokens is not None:
+            limits.append(f"{self.total_tokens} of {int(self.budget_tokens)} tokens used")
+        return f"{self.stage} stopped after {len(self.latencies)} calls, budget reached: {', '.join(limits)}"
+
+    def check_budget(self):
+        if self.budget_exhausted():
+            self.finish()
+            raise BudgetExceededError(self.budget_message())
+
+    def record_call(self, latency, prompt_tokens, completion_tokens, retries=0, rows=1):
+        cost = call_cost(self.model, prompt_tokens, completion_tokens)
+        with self.lock:
+            self.latencies.append(latency)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.retries += retries
+            self.rows += rows
+            self.cost += cost
+        PROFILER.record(f"openai.{self.model}", latency)
+
+        if self.metrics_path:
+            os.makedirs(os.path.dirname(self.metrics_path) or ".", exist_ok=True)
+            with open(self.metrics_path, "a") as metrics_file:
+                record = {
+                    "timestamp": time.time(),
+                    "stage": self.stage,
+                    "model": self.model,
+                    "latency_s": round(latency, 4),
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "retries": retries,
+                    "rows": rows,
+                    "cost_usd": round(cost, 6),
+                }
+                metrics_file.write(json.dumps(record) + "\n")
+
+    def summary(self):
+        elapsed = max(time.time() - self.start_time, 1e-9)
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "stage": self.stage,
+            "model": self.model,
+            "calls": len(self.latencies),
+            "rows": self.rows,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost_usd": self.cost,
+            "latency_p50_s": float(p50),
+            "latency_p95_s": float(p95),
+            "latency_p99_s": float(p99),
+            "elapsed_s": elapsed,
+            "calls_per_s": len(self.latencies) / elapsed,
+            "rows_per_s": self.rows / elapsed,
+            "tokens_per_s": self.total_tokens / elapsed,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"Total tokens used: {summary['total_tokens']}")
+        print(f"Completion tokens used: {summary['completion_tokens']}")
+        print(f"Prompt tokens used: {summary['prompt_tokens']}")
+        print(f"Total Price: ${summary['cost_usd']:.4f}")
+        print(
+            f"{summary['calls']} calls ({summary['retries']} retries) in "
+            f"{summary['elapsed_s']:.1f}s: "
+            f"p50 {summary['latency_p50_s']:.2f}s, "
+            f"p95 {summary['latency_p95_s']:.2f}s, "
+            f"p99 {summary['latency_p99_s']:.2f}s, "
+            f"{summary['rows_per_s']:.2f} rows/s"
+        )
+
+    def to_prometheus(self):
+        """Renders the stage metrics in the Prometheus text exposition format."""
+        labels = f'stage="{self.stage}",model="{self.model}"'
+        lines = [
+            "# HELP llm_call_latency_seconds Latency of LLM calls.",
+            "# TYPE llm_call_latency_seconds histogram",
+        ]
+        for bucket in _LATENCY_BUCKETS:
+            count = sum(1 for latency in self.latencies if latency <= bucket)
+            lines.append(
+                f'llm_call_latency_seconds_bucket{{{labels},le="{bucket}"}} {count}'
+            )
+        lines.append(
+            f'llm_call_latency_seconds_bucket{{{labels},le="+Inf"}} {len(self.latencies)}'
+        )
+        lines.append(f"llm_call_latency_seconds_sum{{{labels}}} {sum(self.latencies)}")
+        lines.append(f"llm_call_latency_seconds_count{{{labels}}} {len(self.latencies)}")
+
+        counters = [
+            ("llm_prompt_tokens_total", "Prompt tokens sent.", self.prompt_tokens),
+            ("llm_completion_tokens_total", "Completion tokens received.", self.completion_tokens),
+            ("llm_retries_total", "Retried LLM calls.", self.retries),
+            ("llm_rows_total", "Input rows answered by LLM calls.", self.rows),
+            ("llm_cost_usd_total", "Spend in USD.", self.cost),
+        ]
+        for metric, help_text, value in counters:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def finish(self):
+        """Prints the stage summary so far and (over)writes the Prometheus metrics file with the stage totals."""
+        self.print_summary()
+        if self.prometheus_path:
+            path = self.prometheus_path.format(stage=self.stage)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w") as prometheus_file:
+                prometheus_file.write(self.to_prometheus())
@@ -0,0 +1,149 @@
+import re
+
+import pandas as pd
+
+from utils.gazetteer import resolve_locations
+from utils.llm_inputs import is_trivially_empty
+from utils.repo_lists import decode_repos
+
+# Fields filled without the LLM, from the GitHub details and regex matches over the text
+PRE_EXTRACTED_COLUMNS = ["name", "country", "city", "email", "programming_languages", "social_media"]
+
+# Inputs of the pre-extraction besides the text, stored in the details table
+DETAIL_INPUTS = ["user_name", "user_email", "user_blog", "user_twitter_username", "user_location"]
+
+# The only languages the insights report, in the order of the prompt
+LANGUAGES = ["Python", "C++", "JavaScript", "Java"]
+_LANGUAGE_PATTERNS = {
+    "Python": re.compile(r"\bpython\d?\b", re.IGNORECASE),
+    "C++": re.compile(r"(?<![\w+])(?:c\+\+|cpp)(?![\w+])", re.IGNORECASE),
+    "JavaScript": re.compile(r"\b(?:javascript|js|node\.?js)\b", re.IGNORECASE),
+    # "Java" but not "JavaScript" or "Java Script"
+    "Java": re.compile(r"\bjava\b(?!\s*script)", re.IGNORECASE),
+}
+
+_EMAIL_PATTERN = re.compile(r"[a-z0-9._%+-]+@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}", re.IGNORECASE)
+# addresses that are not the user's: GitHub noreply and retina image names (logo@2x.png)
+_NOT_AN_EMAIL = re.compile(r"noreply|\.(?:png|jpe?g|gif|svg|webp)$", re.IGNORECASE)
+
+# Links with a scheme or www., and the bare links of common profile sites, which
+# OCR often reads without a scheme. Bare domains in general are not links ("Node.js").
+_SOCIAL_DOMAINS = (
+    r"linkedin\.com|twitter\.com|x\.com|medium\.com|dev\.to|youtube\.com|instagram\.com|facebook\.com"
+    r"|kaggle\.com|huggingface\.co|stackoverflow\.com|t\.me|mastodon\.social|substack\.com|bsky\.app"
+)
+_LINK_PATTERN = re.compile(
+    rf"(?:https?://|www\.)[^\s,;()<>\[\]\"']+|(?<![\w.@/])(?:{_SOCIAL_DOMAINS})/[^\s,;()<>\[\]\"']+",
+    re.IGNORECASE,
+)
+# links to GitHub itself are the profile page, not a social media link
+_GITHUB_LINK = re.compile(r"^https?://(?:www\.)?(?:github\.com|[\w.-]*githubusercontent\.com)\b", re.IGNORECASE)
+
+
+def _text_series(values, index):
+    return pd.Series(
+        ["" if is_trivially_empty(value) else str(value).strip() for value in values], index=index, dtype=object
+    )
+
+
+def _normalize_link(link):
+    link = link.rstrip(".,:;!?'\"")
+    if not re.match(r"https?://", link, re.IGNORECASE):
+        link = f"https://{link}"
+    return link
+
+
+def _join(values):
+    """Unique values in first-seen order as a field value, or N/A."""
+    unique = list(dict.fromkeys(value for value in values if value))
+    return ", ".join(unique) if unique else "N/A"
+
+
+def details_key(item):
+    """The details an item's pre-extracted fields depend on, for its fingerprint."""
+    languages = sorted({repo["language"] for repo in decode_repos(item.get("user_repos")) if repo["language"]})
+    return [item.get(column) for column in DETAIL_INPUTS] + [",".join(languages)]
+
+
+def pre_extract(items_df, text_column="compact_text"):
+    """
+    Fills the pattern-matchable insight fields of a batch of users without the LLM.
+
+    Arguments:
+        items_df (DataFrame) : The profile text and the GitHub details (user_name,
+                               user_email, user_blog, user_twitter_username,
+                               user_location, user_repos) of every user; missing
+                               details columns count as empty.
+        text_column (str) : Column of the profile text the patterns run over.
+
+    Returns:
+        DataFrame with the PRE_EXTRACTED_COLUMNS in the LLM answer format ("N/A",
+        comma-separated lists) and the index of items_df:
+        - name from the profile;
+        - city and country from the profile location, with the gazetteer;
+        - email from the profile, else the first address in the text;
+        - programming_languages from the languages of the user's repos and the
+          languages named in the text;
+        - social_media from the blog and Twitter handle of the profile and the
+          links in the text.
+
+    The patterns run over the whole column at once with pandas string methods.
+    """
+    index = items_df.index
+
+    def column(name):
+        values = items_df[name] if name in items_df.columns else [None] * len(items_df)
+        return _text_series(values, index)
+
+    texts = column(text_column)
+
+    locations = resolve_locations(column("user_location").replace("", None))
+    locations.index = index
+
+    emails = texts.str.findall(_EMAIL_PATTERN).map(
+        lambda found: next((email for email in found if not _NOT_AN_EMAIL.search(email)), "")
+    )
+    profile_emails = column("user_email")
+    emails = profile_emails.where(profile_emails != "", emails)
+
+    repo_languages = (
+        items_df["user_repos"].map(
+            lambda repos: {repo["language"] for repo in decode_repos(repos) if repo["language"]}
+        )
+        if "user_repos" in items_df.columns
+        else pd.Series([set()] * len(items_df), index=index)
+    )
+    # one "Python, " column per language, concatenated in the order of LANGUAGES
+    languages = pd.DataFrame(
+        {
+            language: (texts.str.contains(pattern) | repo_languages.map(lambda found: language in found)).map(
+                {True: f"{language}, ", False: ""}
+            )
+            for language, pattern in _LANGUAGE_PATTERNS.items()
+        },
+        index=index,
+    )[LANGUAGES].sum(axis=1).str.rstrip(", ")
+
+    twitter = column("user_twitter_username").str.lstrip("@")
+    found_links = texts.str.findall(_LINK_PATTERN)
+    social_media = [
+        _join(
+            link
+            for link in map(_normalize_link, [blog, f"twitter.com/{handle}" if handle else ""] + found)
+            if link != "https://" and not _GITHUB_LINK.match(link)
+        )
+        for blog, handle, found in zip(column("user_blog"), twitter, found_links)
+    ]
+
+    names = column("user_name")
+    return pd.DataFrame(
+        {
+            "name": names.where(names != "", "N/A"),
+            "country": locations["country"].fillna("N/A"),
+            "city": locations["city"].fillna("N/A"),
+            "email": emails.where(emails != "", "N/A"),
+            "programming_languages": languages.where(languages != "", "N/A"),
+            "social_media": social_media,
+        },
+        index=index,
+    )[PRE_EXTRACTED_COLUMNS]
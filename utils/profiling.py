@@ -0,0 +1,142 @@
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    Collects per-stage and per-call timings for a --profile run.
+
+    Stages record wall time, CPU time of the running thread, the peak traced
+    memory while they ran and, optionally, a cProfile dump ({stage}.prof, readable
+    with pstats, snakeviz or flameprof for a flame graph). Calls to external
+    services (GitHub, browser, OCR, OpenAI) are counted and timed with record().
+    Everything is a no-op until enable() is called.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output_dir = None
+        self.use_cprofile = False
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.calls = {}
+        self.sections = {}
+        self.active_stages = 0
+        self.started = None
+
+    def enable(self, output_dir, use_cprofile=True, trace_memory=True):
+        os.makedirs(output_dir, exist_ok=True)
+        self.enabled = True
+        self.output_dir = output_dir
+        self.use_cprofile = use_cprofile
+        self.started = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        with self.lock:
+            # concurrent stages share the process-wide peak
+            if self.active_stages == 0 and tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            self.active_stages += 1
+        profile = None
+        if self.use_cprofile:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiler is already active in this thread
+                profile = None
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            if profile is not None:
+                profile.disable()
+            peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+            with self.lock:
+                self.active_stages -= 1
+                stats = self.stages.setdefault(
+                    name, {"runs": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_memory_mb": 0.0}
+                )
+                stats["runs"] += 1
+                stats["wall_s"] += wall
+                stats["cpu_s"] += cpu
+                stats["peak_memory_mb"] = max(stats["peak_memory_mb"], peak / 2**20)
+                run = stats["runs"]
+            if profile is not None:
+                suffix = "" if run == 1 else f"-{run}"
+                profile.dump_stats(os.path.join(self.output_dir, f"{name}{suffix}.prof"))
+
+    def record(self, name, seconds, count=1):
+        """Adds count calls taking seconds in total to the external call stats of name."""
+        if not self.enabled:
+            return
+        with self.lock:
+            stats = self.calls.setdefault(name, {"calls": 0, "wall_s": 0.0, "max_s": 0.0})
+            stats["calls"] += count
+            stats["wall_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds / max(count, 1))
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def add_section(self, name, data):
+        """Attaches extra data to the report, e.g. the queue waits of a streaming run."""
+        if not self.enabled or data is None:
+            return
+        with self.lock:
+            self.sections[name] = data
+
+    def report(self):
+        return {
+            "wall_s": time.perf_counter() - self.started,
+            "stages": self.stages,
+            "calls": self.calls,
+            **self.sections,
+        }
+
+    def write_report(self):
+        """Prints the run report and writes it to report.json in the output directory."""
+        if not self.enabled:
+            return None
+        report = self.report()
+        path = os.path.join(self.output_dir, "report.json")
+        with open(path, "w") as report_file:
+            json.dump(report, report_file, indent=2, default=str)
+
+        print(f"Run profile ({report['wall_s']:.1f}s total):")
+        for name, stats in sorted(report["stages"].items(), key=lambda item: -item[1]["wall_s"]):
+            print(
+                f"  stage {name:<28} wall {stats['wall_s']:>9.2f}s  cpu {stats['cpu_s']:>9.2f}s  "
+                f"peak {stats['peak_memory_mb']:>8.1f} MB"
+            )
+        for name, stats in sorted(report["calls"].items(), key=lambda item: -item[1]["wall_s"]):
+            print(
+                f"  call  {name:<28} {stats['calls']:>7} calls  wall {stats['wall_s']:>9.2f}s  "
+                f"max {stats['max_s']:.2f}s"
+            )
+        print(f"Profile written to {self.output_dir}")
+        return path
+
+
+# Process-wide profiler; EvaDB runs the functions in the same process
+PROFILER = Profiler()
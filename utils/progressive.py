@@ -0,0 +1,183 @@
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from statistics import NormalDist
+
+import pandas as pd
+
+from utils.llm_inputs import is_trivially_empty
+from utils.results_store import RESULTS_DIR, to_typed_frame
+
+# Free-text topics have a long tail; snapshots keep the most frequent ones
+_TOP_TOPICS = 100
+
+
+def order_stargazers(cursor, repo_name, github_usernames, order="star", seed=0):
+    """
+    Returns the stargazers in processing order.
+
+    "star" keeps the star order. "recent" expects the list fetched newest first
+    (create_stargazer_list with order "recent") and keeps it. "random" is a seeded
+    shuffle (the only order whose running shares are unbiased estimates), and
+    "followers" puts the most followed users first. Follower counts come from the
+    stored {repo}_StargazerDetails, since fetching them for every stargazer would
+    cost as much as the details stage itself; users without stored details follow
+    in star order. On a first run nothing is stored yet, so "followers" is star order.
+    """
+    github_usernames = list(github_usernames)
+    if order == "random":
+        shuffled = github_usernames[:]
+        random.Random(seed).shuffle(shuffled)
+        return shuffled
+    if order == "followers":
+        existing = set(cursor.query("SHOW TABLES;").df().iloc[:, 0].str.lower())
+        followers = {}
+        if f"{repo_name}_StargazerDetails".lower() in existing:
+            details_df = cursor.query(
+                f"SELECT github_username, user_followers FROM {repo_name}_StargazerDetails;"
+            ).df()
+            followers = dict(
+                zip(details_df.iloc[:, 0], pd.to_numeric(details_df.iloc[:, 1], errors="coerce").fillna(-1))
+            )
+        if not followers:
+            print("No stored user details yet, --order followers falls back to star order")
+        # stable sort, so ties and unknown users stay in star order
+        return sorted(github_usernames, key=lambda username: -followers.get(username, -1))
+    return github_usernames
+
+
+class ProgressiveAggregates:
+    """
+    Country, language, topic and topic category distributions maintained row by
+    row while a streaming run is in progress, and written to
+    results/progressive/{repo}.json every refresh_every users.
+
+    Every snapshot tells how far the distributions may still move: the largest
+    change of a share since the previous snapshot and, for a random processing
+    order, the margin of the shares as estimates of the final ones.
+
+    Arguments:
+        repo_name (str) : Repo of the run.
+        total (int) : Number of stargazers the run will process.
+        order (str) : Processing order, recorded in the snapshot.
+        refresh_every (int) : New users between two snapshots.
+        confidence (float) : Confidence level of the margins.
+    """
+
+    def __init__(self, repo_name, total, order="star", refresh_every=50, confidence=0.95, results_dir=None):
+        self.repo_name = repo_name
+        self.total = total
+        self.order = order
+        self.refresh_every = refresh_every
+        self.confidence = confidence
+        self.path = os.path.join(results_dir or RESULTS_DIR, "progressive", f"{repo_name}.json")
+        self.labels = {"country": {}, "languages": {}, "topics": {}, "categories": {}}
+        self.counts = {distribution: Counter() for distribution in self.labels}
+        self.previous_shares = {}
+        self.locations = {}
+        self.unsaved = 0
+        self.started = time.time()
+
+    def _set(self, distribution, username, labels):
+        """Replaces the labels of a user, so a recomputed row is not counted twice."""
+        previous = self.labels[distribution].get(username)
+        if previous is not None:
+            self.counts[distribution].subtract(previous)
+        self.labels[distribution][username] = labels
+        self.counts[distribution].update(labels)
+        return previous is None
+
+    def update(self, suffix, rows):
+        """Sink hook of run_streaming: folds the rows of the insight tables into the distributions."""
+        if suffix == "StargazerDetails":
+            self.locations.update((row["github_username"], row["user_location"]) for row in rows)
+        elif suffix == "StargazerInsights":
+            insights_df = pd.DataFrame(rows)
+            insights_df["user_location"] = insights_df["github_username"].map(self.locations)
+            insights_df = to_typed_frame(insights_df, "insights_gpt35")
+            for row in insights_df.itertuples(index=False):
+                country = "Unknown" if is_trivially_empty(row.country) else row.country
+                new = self._set("country", row.github_username, [country])
+                self._set("languages", row.github_username, list(row.programming_languages))
+                self._set("topics", row.github_username, [topic.lower() for topic in row.topics_of_interest])
+                self.unsaved += new
+        elif suffix == "StargazerInsightsGPT4":
+            insights_df = to_typed_frame(pd.DataFrame(rows), "insights_gpt4")
+            for row in insights_df.itertuples(index=False):
+                # users without any of the three categories count as Other, as in the pie chart
+                self._set("categories", row.github_username, list(row.categories) or ["Other"])
+        if self.unsaved >= self.refresh_every:
+            self.save()
+
+    def snapshot(self):
+        z = NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        distributions = {}
+        for distribution, counts in self.counts.items():
+            users = len(self.labels[distribution])
+            # + drops the labels whose users were all recomputed into other labels
+            most_common = (+counts).most_common(_TOP_TOPICS if distribution == "topics" else None)
+            shares = {label: count / users for label, count in most_common}
+            previous = self.previous_shares.get(distribution, {})
+            drift = (
+                max(abs(shares.get(label, 0.0) - previous.get(label, 0.0)) for label in set(shares) | set(previous))
+                if previous
+                else None
+            )
+            margin = None
+            if self.order == "random" and users > 1:
+                finite_population = max(0.0, 1 - users / max(self.total, users))
+                margin = max(
+                    (z * math.sqrt(share * (1 - share) / users * finite_population) for share in shares.values()),
+                    default=0.0,
+                )
+            distributions[distribution] = {
+                "users": users,
+                "counts": dict(most_common),
+                "shares": shares,
+                "drift": drift,
+                "margin": margin,
+            }
+        return {
+            "repo": self.repo_name,
+            "order": self.order,
+            "processed": len(self.labels["country"]),
+            "total": self.total,
+            "elapsed_s": round(time.time() - self.started, 1),
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "final": False,
+            "distributions": distributions,
+        }
+
+    def save(self, final=False):
+        """Writes a snapshot; readers never see a partially written file."""
+        snapshot = self.snapshot()
+        snapshot["final"] = final
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.tmp", "w") as snapshot_file:
+            json.dump(snapshot, snapshot_file, indent=2)
+        os.replace(f"{self.path}.tmp", self.path)
+
+        self.previous_shares = {
+            distribution: data["shares"] for distribution, data in snapshot["distributions"].items()
+        }
+        self.unsaved = 0
+        categories = snapshot["distributions"]["categories"]
+        stability = "n/a" if categories["drift"] is None else f"{categories['drift']:.1%}"
+        margin = "" if categories["margin"] is None else f", ±{categories['margin']:.1%}"
+        print(
+            f"Progress {snapshot['processed']}/{self.total} users: topic categories moved "
+            f"{stability} since the last snapshot{margin} -> {self.path}"
+        )
+        return snapshot
+
+
+def read_snapshot(repo_name, results_dir=None):
+    """Returns the latest progressive snapshot of a repo, or None."""
+    path = os.path.join(results_dir or RESULTS_DIR, "progressive", f"{repo_name}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as snapshot_file:
+        return json.load(snapshot_file)
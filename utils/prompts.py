@@ -0,0 +1,79 @@
+# Prompts used by the LLM stages of stargazers.py. They are embedded verbatim in
+# EvaDB queries, so they must not contain double quotes.
+
+# GPT-3.5: extract 8 structured fields from the scraped profile text. Only the
+# default SQL mode uses it, without pre-extraction, so the model still fills the
+# country from the city; the gazetteer prefers the profile location when it resolves
+EXTRACTION_PROMPT = """You are given a block of disorganized text extracted from the GitHub user profile of a user using an automated web scraper. The goal is to get structured results from this data.
+                Extract the following fields from the text: name, country, city, email, occupation, programming_languages, topics_of_interest, social_media.
+                If some field is not found, just output fieldname: N/A. Always return all the 8 field names. DO NOT add any additional text to your output.
+                The topic_of_interest field must list a broad range of technical topics that are mentioned in any portion of the text.  This field is the most important, so add as much information as you can. Do not add non-technical interests.
+                The programming_languages field can contain one or more programming languages out of only the following 4 programming languages - Python, C++, JavaScript, Java. Do not include any other language outside these 4 languages in the output. If the user is not interested in any of these 4 programming languages, output N/A.
+                If the country is not available, use the city field to fill the country. For example, if the city is New York, fill the country as United States.
+                If there are social media links, including personal websites, add them to the social media section. Do NOT add social media links that are not present.
+                Here is an example (use it only for the output format, not for the content):
+
+                name: logicx
+                country: United States
+                city: Atlanta
+                email: abc@gatech.edu
+                occupation: PhD student at Georgia Tech
+                programming_languages: Python, Java
+                topics_of_interest: Google Colab, fake data generation, Postgres
+                social_media: https://www.logicx.io, https://www.twitter.com/logicx, https://www.linkedin.com/in/logicx
+                """
+
+# GPT-3.5 after pre-extraction (utils/pre_extraction.py): only the fields
+# that need the model; the others are filled from the GitHub details and regexes
+TOPICS_PROMPT = """You are given a block of disorganized text extracted from the GitHub user profile of a user using an automated web scraper. The goal is to get structured results from this data.
+                Extract the following fields from the text: occupation, topics_of_interest.
+                If some field is not found, just output fieldname: N/A. Always return both field names. DO NOT add any additional text to your output.
+                The topic_of_interest field must list a broad range of technical topics that are mentioned in any portion of the text.  This field is the most important, so add as much information as you can. Do not add non-technical interests.
+                Here is an example (use it only for the output format, not for the content):
+
+                occupation: PhD student at Georgia Tech
+                topics_of_interest: Google Colab, fake data generation, Postgres
+                """
+
+# GPT-4: categorize topics_of_interest, 10 rows per request
+CATEGORIZATION_PROMPT = """You are given 10 rows of input, each row is separated by two new line characters.
+                     Categorize the topics listed in each row into one or more of the following 3 technical areas - Machine Learning, Databases, and Web development. If the topics listed are not related to any of these 3 areas, output a single N/A. Do not miss any input row. Do not add any additional text or numbers to your output.
+                     The output rows must be separated by two new line characters. Each input row must generate exactly one output row. For example, the input row [Recommendation systems, Deep neural networks, Postgres] must generate only the output row [Machine Learning, Databases].
+                     The input row [enterpreneurship, startups, venture capital] must generate the output row N/A.
+                     """
+
+# Single model pass: the 8 extraction fields plus the topic category in one answer,
+# in the default SQL mode (with the country hint, as EXTRACTION_PROMPT)
+FUSED_PROMPT = """You are given a block of disorganized text extracted from the GitHub user profile of a user using an automated web scraper. The goal is to get structured results from this data.
+                Extract the following fields from the text: name, country, city, email, occupation, programming_languages, topics_of_interest, social_media, category.
+                If some field is not found, just output fieldname: N/A. Always return all the 9 field names. DO NOT add any additional text to your output.
+                The topic_of_interest field must list a broad range of technical topics that are mentioned in any portion of the text.  This field is the most important, so add as much information as you can. Do not add non-technical interests.
+                The programming_languages field can contain one or more programming languages out of only the following 4 programming languages - Python, C++, JavaScript, Java. Do not include any other language outside these 4 languages in the output. If the user is not interested in any of these 4 programming languages, output N/A.
+                If the country is not available, use the city field to fill the country. For example, if the city is New York, fill the country as United States.
+                If there are social media links, including personal websites, add them to the social media section. Do NOT add social media links that are not present.
+                The category field must categorize the topics_of_interest into one or more of the following 3 technical areas - Machine Learning, Databases, and Web development. If the topics are not related to any of these 3 areas, output category: N/A.
+                Here is an example (use it only for the output format, not for the content):
+
+                name: logicx
+                country: United States
+                city: Atlanta
+                email: abc@gatech.edu
+                occupation: PhD student at Georgia Tech
+                programming_languages: Python, Java
+                topics_of_interest: Google Colab, fake data generation, Postgres
+                social_media: https://www.logicx.io, https://www.twitter.com/logicx, https://www.linkedin.com/in/logicx
+                category: Machine Learning, Databases
+                """
+
+# Single model pass after pre-extraction: occupation, topics and the topic category
+TOPICS_FUSED_PROMPT = """You are given a block of disorganized text extracted from the GitHub user profile of a user using an automated web scraper. The goal is to get structured results from this data.
+                Extract the following fields from the text: occupation, topics_of_interest, category.
+                If some field is not found, just output fieldname: N/A. Always return all the 3 field names. DO NOT add any additional text to your output.
+                The topic_of_interest field must list a broad range of technical topics that are mentioned in any portion of the text.  This field is the most important, so add as much information as you can. Do not add non-technical interests.
+                The category field must categorize the topics_of_interest into one or more of the following 3 technical areas - Machine Learning, Databases, and Web development. If the topics are not related to any of these 3 areas, output category: N/A.
+                Here is an example (use it only for the output format, not for the content):
+
+                occupation: PhD student at Georgia Tech
+                topics_of_interest: Google Colab, fake data generation, Postgres
+                category: Machine Learning, Databases
+                """
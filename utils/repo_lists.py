@@ -0,0 +1,43 @@
+import heapq
+
+from utils.llm_inputs import is_trivially_empty
+
+# Repos kept per user and list, the most starred first
+MAX_REPOS = 20
+
+
+def compact_repos(repos, min_stars=0, limit=MAX_REPOS):
+    """
+    Returns the most starred repos as (full_name, language, stars) tuples.
+
+    The repos are consumed lazily (e.g. a PyGithub PaginatedList), and only the
+    top `limit` are held in memory, whatever the number of repos of the user.
+    """
+    candidates = (
+        (repo.full_name, repo.language or "", repo.stargazers_count)
+        for repo in repos
+        if repo.stargazers_count > min_stars
+    )
+    return heapq.nlargest(limit, candidates, key=lambda repo: repo[2])
+
+
+def encode_repos(repos):
+    """[("owner/name", "Python", 120), ...] -> "owner/name|Python|120;..." """
+    return ";".join(f"{full_name}|{language}|{stars}" for full_name, language, stars in repos)
+
+
+def decode_repos(text):
+    """
+    Parses a list written by encode_repos. Lists stored by older runs (Python
+    sets of name, description, URL and language) cannot be parsed and decode to [].
+    """
+    if is_trivially_empty(text) or "|" not in str(text):
+        return []
+    repos = []
+    for entry in str(text).split(";"):
+        parts = entry.rsplit("|", 2)
+        if len(parts) != 3 or not parts[2].isdigit():
+            continue
+        full_name, language, stars = parts
+        repos.append({"name": full_name, "language": language or None, "stars": int(stars)})
+    return repos
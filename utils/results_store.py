@@ -0,0 +1,270 @@
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from utils.aggregate_index import AggregateIndex
+from utils.gazetteer import normalize_locations
+from utils.llm_inputs import is_trivially_empty
+from utils.profiling import PROFILER
+from utils.repo_lists import decode_repos
+from utils.topic_categorizer import CATEGORIES
+
+RESULTS_DIR = os.environ.get("RESULTS_DIR", "results")
+
+_TEXT_FIELDS = ["github_username", "name", "country", "city", "email", "occupation"]
+_LIST_FIELDS = ["programming_languages", "topics_of_interest", "social_media"]
+_REPO_LIST = pa.list_(
+    pa.struct([("name", pa.string()), ("language", pa.string()), ("stars", pa.int64())])
+)
+
+# One Parquet dataset per result, partitioned by repo (results/{dataset}/repo={repo}/)
+SCHEMAS = {
+    "insights_gpt35": pa.schema(
+        [(field, pa.string()) for field in _TEXT_FIELDS]
+        + [(field, pa.list_(pa.string())) for field in _LIST_FIELDS]
+        + [("repo", pa.string())]
+    ),
+    "insights_gpt4": pa.schema(
+        [(field, pa.string()) for field in _TEXT_FIELDS]
+        + [(field, pa.list_(pa.string())) for field in _LIST_FIELDS if field != "topics_of_interest"]
+        + [
+            ("category", pa.string()),
+            ("categories", pa.list_(pa.string())),
+            ("repo", pa.string()),
+        ]
+    ),
+    "details": pa.schema(
+        [
+            ("github_username", pa.string()),
+            ("user_name", pa.string()),
+            ("user_login", pa.string()),
+            ("user_following", pa.int64()),
+            ("user_followers", pa.int64()),
+            ("user_email", pa.string()),
+            ("user_id", pa.int64()),
+            ("user_location", pa.string()),
+            ("user_bio", pa.string()),
+            ("user_company", pa.string()),
+            ("user_blog", pa.string()),
+            ("user_url", pa.string()),
+            ("user_twitter_username", pa.string()),
+            ("user_repos", _REPO_LIST),
+            ("user_starred_repos", _REPO_LIST),
+            ("repo", pa.string()),
+        ]
+    ),
+}
+
+
+def _text_or_none(value):
+    return None if is_trivially_empty(value) else str(value).strip()
+
+
+def _split_list(value):
+    """ "Python, C++ , N/A" -> ["Python", "C++"] """
+    if is_trivially_empty(value):
+        return []
+    items = (item.strip() for item in str(value).strip("[]").split(","))
+    return [item for item in items if not is_trivially_empty(item)]
+
+
+def _categories(value):
+    if is_trivially_empty(value):
+        return []
+    value = str(value).lower()
+    return [category for category in CATEGORIES if category.lower() in value]
+
+
+def strip_table_prefixes(table_df):
+    """Renames the columns EvaDB returns for SELECT * ("repo_stargazerdetails.user_bio") to the bare names."""
+    return table_df.rename(columns=lambda column: str(column).split(".")[-1])
+
+
+def to_typed_frame(table_df, dataset):
+    """
+    Converts a table read from EvaDB to the schema of a results dataset: column
+    names without table prefixes, nulls instead of "N/A", lists for the
+    comma-separated fields and repo lists, and integers for counts and IDs.
+    City and country are normalized with the gazetteer, from the user_location
+    column when the rows have one.
+    """
+    table_df = strip_table_prefixes(table_df)
+    if "response" in table_df.columns:
+        table_df = table_df.rename(columns={"response": "category"})
+
+    typed = {}
+    for field in SCHEMAS[dataset]:
+        if field.name == "repo":
+            continue
+        if field.name == "categories":
+            typed[field.name] = table_df["category"].map(_categories)
+        elif field.name not in table_df.columns:
+            empty = [] if pa.types.is_list(field.type) else None
+            typed[field.name] = pd.Series([empty] * len(table_df), index=table_df.index, dtype=object)
+        elif field.type == _REPO_LIST:
+            typed[field.name] = table_df[field.name].map(decode_repos)
+        elif pa.types.is_list(field.type):
+            typed[field.name] = table_df[field.name].map(_split_list)
+        elif pa.types.is_integer(field.type):
+            typed[field.name] = pd.to_numeric(table_df[field.name], errors="coerce").astype("Int64")
+        else:
+            typed[field.name] = table_df[field.name].map(_text_or_none)
+    typed_df = pd.DataFrame(typed, index=table_df.index)
+    if "country" in typed_df.columns:
+        # countries come from the gazetteer, not from the LLM
+        typed_df["city"], typed_df["country"] = normalize_locations(
+            typed_df["city"], typed_df["country"], table_df.get("user_location")
+        )
+    return typed_df.reset_index(drop=True)
+
+
+def record_full_name(name, full_name, results_dir=None):
+    """Records the owner/name of the repo=name partition in results/repos.json."""
+    full_names = repo_full_names(results_dir)
+    if full_names.get(name) == full_name:
+        return
+    full_names[name] = full_name
+    path = os.path.join(results_dir or RESULTS_DIR, "repos.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as repos_file:
+        json.dump(full_names, repos_file, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def repo_full_names(results_dir=None):
+    """{repo: owner/name} of the exported repos; repos exported before it was recorded are missing."""
+    path = os.path.join(results_dir or RESULTS_DIR, "repos.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as repos_file:
+        return json.load(repos_file)
+
+
+def open_aggregates(results_dir=None):
+    """The aggregate index of the results, results/aggregates.sqlite."""
+    return AggregateIndex(os.path.join(results_dir or RESULTS_DIR, "aggregates.sqlite"))
+
+
+def _index_keys(table_df, typed_df):
+    """
+    The users of the rows in the aggregate index: their usernames, else the EvaDB
+    row IDs for batch-mode tables created before the usernames were selected. None
+    when the rows have neither.
+    """
+    usernames = typed_df["github_username"]
+    if usernames.notna().all():
+        return usernames
+    row_ids = strip_table_prefixes(table_df).get("_row_id")
+    if row_ids is not None and row_ids.notna().all():
+        return pd.Series([f"_row_id:{row_id}" for row_id in row_ids], dtype=object)
+    return None
+
+
+def write_results(table_df, dataset, repo, results_dir=None):
+    """
+    Replaces the partition of a repo in a results dataset with the rows of an EvaDB
+    table, and applies the changed rows to the aggregate index. Repos whose rows
+    cannot be told apart are removed from the index, and their charts are counted
+    from the results.
+    """
+    typed_df = to_typed_frame(table_df, dataset)
+    typed_df["repo"] = repo
+    table = pa.Table.from_pandas(typed_df, schema=SCHEMAS[dataset], preserve_index=False)
+    path = os.path.join(results_dir or RESULTS_DIR, dataset)
+    pq.write_to_dataset(
+        table,
+        root_path=path,
+        partition_cols=["repo"],
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+    )
+
+    keys = _index_keys(table_df, typed_df)
+    aggregates = open_aggregates(results_dir)
+    try:
+        if keys is None:
+            aggregates.remove(repo)
+        else:
+            aggregates.update_from_frame(typed_df, dataset, repo, keys)
+    finally:
+        aggregates.close()
+    return path
+
+
+def export_tables(cursor, tables_name, name, github_usernames=None, results_dir=None):
+    """
+    Writes the details and insight tables to the repo=name partition of the
+    results/{details,insights_gpt35,insights_gpt4} Parquet datasets,
+    optionally only for some users (the tables shared by several repos).
+    """
+    locations = None
+    for table, dataset in [
+        ("StargazerDetails", "details"),
+        ("StargazerInsights", "insights_gpt35"),
+        ("StargazerInsightsGPT4", "insights_gpt4"),
+    ]:
+        select_query = strip_table_prefixes(cursor.query(f"SELECT * FROM {tables_name}_{table};").df())
+        # batch-mode tables created before the usernames were selected have none
+        has_usernames = "github_username" in select_query.columns
+        if dataset == "details":
+            if has_usernames and "user_location" in select_query.columns:
+                locations = dict(zip(select_query["github_username"], select_query["user_location"]))
+        elif has_usernames and locations is not None:
+            # the profile location decides the country of the insight rows
+            select_query["user_location"] = select_query["github_username"].map(locations)
+        if github_usernames is not None:
+            if not has_usernames:
+                raise ValueError(f"{tables_name}_{table} has no github_username to select the users of {name}")
+            select_query = select_query[select_query["github_username"].isin(github_usernames)]
+        with PROFILER.stage("export"):
+            path = write_results(select_query, dataset, name, results_dir=results_dir)
+        print(f"Saved {len(select_query)} rows to {path}")
+
+
+def read_results_table(dataset, repos=None, columns=None, filters=None, results_dir=None):
+    """
+    Reads a results dataset as a pyarrow Table. Only the requested columns are
+    read, and the repo partitions and row groups that cannot match the filters
+    are skipped.
+
+    Arguments:
+        dataset (str) : "insights_gpt35", "insights_gpt4" or "details".
+        repos (list) : Optional repo names to read.
+        columns (list) : Optional columns to read.
+        filters (list) : Optional pyarrow filters, e.g. [("user_followers", ">", 100)].
+    """
+    filters = list(filters or [])
+    if repos is not None:
+        filters.append(("repo", "in", list(repos)))
+    return pq.read_table(
+        os.path.join(results_dir or RESULTS_DIR, dataset),
+        columns=columns,
+        filters=filters or None,
+        schema=SCHEMAS[dataset],
+        partitioning="hive",
+    )
+
+
+def iter_results_batches(dataset, repos=None, columns=None, batch_size=65_536, results_dir=None):
+    """
+    Yields the rows of a results dataset as pyarrow RecordBatches of up to
+    batch_size rows, so a dataset of any size is scanned in bounded memory.
+    Yields nothing when the dataset was never written.
+    """
+    path = os.path.join(results_dir or RESULTS_DIR, dataset)
+    if not os.path.isdir(path):
+        return
+    dataset = ds.dataset(path, schema=SCHEMAS[dataset], format="parquet", partitioning="hive")
+    row_filter = ds.field("repo").isin(list(repos)) if repos is not None else None
+    yield from dataset.to_batches(columns=columns, filter=row_filter, batch_size=batch_size)
+
+
+def read_results(dataset, repos=None, columns=None, filters=None, results_dir=None):
+    """Reads a results dataset as a DataFrame; see read_results_table for the arguments."""
+    table = read_results_table(dataset, repos, columns, filters, results_dir)
+    # nullable integers, so missing follower counts do not turn the column into floats
+    return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
@@ -0,0 +1,179 @@
+import os
+import random
+import threading
+import time
+
+
+# openai error classes of invalid or unauthorized requests, which fail the same
+# way on every attempt (openai<1 and openai>=1 names)
+_PERMANENT_ERRORS = {
+    "InvalidRequestError",
+    "BadRequestError",
+    "AuthenticationError",
+    "PermissionError",
+    "PermissionDeniedError",
+    "InvalidAPIType",
+    "SignatureVerificationError",
+}
+_RATE_LIMIT_ERRORS = {"RateLimitError"}
+# bad request, unauthorized, forbidden, unknown model or endpoint, unprocessable
+_PERMANENT_STATUS = {400, 401, 403, 404, 422}
+
+PERMANENT = "permanent"
+RATE_LIMIT = "rate_limit"
+TRANSIENT = "transient"
+
+
+def classify_error(error):
+    """
+    Returns PERMANENT, RATE_LIMIT or TRANSIENT for an exception raised by an API call.
+
+    Only invalid-request and authentication errors of the openai client, and
+    quota exhaustion, are permanent. Anything else, including errors raised
+    outside the client, is retried.
+    """
+    if not type(error).__module__.startswith("openai"):
+        return TRANSIENT
+    name = type(error).__name__
+    status = getattr(error, "http_status", None) or getattr(error, "status_code", None)
+    message = str(error).lower()
+    if name in _RATE_LIMIT_ERRORS or status == 429:
+        # quota exhaustion is reported as a rate limit but never recovers by waiting
+        if "insufficient_quota" in message or "exceeded your current quota" in message:
+            return PERMANENT
+        return RATE_LIMIT
+    if name in _PERMANENT_ERRORS or status in _PERMANENT_STATUS:
+        return PERMANENT
+    if "maximum context length" in message:
+        return PERMANENT
+    return TRANSIENT
+
+
+def retry_after_seconds(error):
+    """Returns the server's Retry-After hint in seconds, if the error carries one."""
+    headers = getattr(error, "headers", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    except AttributeError:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Pauses every caller sharing the breaker after a rate limit or a run of failures.
+
+    When one request is rate limited, all concurrent requests wait out the same
+    pause instead of each hitting the API and backing off on its own. After
+    failure_threshold consecutive failures the breaker stays open for cooldown seconds.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.open_until = 0.0
+        self.consecutive_failures = 0
+
+    def wait(self, sleep=time.sleep):
+        while True:
+            with self.lock:
+                remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            sleep(remaining)
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self, pause):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                pause = max(pause, self.cooldown)
+            self.open_until = max(self.open_until, time.monotonic() + pause)
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_circuit_breaker(name):
+    """Returns the process-wide breaker for a service, creating it on first use."""
+    with _BREAKERS_LOCK:
+        if name not in _BREAKERS:
+            _BREAKERS[name] = CircuitBreaker()
+        return _BREAKERS[name]
+
+
+class RetryPolicy:
+    """
+    Retries transient and rate-limit failures with exponential backoff and full jitter.
+
+    Permanent errors of the openai client (invalid requests, context length,
+    authentication, quota) are raised immediately. A server Retry-After hint is used as the minimum wait. Rate limits
+    open the shared circuit breaker so concurrent callers back off together.
+
+    Arguments:
+        max_attempts (int) : Total attempts per call, including the first one.
+        base_delay (float) : Backoff ceiling in seconds for the first retry; doubles per attempt.
+        max_delay (float) : Upper bound of the backoff ceiling in seconds.
+        breaker (CircuitBreaker) : Breaker shared by all callers of the same service.
+    """
+
+    def __init__(
+        self,
+        max_attempts=None,
+        base_delay=None,
+        max_delay=None,
+        breaker=None,
+        sleep=time.sleep,
+        rng=None,
+    ):
+        self.max_attempts = int(max_attempts or os.environ.get("OPENAI_MAX_ATTEMPTS", 6))
+        self.base_delay = float(base_delay or os.environ.get("OPENAI_RETRY_BASE_DELAY", 1.0))
+        self.max_delay = float(max_delay or os.environ.get("OPENAI_RETRY_MAX_DELAY", 60.0))
+        self.breaker = breaker or get_circuit_breaker("openai")
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+
+    def backoff(self, attempt):
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return self.rng.uniform(0, ceiling)
+
+    def call(self, function, *args, **kwargs):
+        """
+        Calls function until it succeeds, a permanent error occurs or the attempts run out.
+
+        Returns:
+            result : The return value of function.
+            retries (int) : The number of failed attempts before the successful one.
+        """
+        for attempt in range(self.max_attempts):
+            self.breaker.wait(self.sleep)
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == PERMANENT or attempt == self.max_attempts - 1:
+                    raise
+                delay = self.backoff(attempt)
+                retry_after = retry_after_seconds(e)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                print(
+                    f"Retrying after {kind} error ({type(e).__name__}: {e}) "
+                    f"in {delay:.1f}s, attempt {attempt + 2}/{self.max_attempts}"
+                )
+                if kind == RATE_LIMIT:
+                    self.breaker.record_failure(delay)
+                else:
+                    self.breaker.record_failure(0.0)
+                    self.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result, attempt
@@ -0,0 +1,122 @@
+import math
+import random
+from statistics import NormalDist
+
+
+class StratifiedSample:
+    """
+    A growing stratified random sample of the stargazers.
+
+    The stargazer list is in star order, so consecutive slices of it are strata
+    by star date: early adopters and recent stargazers are both represented
+    whatever the sample size. Each stratum is shuffled once with a fixed seed and
+    the sample is a prefix of every shuffled stratum, so growing the sample keeps
+    all users sampled so far and a re-run with the same seed draws the same users.
+
+    Arguments:
+        usernames (list) : The population, in star order.
+        num_strata (int) : Number of star date strata; 1 is a simple random sample.
+        seed (int) : Seed of the shuffles.
+    """
+
+    def __init__(self, usernames, num_strata=5, seed=0):
+        usernames = list(usernames)
+        num_strata = max(1, min(num_strata, len(usernames)))
+        bounds = [round(i * len(usernames) / num_strata) for i in range(num_strata + 1)]
+        rng = random.Random(seed)
+        self.strata = []
+        for start, end in zip(bounds, bounds[1:]):
+            stratum = usernames[start:end]
+            rng.shuffle(stratum)
+            self.strata.append(stratum)
+        self.population = len(usernames)
+        self.taken = [0] * len(self.strata)
+
+    def _allocation(self, size):
+        """Proportional allocation of size users, at least 2 per stratum for its variance."""
+        shares = [size * len(stratum) / self.population for stratum in self.strata]
+        counts = [min(len(stratum), max(2, math.floor(share))) for stratum, share in zip(self.strata, shares)]
+        # largest remainders get the users lost to rounding down
+        by_remainder = sorted(range(len(shares)), key=lambda h: shares[h] - math.floor(shares[h]), reverse=True)
+        for h in by_remainder:
+            if sum(counts) >= size:
+                break
+            if counts[h] < len(self.strata[h]):
+                counts[h] += 1
+        return counts
+
+    def grow(self, size):
+        """Grows the sample to about size users (never shrinks it). Returns the whole sample."""
+        size = min(size, self.population)
+        self.taken = [max(taken, count) for taken, count in zip(self.taken, self._allocation(size))]
+        return self.usernames()
+
+    def usernames(self):
+        return [username for stratum, taken in zip(self.strata, self.taken) for username in stratum[:taken]]
+
+    def __len__(self):
+        return sum(self.taken)
+
+
+def estimate_shares(sample, labels, confidence=0.95):
+    """
+    Estimates the share of the population carrying each label, with its confidence interval.
+
+    Arguments:
+        sample (StratifiedSample) : The sample the labels were computed for.
+        labels (dict) : {github_username: list of labels}; sampled users missing from it
+                        (e.g. a failed scrape) are left out of their stratum.
+        confidence (float) : Confidence level of the intervals.
+
+    Returns:
+        estimates (dict) : {label: {"share", "low", "high", "margin"}}, by decreasing share.
+        responded (int) : Number of sampled users with labels.
+    """
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    strata = []
+    for stratum, taken in zip(sample.strata, sample.taken):
+        sampled = [labels[username] for username in stratum[:taken] if username in labels]
+        if sampled:
+            strata.append((len(stratum), sampled))
+    if not strata:
+        return {}, 0
+
+    # strata without any labeled user are left out and the others reweighted
+    covered = sum(size for size, _ in strata)
+    all_labels = sorted({label for _, sampled in strata for user_labels in sampled for label in user_labels})
+    estimates = {}
+    for label in all_labels:
+        share = variance = 0.0
+        for size, sampled in strata:
+            weight = size / covered
+            n = len(sampled)
+            hits = sum(label in user_labels for user_labels in sampled)
+            share += weight * hits / n
+            # add-one smoothing, so a label not seen in a small stratum is not taken as certain
+            smoothed = (hits + 1) / (n + 2)
+            finite_population = 1 - n / size
+            variance += weight**2 * finite_population * smoothed * (1 - smoothed) / max(n - 1, 1)
+        margin = z * math.sqrt(variance)
+        estimates[label] = {
+            "share": share,
+            "low": max(0.0, share - margin),
+            "high": min(1.0, share + margin),
+            "margin": margin,
+        }
+    estimates = dict(sorted(estimates.items(), key=lambda item: -item[1]["share"]))
+    return estimates, sum(len(sampled) for _, sampled in strata)
+
+
+def required_size(estimates, target_margin, population, confidence=0.95):
+    """
+    Sample size at which the widest interval of estimates is expected to shrink to
+    target_margin, for proportional allocation and a finite population.
+    """
+    if not estimates:
+        return 0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    worst = max(estimate["share"] * (1 - estimate["share"]) for estimate in estimates.values())
+    # never plan with less than the variance of a 5% share
+    worst = max(worst, 0.05 * 0.95)
+    size = z**2 * worst / target_margin**2
+    return math.ceil(size / (1 + size / population))
@@ -0,0 +1,304 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from utils.fingerprints import digest
+from utils.stargazer_stages import (
+    budget_limits,
+    budgets_exhausted,
+    build_stages,
+    changed_rows,
+    prepare_tables,
+    remaining_budgets,
+    stage_spend,
+    write_rows,
+)
+from utils.streaming_pipeline import StreamingPipeline
+from utils.work_queue import WorkQueue
+
+DEFAULT_QUEUE_PATH = "evadb_data/work_queue.sqlite"
+
+
+def _json_default(value):
+    # numpy scalars of the rows read from EvaDB
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def results_dir_of(queue_path, job):
+    return os.path.join(os.path.dirname(os.path.abspath(queue_path)), "shard_results", job)
+
+
+def plan_units(github_usernames, previous_rows, unit_size):
+    """
+    Splits the users into units of unit_size, in stargazer order. Every unit carries
+    the stored rows of its users, so a worker can skip unchanged users without the
+    EvaDB catalog. The unit key hashes the payload, so an interrupted run resumes
+    its finished units and a changed one is recomputed.
+    """
+    units = []
+    for start in range(0, len(github_usernames), unit_size):
+        usernames = github_usernames[start : start + unit_size]
+        payload = {
+            "usernames": usernames,
+            "previous_rows": {
+                suffix: {username: rows[username] for username in usernames if username in rows}
+                for suffix, rows in previous_rows.items()
+            },
+        }
+        payload = json.loads(json.dumps(payload, default=_json_default))
+        units.append((digest(json.dumps(payload, sort_keys=True)), payload))
+    return units
+
+
+def process_unit(config, payload, github_pat, details_workers=1, scrape_workers=1, budgets=None):
+    """
+    Runs the users of one unit through all stages, the LLM stages limited to budgets
+    (see remaining_budgets). Returns ({suffix: changed rows}, LLM spend of the unit).
+    """
+    previous_rows = payload["previous_rows"]
+    stages, producer = build_stages(
+        github_pat,
+        config["prompt_token_budget"],
+        config["categorizer_min_confidence"],
+        previous_rows,
+        fused_model=config["fused_model"],
+        details_workers=details_workers,
+        scrape_workers=scrape_workers,
+        budgets=budgets,
+    )
+    results = {suffix: [] for suffix in producer}
+
+    def sink(suffix, rows):
+        results[suffix].extend(changed_rows(rows, producer[suffix], previous_rows.get(suffix, {})))
+
+    pipeline = StreamingPipeline(stages, sink=sink)
+    pipeline.run({"github_username": username} for username in payload["usernames"])
+    return results, stage_spend(stages)
+
+
+def job_budgets(queue, job):
+    """What is left of the job's LLM budget after the spend of all its units so far."""
+    return remaining_budgets(queue.spend(job), queue.config(job).get("llm_budget"))
+
+
+class _LeaseKeeper:
+    """Renews the lease of a unit from a background thread while it is processed."""
+
+    def __init__(self, queue_path, job, unit, owner, lease_seconds):
+        self.args = (queue_path, job, unit, owner, lease_seconds)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        queue_path, job, unit, owner, lease_seconds = self.args
+        # sqlite connections belong to the thread that opened them
+        queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+        try:
+            while not self.stopped.wait(lease_seconds / 3):
+                if not queue.renew(job, unit, owner):
+                    print(f"Lost the lease of unit {unit}")
+                    return
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def run_worker(
+    queue_path,
+    github_pat,
+    owner=None,
+    details_workers=1,
+    scrape_workers=1,
+    lease_seconds=600.0,
+    idle_timeout=60.0,
+    poll_interval=5.0,
+):
+    """
+    Claims and processes units until the queue has had no open units for idle_timeout
+    seconds. Any number of workers may run on this host or on others sharing the
+    queue's filesystem. The changed rows of every unit are written to
+    shard_results/{job}/{unit}.json next to the queue. Returns the number of units processed.
+
+    The LLM budget of a job covers all its units: the spend of every unit is added
+    up in the queue, each unit gets what is left, and no more units of a job are
+    claimed once it is used up.
+    """
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+    processed = 0
+    idle_since = time.monotonic()
+    out_of_budget = set()
+    try:
+        while True:
+            for job in queue.jobs():
+                if job not in out_of_budget and budgets_exhausted(job_budgets(queue, job)):
+                    print(f"[{owner}] The LLM budget of {job} is used up, not claiming its units")
+                    out_of_budget.add(job)
+            claimed = queue.claim(owner, skip_jobs=out_of_budget)
+            if claimed is None:
+                counts = queue.counts()
+                if counts.get("leased"):
+                    # a lease may still expire and be handed out again
+                    idle_since = time.monotonic()
+                elif time.monotonic() - idle_since > idle_timeout:
+                    return processed
+                time.sleep(poll_interval)
+                continue
+
+            job, unit, payload = claimed
+            print(f"[{owner}] Processing unit {unit} of {job} ({len(payload['usernames'])} users)")
+            try:
+                with _LeaseKeeper(queue_path, job, unit, owner, lease_seconds):
+                    results, spent = process_unit(
+                        queue.config(job),
+                        payload,
+                        github_pat,
+                        details_workers,
+                        scrape_workers,
+                        budgets=job_budgets(queue, job),
+                    )
+                queue.add_spend(job, spent)
+                results_dir = results_dir_of(queue_path, job)
+                os.makedirs(results_dir, exist_ok=True)
+                path = os.path.join(results_dir, f"{unit}.json")
+                # written under a temporary name, so a merge never reads half a file
+                with open(f"{path}.{owner.replace(':', '-')}.tmp", "w") as results_file:
+                    json.dump(results, results_file, default=_json_default)
+                os.replace(results_file.name, path)
+                queue.complete(job, unit, owner)
+                processed += 1
+            except Exception as e:
+                print(f"[{owner}] Unit {unit} failed: {str(e)}")
+                queue.fail(job, unit, owner, e)
+            idle_since = time.monotonic()
+    finally:
+        queue.close()
+
+
+def merge_results(cursor, queue, job, tables, previous_rows):
+    """
+    Writes the results of the finished units to the EvaDB tables, in unit order and
+    sorted by user within a unit, so the tables do not depend on which worker
+    finished first. Returns the keys of the units that failed.
+    """
+    results_dir = results_dir_of(queue.path, job)
+    failed = []
+    for unit, status, error in queue.units(job):
+        if status != "done":
+            print(f"Unit {unit} {status}: {error}")
+            failed.append(unit)
+            continue
+        with open(os.path.join(results_dir, f"{unit}.json")) as results_file:
+            results = json.load(results_file)
+        for suffix in sorted(results):
+            rows = sorted(results[suffix], key=lambda row: row["github_username"])
+            if rows:
+                write_rows(cursor, tables[suffix], suffix, rows, previous_rows.get(suffix, {}))
+                print(f"Merged {len(rows)} rows of unit {unit} into {tables[suffix]}")
+    return failed
+
+
+def run_sharded(
+    cursor,
+    repo_name,
+    github_usernames,
+    github_pat,
+    prompt_token_budget,
+    categorizer_min_confidence,
+    fused_model=None,
+    queue_path=DEFAULT_QUEUE_PATH,
+    unit_size=25,
+    local_workers=1,
+    lease_seconds=600.0,
+    poll_interval=10.0,
+):
+    """
+    Splits the stargazers into units in a shared work queue, starts local_workers
+    worker processes, waits for every unit to finish (including units claimed by
+    workers on other hosts) and merges the results into the per-stage tables.
+
+    The tables and fingerprints are the same as in streaming mode, so sharded and
+    streaming runs can be mixed.
+    """
+    github_usernames = list(github_usernames)
+    tables, previous_rows = prepare_tables(cursor, repo_name, github_usernames, remove_missing=True)
+    config = {
+        "repo_name": repo_name,
+        "prompt_token_budget": prompt_token_budget,
+        "categorizer_min_confidence": categorizer_min_confidence,
+        "fused_model": fused_model,
+        # one budget for the whole job, whichever workers run its units
+        "llm_budget": budget_limits(),
+    }
+    queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+    job = repo_name
+    queue.plan(job, config, plan_units(github_usernames, previous_rows, unit_size))
+    print(f"Queued {len(github_usernames)} users of {repo_name} in {queue_path}: {queue.counts(job)}")
+
+    workers = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                os.path.abspath(sys.argv[0]),
+                "--worker",
+                "--queue",
+                queue_path,
+                "--lease-seconds",
+                str(lease_seconds),
+                # the units are already planned, so an idle local worker is done
+                "--idle-timeout",
+                "0",
+            ]
+        )
+        for _ in range(local_workers)
+    ]
+    exited = set()
+    try:
+        while True:
+            for worker in workers:
+                if worker.pid in exited or worker.poll() is None:
+                    continue
+                exited.add(worker.pid)
+                # a crashed worker's lease would otherwise only be handed out again after lease_seconds
+                released = queue.release(
+                    f"{socket.gethostname()}:{worker.pid}", f"worker exited with code {worker.returncode}"
+                )
+                if worker.returncode != 0 or released:
+                    print(f"Worker {worker.pid} exited with code {worker.returncode}, released {released} units")
+            queue.expire()
+            counts = queue.counts(job)
+            if not counts.get("pending") and not counts.get("leased"):
+                break
+            if workers and len(exited) == len(workers) and counts.get("pending"):
+                # units still leased may belong to workers on other hosts, pending ones have no one left to claim them
+                print(f"All local workers exited with units of {repo_name} left: {counts}")
+                if budgets_exhausted(job_budgets(queue, job)):
+                    print(f"The LLM budget of {repo_name} is used up, the next run continues with the rest")
+                break
+            print(f"Shards of {repo_name}: {counts}")
+            time.sleep(poll_interval)
+    finally:
+        for worker in workers:
+            worker.wait()
+
+    failed = merge_results(cursor, queue, job, tables, previous_rows)
+    if failed:
+        print(f"{len(failed)} units failed; their users are retried by the next run")
+    queue.clear(job)
+    shutil.rmtree(results_dir_of(queue_path, job), ignore_errors=True)
+    queue.close()
+    return failed
@@ -0,0 +1,505 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from functions.string_to_dataframe import _OUTPUT_COLUMNS, parse_responses
+from utils.fingerprints import digest, load_stage_rows
+from utils.github_client import GITHUB_THROTTLE_SECONDS, github_client
+from utils.llm_telemetry import BudgetExceededError
+from utils.pre_extraction import details_key, pre_extract
+from utils.prompts import CATEGORIZATION_PROMPT, TOPICS_FUSED_PROMPT, TOPICS_PROMPT
+from utils.streaming_pipeline import Stage, StopPipeline, StreamingPipeline
+
+# Items a stage failed on, one JSON lines file per repo; the same directory as
+# results_store.RESULTS_DIR, without importing pyarrow at startup
+FAILURES_DIR = os.path.join(os.environ.get("RESULTS_DIR", "results"), "failed")
+
+# Schemas of the per-user tables. Every row is keyed by github_username and
+# carries the fingerprint of the inputs it was computed from.
+DETAIL_COLUMNS = [
+    ("github_username", "TEXT(1000)"),
+    ("user_name", "TEXT(1000)"),
+    ("user_login", "TEXT(1000)"),
+    ("user_following", "INTEGER"),
+    ("user_followers", "INTEGER"),
+    ("user_email", "TEXT(1000)"),
+    ("user_id", "INTEGER"),
+    ("user_location", "TEXT(1000)"),
+    ("user_bio", "TEXT(1000)"),
+    ("user_company", "TEXT(1000)"),
+    ("user_blog", "TEXT(1000)"),
+    ("user_url", "TEXT(1000)"),
+    ("user_twitter_username", "TEXT(1000)"),
+    ("user_repos", "TEXT(1000)"),
+    ("user_starred_repos", "TEXT(1000)"),
+]
+_FINGERPRINT_COLUMN = ("fingerprint", "TEXT(100)")
+TABLE_COLUMNS = {
+    "StargazerDetails": DETAIL_COLUMNS + [_FINGERPRINT_COLUMN],
+    "StargazerScrapedDetails": [
+        ("github_username", "TEXT(1000)"),
+        ("extracted_text", "TEXT(1000)"),
+        _FINGERPRINT_COLUMN,
+    ],
+    "StargazerCompactText": [
+        ("github_username", "TEXT(1000)"),
+        ("compact_text", "TEXT(1000)"),
+        ("original_tokens", "INTEGER"),
+        ("tokens_saved", "INTEGER"),
+        _FINGERPRINT_COLUMN,
+    ],
+    "StargazerInsights": [("github_username", "TEXT(1000)")]
+    + [(column, "TEXT(1000)") for column in _OUTPUT_COLUMNS]
+    + [_FINGERPRINT_COLUMN],
+    "StargazerInsightsGPT4": [("github_username", "TEXT(1000)")]
+    + [(column, "TEXT(1000)") for column in _OUTPUT_COLUMNS if column != "topics_of_interest"]
+    + [("response", "TEXT(1000)"), _FINGERPRINT_COLUMN],
+}
+
+
+def incremental(name, fingerprint, compute, sinks, previous_rows):
+    """
+    Wraps the batch function of a stage so that only items whose input fingerprint
+    changed since the last run are recomputed.
+
+    The fingerprint of every item is stored under "{name}_fingerprint". Items whose
+    fingerprint matches the row stored in every sink table reuse those rows.
+    """
+    key = f"{name}_fingerprint"
+
+    def run(batch):
+        batch = [{**item, key: fingerprint(item)} for item in batch]
+        outputs = [None] * len(batch)
+        stale = []
+        for index, item in enumerate(batch):
+            rows = [previous_rows.get(table, {}).get(item["github_username"]) for table in sinks]
+            if all(row is not None and row["fingerprint"] == item[key] for row in rows):
+                for row in rows:
+                    item = {**row, **item}
+                outputs[index] = item
+            else:
+                stale.append(index)
+        if stale:
+            for index, item in zip(stale, compute([batch[index] for index in stale])):
+                outputs[index] = item
+        return outputs
+
+    return run
+
+
+def details_stage(github_pat, previous_rows, workers=1, throttle_seconds=GITHUB_THROTTLE_SECONDS):
+    """
+    GitHub profile, repos and starred repos of one user per call.
+
+    The fingerprint is the profile's updated_at, read from the same API call that
+    fetches the profile; the repos are only listed again when it changed. Users
+    whose details could not be fetched are not passed on to the next stages.
+    """
+    from functions.github_user_details import user_details
+
+    github = github_client(github_pat)
+    stored_rows = previous_rows.get("StargazerDetails", {})
+
+    def fetch(batch):
+        outputs = []
+        for item in batch:
+            try:
+                user = github.get_user(item["github_username"])
+                fingerprint = digest(user.updated_at)
+                row = stored_rows.get(item["github_username"])
+                if row is not None and row["fingerprint"] == fingerprint:
+                    outputs.append({**row, **item, "details_fingerprint": fingerprint})
+                    continue
+                item = {**item, **user_details(user), "details_fingerprint": fingerprint}
+            except Exception:
+                # back off like the batch mode, usually the API limit; the pipeline
+                # records the failed user, who is not scraped and is retried by the next run
+                time.sleep(300)
+                raise
+            outputs.append(item)
+            # same pace as the batch mode (30s every 10 users) per worker
+            time.sleep(throttle_seconds)
+        return outputs
+
+    return Stage("details", fetch, workers=workers, sinks=["StargazerDetails"])
+
+
+def scrape_stage(previous_rows, workers=1):
+    """Browser screenshot and OCR of the profile page of one user per call."""
+    from functions.webpage_text_extractor import extract_text_from_url
+
+    def fingerprint(item):
+        # the profile page only changes along with the profile
+        return item["details_fingerprint"]
+
+    def scrape(batch):
+        return [
+            {**item, "extracted_text": extract_text_from_url(item["github_username"])}
+            for item in batch
+        ]
+
+    sinks = ["StargazerScrapedDetails"]
+    return Stage(
+        "scrape",
+        incremental("scrape", fingerprint, scrape, sinks, previous_rows),
+        workers=workers,
+        sinks=sinks,
+    )
+
+
+def compact_stage(model, max_tokens, previous_rows):
+    from functions.text_compactor import TextCompactor
+
+    compactor = TextCompactor(model=model, max_tokens=max_tokens)
+
+    def fingerprint(item):
+        return digest(item["extracted_text"], model, max_tokens)
+
+    def compact(batch):
+        compact_df = compactor.forward(
+            pd.DataFrame({"extracted_text": [item["extracted_text"] for item in batch]})
+        )
+        return [{**item, **row} for item, row in zip(batch, compact_df.to_dict("records"))]
+
+    sinks = ["StargazerCompactText"]
+    return Stage(
+        "compact",
+        incremental("compact", fingerprint, compact, sinks, previous_rows),
+        batch_size=32,
+        batch_timeout=0.5,
+        sinks=sinks,
+    )
+
+
+def extract_stage(model, previous_rows, fused=False, batch_size=20, budget=(None, None)):
+    """
+    Profile fields from the compacted text. Name, location, email, languages and
+    links are pre-extracted from the GitHub details and the text without the LLM,
+    which is only asked for the occupation and topics. With fused=True the same
+    call also returns the topic category, and the item is complete after this stage.
+    budget is the (USD, tokens) limit of the stage's calls, see remaining_budgets.
+    """
+    from functions.chatgpt import ChatGPT
+
+    llm = ChatGPT(model=model, budget_usd=budget[0], budget_tokens=budget[1])
+    prompt = TOPICS_FUSED_PROMPT if fused else TOPICS_PROMPT
+    columns = ["occupation", "topics_of_interest"] + (["category"] if fused else [])
+
+    def fingerprint(item):
+        return digest(item["compact_text"], prompt, model, *details_key(item))
+
+    def extract(batch):
+        fields_df = pre_extract(pd.DataFrame(batch))
+        try:
+            response_df = llm.forward(
+                pd.DataFrame(
+                    {
+                        "query": [prompt] * len(batch),
+                        "content": [item["compact_text"] for item in batch],
+                    }
+                )
+            )
+        except BudgetExceededError as e:
+            response_df = e.responses
+        llm_df = parse_responses(response_df["response"], columns)
+        if fused:
+            llm_df = llm_df.rename(columns={"category": "response"})
+        fields_df = pd.concat([fields_df.reset_index(drop=True), llm_df], axis=1)
+        outputs = [
+            {**item, **row}
+            for item, row, response in zip(batch, fields_df.to_dict("records"), response_df["response"])
+            # rows left unanswered when the budget ran out are not stored, the next run retries them
+            if response is not None
+        ]
+        if llm.telemetry.budget_exhausted():
+            raise StopPipeline(llm.telemetry.budget_message(), outputs)
+        return outputs
+
+    sinks = ["StargazerInsights", "StargazerInsightsGPT4"] if fused else ["StargazerInsights"]
+    return Stage(
+        "extract",
+        incremental("extract", fingerprint, extract, sinks, previous_rows),
+        batch_size=batch_size,
+        batch_timeout=5.0,
+        sinks=sinks,
+        telemetry=llm.telemetry,
+    )
+
+
+def categorize_stage(model, min_confidence, previous_rows, batch_size=50, budget=(None, None)):
+    from functions.topic_categorizer import TopicCategorizer
+
+    categorizer = TopicCategorizer(
+        model=model, min_confidence=min_confidence, budget_usd=budget[0], budget_tokens=budget[1]
+    )
+
+    def fingerprint(item):
+        return digest(item["topics_of_interest"], CATEGORIZATION_PROMPT, model, min_confidence)
+
+    def categorize(batch):
+        try:
+            response_df = categorizer.forward(
+                pd.DataFrame(
+                    {
+                        "query": [CATEGORIZATION_PROMPT] * len(batch),
+                        "content": [item["topics_of_interest"] for item in batch],
+                    }
+                )
+            )
+        except BudgetExceededError as e:
+            response_df = e.responses
+        outputs = [
+            {**item, "response": response}
+            for item, response in zip(batch, response_df["response"])
+            if response is not None
+        ]
+        if categorizer.llm.telemetry.budget_exhausted():
+            raise StopPipeline(categorizer.llm.telemetry.budget_message(), outputs)
+        return outputs
+
+    sinks = ["StargazerInsightsGPT4"]
+    return Stage(
+        "categorize",
+        incremental("categorize", fingerprint, categorize, sinks, previous_rows),
+        batch_size=batch_size,
+        batch_timeout=5.0,
+        sinks=sinks,
+        telemetry=categorizer.llm.telemetry,
+    )
+
+
+def budget_limits():
+    """The (USD, tokens) budget of every LLM stage from LLM_BUDGET_USD / LLM_BUDGET_TOKENS, None if not set."""
+    return os.environ.get("LLM_BUDGET_USD") or None, os.environ.get("LLM_BUDGET_TOKENS") or None
+
+
+def remaining_budgets(spent=None, limits=None):
+    """
+    {stage name: (USD, tokens)} left of the limits (default budget_limits()) for each
+    LLM stage, after the spend of earlier runs of the same job ({stage: {"usd", "tokens"}},
+    see stage_spend). A budget that is not set is None.
+    """
+    spent = spent or {}
+    budget_usd, budget_tokens = limits or budget_limits()
+    budgets = {}
+    for stage in ("extract", "categorize"):
+        stage_spent = spent.get(stage, {})
+        budgets[stage] = (
+            None if budget_usd is None else max(float(budget_usd) - stage_spent.get("usd", 0.0), 0.0),
+            None if budget_tokens is None else max(float(budget_tokens) - stage_spent.get("tokens", 0), 0),
+        )
+    return budgets
+
+
+def budgets_exhausted(budgets):
+    """True when an LLM stage has no budget left, so a new run would stop right away."""
+    return any(limit is not None and limit <= 0 for budget in budgets.values() for limit in budget)
+
+
+def stage_spend(stages):
+    """{stage name: {"usd", "tokens"}} spent by the LLM stages of a run."""
+    return {
+        stage.name: {"usd": stage.telemetry.cost, "tokens": stage.telemetry.total_tokens}
+        for stage in stages
+        if stage.telemetry is not None
+    }
+
+
+def add_spend(spent, more):
+    """The sum of two stage_spend results."""
+    return {
+        stage: {
+            key: spent.get(stage, {}).get(key, 0) + more.get(stage, {}).get(key, 0)
+            for key in ("usd", "tokens")
+        }
+        for stage in set(spent) | set(more)
+    }
+
+
+def delete_users(cursor, table_name, github_usernames, chunk_size=50):
+    """Deletes the rows of the given users from an EvaDB table."""
+    github_usernames = list(github_usernames)
+    for start in range(0, len(github_usernames), chunk_size):
+        condition = " OR ".join(
+            f"github_username = '{username}'"
+            for username in github_usernames[start : start + chunk_size]
+        )
+        cursor.query(f"DELETE FROM {table_name} WHERE {condition};").df()
+
+
+def load_rows(cursor, table_name, columns, rows):
+    """Appends rows to an EvaDB table through a temporary CSV file."""
+    rows_df = pd.DataFrame(rows).reindex(columns=[name for name, _ in columns])
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as csv_file:
+        rows_df.to_csv(csv_file, index=False)
+    try:
+        cursor.load(file_regex=csv_file.name, table_name=table_name, format="CSV").df()
+    finally:
+        os.remove(csv_file.name)
+
+
+def prepare_tables(cursor, repo_name, github_usernames, remove_missing=False):
+    """
+    Creates the per-stage tables of a repo and returns ({suffix: table}, previous_rows).
+
+    previous_rows holds the stored rows of every table as {suffix: {github_username: row}}.
+    Tables created by the batch mode have no fingerprints and are rebuilt. With
+    remove_missing=True, for a run over the full stargazer list, the rows of users
+    who are no longer in github_usernames are deleted; runs over a sample keep them.
+    """
+    tables = {suffix: f"{repo_name}_{suffix}" for suffix in TABLE_COLUMNS}
+    github_usernames = set(github_usernames)
+
+    existing = set(cursor.query("SHOW TABLES;").df().iloc[:, 0].str.lower())
+    previous_rows = {}
+    for suffix, columns in TABLE_COLUMNS.items():
+        if tables[suffix].lower() in existing:
+            rows = load_stage_rows(cursor, tables[suffix])
+            if rows is None:
+                # created by the batch mode, without keys to patch rows in place
+                print(f"Rebuilding {tables[suffix]}, it has no fingerprints")
+                cursor.drop_table(tables[suffix], if_exists=True).df()
+            else:
+                previous_rows[suffix] = rows
+                removed = set(rows) - github_usernames if remove_missing else set()
+                if removed:
+                    print(f"Removing {len(removed)} former stargazers from {tables[suffix]}")
+                    delete_users(cursor, tables[suffix], removed)
+        schema = ", ".join(f"{name} {column_type}" for name, column_type in columns)
+        cursor.query(f"CREATE TABLE IF NOT EXISTS {tables[suffix]} ({schema});").df()
+    return tables, previous_rows
+
+
+def build_stages(
+    github_pat,
+    prompt_token_budget,
+    categorizer_min_confidence,
+    previous_rows,
+    fused_model=None,
+    details_workers=1,
+    scrape_workers=1,
+    budgets=None,
+):
+    """
+    Returns the stages of a streaming run and {suffix: name of the stage writing it}.
+    budgets ({stage name: (USD, tokens)}, see remaining_budgets) limits the LLM stages;
+    by default each one gets the whole LLM_BUDGET_USD / LLM_BUDGET_TOKENS.
+    """
+    budgets = budgets or {}
+    stages = [
+        details_stage(github_pat, previous_rows, workers=details_workers),
+        scrape_stage(previous_rows, workers=scrape_workers),
+        compact_stage("gpt-3.5-turbo-16k", prompt_token_budget, previous_rows),
+    ]
+    if fused_model is not None:
+        stages.append(
+            extract_stage(fused_model, previous_rows, fused=True, budget=budgets.get("extract", (None, None)))
+        )
+    else:
+        stages.append(
+            extract_stage("gpt-3.5-turbo-16k", previous_rows, budget=budgets.get("extract", (None, None)))
+        )
+        stages.append(
+            categorize_stage(
+                "gpt-4-0613",
+                categorizer_min_confidence,
+                previous_rows,
+                budget=budgets.get("categorize", (None, None)),
+            )
+        )
+    producer = {table: stage.name for stage in stages for table in stage.sinks}
+    return stages, producer
+
+
+def changed_rows(rows, stage_name, stored):
+    """Returns the rows, with their fingerprint, that are missing from or differ from the stored rows."""
+    key = f"{stage_name}_fingerprint"
+    return [
+        {**row, "fingerprint": row[key]}
+        for row in rows
+        if row[key] is not None
+        and (row["github_username"] not in stored
+             or stored[row["github_username"]]["fingerprint"] != row[key])
+    ]
+
+
+def write_rows(cursor, table_name, suffix, rows, stored):
+    """Replaces the stored rows of the users in rows, which must carry their fingerprint."""
+    replaced = [row["github_username"] for row in rows if row["github_username"] in stored]
+    delete_users(cursor, table_name, replaced)
+    load_rows(cursor, table_name, TABLE_COLUMNS[suffix], rows)
+    return replaced
+
+
+def run_streaming(
+    cursor,
+    repo_name,
+    github_usernames,
+    github_pat,
+    prompt_token_budget,
+    categorizer_min_confidence,
+    fused_model=None,
+    details_workers=1,
+    scrape_workers=1,
+    queue_size=64,
+    on_rows=None,
+    remove_missing=False,
+    budgets=None,
+):
+    """
+    Streams every stargazer through details -> scrape -> compact -> extract -> categorize
+    and writes the rows of each stage to the per-stage tables as soon as they are ready.
+
+    The stages run concurrently, so the GitHub API, the browser/OCR and the OpenAI
+    calls overlap and the total wall time approaches that of the slowest stage.
+
+    Every row stores a fingerprint of its inputs (profile updated_at, content hash,
+    prompt, model). On a re-run only users whose fingerprint changed are recomputed
+    and their rows replaced in place. With remove_missing=True, when github_usernames
+    is the full stargazer list, the rows of users who unstarred the repo are removed.
+
+    Users are processed in the order of github_usernames. on_rows(suffix, rows), if
+    given, sees every row written to or reused from a table as it arrives.
+    Items a stage failed on are written to results/failed/{repo_name}.jsonl; they
+    have no stored rows, so the next run retries them.
+
+    budgets limits the LLM stages, see build_stages. The returned stats include
+    the spend of every LLM stage under "llm_spend", so a caller running several
+    rounds can pass what is left to the next one.
+    """
+    github_usernames = list(github_usernames)
+    tables, previous_rows = prepare_tables(cursor, repo_name, github_usernames, remove_missing)
+    stages, producer = build_stages(
+        github_pat,
+        prompt_token_budget,
+        categorizer_min_confidence,
+        previous_rows,
+        fused_model=fused_model,
+        details_workers=details_workers,
+        scrape_workers=scrape_workers,
+        budgets=budgets,
+    )
+
+    def sink(suffix, rows):
+        if on_rows is not None:
+            on_rows(suffix, rows)
+        stored = previous_rows.get(suffix, {})
+        changed = changed_rows(rows, producer[suffix], stored)
+        if not changed:
+            return
+        replaced = write_rows(cursor, tables[suffix], suffix, changed, stored)
+        print(
+            f"Wrote {len(changed)} rows to {tables[suffix]} "
+            f"({len(replaced)} replaced, {len(rows) - len(changed)} unchanged)"
+        )
+
+    pipeline = StreamingPipeline(
+        stages,
+        queue_size=queue_size,
+        sink=sink,
+        failures_path=os.path.join(FAILURES_DIR, f"{repo_name}.jsonl"),
+    )
+    stats = pipeline.run({"github_username": username} for username in github_usernames)
+    return {**stats, "llm_spend": stage_spend(stages)}
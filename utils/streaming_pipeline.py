@@ -0,0 +1,285 @@
+import json
+import os
+import queue
+import threading
+import time
+
+from utils.profiling import PROFILER
+
+
+# Marks the end of a stage's input
+_END = object()
+
+
+class StopPipeline(Exception):
+    """
+    Raised by a stage function to stop the whole pipeline, e.g. when an LLM budget
+    is used up. The outputs it carries are still delivered to the later stages and
+    the sinks; the feeder stops and this stage and the earlier ones skip the items
+    still queued, so no new work is started upstream.
+    """
+
+    def __init__(self, message, outputs=()):
+        super().__init__(message)
+        self.outputs = list(outputs)
+
+
+class Stage:
+    """
+    One step of a streaming pipeline.
+
+    Arguments:
+        name (str) : Stage name used in stats and sink events.
+        function (callable) : Takes a list of items and returns the list of output items.
+                              Items missing from the output are dropped from the stream.
+        workers (int) : Number of threads running the function concurrently.
+        batch_size (int) : Maximum number of items passed to one function call.
+        batch_timeout (float) : Seconds to wait for a batch to fill before running it partially filled.
+        sinks (list) : Optional table names; every output item is also handed to the pipeline sink for each.
+        telemetry (LLMTelemetry) : Optional telemetry of the stage's LLM calls, to read its spend after a run.
+    """
+
+    def __init__(self, name, function, workers=1, batch_size=1, batch_timeout=1.0, sinks=(), telemetry=None):
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.sinks = list(sinks)
+        self.telemetry = telemetry
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.failed = 0
+        self.skipped = 0
+        self.busy_s = 0.0
+        self.input_wait_s = 0.0
+        self.output_wait_s = 0.0
+        self.lock = threading.Lock()
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "busy_s": round(self.busy_s, 3),
+            "input_wait_s": round(self.input_wait_s, 3),
+            "output_wait_s": round(self.output_wait_s, 3),
+        }
+
+
+class StreamingPipeline:
+    """
+    Runs items through a chain of stages connected by bounded queues.
+
+    Every stage has its own worker threads, so a slow stage (e.g. the browser)
+    overlaps with the others (GitHub API, OCR, LLM calls) instead of waiting for
+    the previous stage to finish the whole table. Bounded queues keep memory flat:
+    a fast stage blocks once its output queue is full.
+
+    Output items of stages with sinks are delivered, in batches, to the
+    sink callback on the thread that calls run(), so the callback may use
+    resources that are not thread-safe (such as an EvaDB cursor).
+
+    Items of a batch whose stage function raised are dropped from the stream. With
+    failures_path, each of them is written there as a JSON line with the stage and
+    the error, replacing the file of the previous run.
+    """
+
+    def __init__(
+        self, stages, queue_size=64, sink=None, sink_batch_size=50, sink_interval=5.0, failures_path=None
+    ):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.sink = sink
+        self.sink_batch_size = sink_batch_size
+        self.sink_interval = sink_interval
+        self.stats = [StageStats(stage.name) for stage in stages]
+        self.stopping = threading.Event()
+        self.stop_reason = None
+        # this stage and the ones before it skip their input once stopping is set
+        self.stopped_at = 0
+        self.failures_path = failures_path
+        self.failures_lock = threading.Lock()
+
+    def _next_batch(self, stage, inbox, stats):
+        """Blocks for the first item, then collects up to batch_size items. Returns (batch, ended)."""
+        batch = []
+        start = time.perf_counter()
+        item = inbox.get()
+        with stats.lock:
+            stats.input_wait_s += time.perf_counter() - start
+        if item is _END:
+            return batch, True
+        batch.append(item)
+        deadline = time.monotonic() + stage.batch_timeout
+        while len(batch) < stage.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = inbox.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _END:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _worker(self, index, inbox, outbox, sink_queue, remaining_workers):
+        # one profile per worker thread, cProfile only sees the thread it runs in
+        with PROFILER.stage(f"streaming.{self.stages[index].name}"):
+            self._work(index, inbox, outbox, sink_queue, remaining_workers)
+
+    def _work(self, index, inbox, outbox, sink_queue, remaining_workers):
+        stage = self.stages[index]
+        stats = self.stats[index]
+        while True:
+            batch, ended = self._next_batch(stage, inbox, stats)
+            if batch and self.stopping.is_set() and index <= self.stopped_at:
+                # drain the queue without starting new work
+                with stats.lock:
+                    stats.skipped += len(batch)
+                batch = []
+            if batch:
+                start = time.perf_counter()
+                try:
+                    outputs = stage.function(batch)
+                except StopPipeline as e:
+                    print(f"Stage {stage.name} stopped the pipeline: {e}")
+                    outputs = e.outputs
+                    self.stop_reason = str(e)
+                    self.stopped_at = max(self.stopped_at, index)
+                    self.stopping.set()
+                except Exception as e:
+                    print(f"Stage {stage.name} failed on {len(batch)} items: {e}")
+                    outputs = []
+                    with stats.lock:
+                        stats.failed += len(batch)
+                    self._record_failures(stage, batch, e)
+                elapsed = time.perf_counter() - start
+                with stats.lock:
+                    stats.busy_s += elapsed
+                    stats.items += len(outputs)
+
+                start = time.perf_counter()
+                for output in outputs:
+                    if outbox is not None:
+                        outbox.put(output)
+                    for table in stage.sinks:
+                        sink_queue.put((table, output))
+                with stats.lock:
+                    stats.output_wait_s += time.perf_counter() - start
+            if ended:
+                # let the sibling workers of this stage see the end as well
+                inbox.put(_END)
+                with remaining_workers[index]["lock"]:
+                    remaining_workers[index]["count"] -= 1
+                    last = remaining_workers[index]["count"] == 0
+                if last:
+                    if outbox is not None:
+                        outbox.put(_END)
+                    else:
+                        sink_queue.put(_END)
+                return
+
+    def _record_failures(self, stage, batch, error):
+        if self.failures_path is None:
+            return
+        with self.failures_lock:
+            with open(self.failures_path, "a") as failures_file:
+                for item in batch:
+                    record = {"stage": stage.name, "error": str(error), "item": item}
+                    # numpy scalars and timestamps of the stored rows
+                    failures_file.write(json.dumps(record, default=str) + "\n")
+
+    def run(self, items):
+        """Streams items through all stages and returns the per-stage stats."""
+        if self.failures_path is not None:
+            os.makedirs(os.path.dirname(self.failures_path) or ".", exist_ok=True)
+            # the failures of the previous run are retried by this one
+            if os.path.exists(self.failures_path):
+                os.remove(self.failures_path)
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        sink_queue = queue.Queue(maxsize=self.queue_size * 4)
+        remaining_workers = [
+            {"count": stage.workers, "lock": threading.Lock()} for stage in self.stages
+        ]
+
+        threads = []
+        for index, stage in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(index, queues[index], outbox, sink_queue, remaining_workers),
+                    name=f"{stage.name}-worker",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        def feed():
+            for item in items:
+                if self.stopping.is_set():
+                    break
+                queues[0].put(item)
+            queues[0].put(_END)
+
+        threading.Thread(target=feed, name="feeder", daemon=True).start()
+
+        start = time.perf_counter()
+        pending = {}
+        last_flush = time.monotonic()
+        while True:
+            try:
+                event = sink_queue.get(timeout=self.sink_interval)
+            except queue.Empty:
+                event = None
+            if event is _END:
+                break
+            if event is not None:
+                table, row = event
+                pending.setdefault(table, []).append(row)
+            if (
+                any(len(rows) >= self.sink_batch_size for rows in pending.values())
+                or time.monotonic() - last_flush >= self.sink_interval
+            ):
+                self._flush(pending)
+                last_flush = time.monotonic()
+        self._flush(pending)
+
+        for thread in threads:
+            thread.join()
+
+        wall = time.perf_counter() - start
+        summary = [stats.as_dict() for stats in self.stats]
+        print(f"Streaming pipeline finished in {wall:.1f}s")
+        for stage_stats in summary:
+            print(
+                f"  {stage_stats['stage']:<12} {stage_stats['items']:>7} items "
+                f"({stage_stats['failed']} failed, {stage_stats['skipped']} skipped), busy {stage_stats['busy_s']:.1f}s, "
+                f"waiting for input {stage_stats['input_wait_s']:.1f}s, "
+                f"blocked on output {stage_stats['output_wait_s']:.1f}s"
+            )
+        failed = sum(stage_stats["failed"] for stage_stats in summary)
+        if failed and self.failures_path is not None:
+            print(f"{failed} failed items written to {self.failures_path}")
+        if self.stop_reason:
+            print(f"Stopped early: {self.stop_reason}")
+        PROFILER.add_section("streaming", {"wall_s": wall, "stages": summary, "stopped": self.stop_reason})
+        return {"wall_s": wall, "stages": summary, "stopped": self.stop_reason}
+
+    def _flush(self, pending):
+        if self.sink is None:
+            pending.clear()
+            return
+        for table, rows in pending.items():
+            if rows:
+                with PROFILER.timed(f"sink.{table}"):
+                    self.sink(table, rows)
+        pending.clear()
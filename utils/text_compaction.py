@@ -0,0 +1,142 @@
+import re
+
+
+# Standalone OCR fragments that are GitHub profile UI chrome, not profile facts.
+_BOILERPLATE_FRAGMENTS = {
+    "follow",
+    "unfollow",
+    "sponsor",
+    "sponsors",
+    "sponsoring",
+    "achievements",
+    "achievement",
+    "highlights",
+    "pro",
+    "pinned",
+    "public",
+    "public template",
+    "public archive",
+    "private",
+    "forked from",
+    "organizations",
+    "block or report",
+    "report abuse",
+    "popular repositories",
+    "customize your pins",
+    "contribution activity",
+    "contribution settings",
+    "show more activity",
+    "learn how we count contributions",
+    "less",
+    "more",
+    "overview",
+    "repositories",
+    "projects",
+    "packages",
+    "stars",
+    "edit profile",
+    "beta",
+    "send feedback",
+    "x",
+}
+
+# Boilerplate phrases that OCR often glues to neighbouring text.
+_BOILERPLATE_PATTERN = re.compile(
+    r"\b(?:"
+    r"block or report \S+"
+    r"|learn how we count contributions"
+    r"|\d[\d,]* contributions? in (?:the last year|\d{4})"
+    r"|seeing something unexpected\? take a look at the github profile guide\.?"
+    r"|customize your pins"
+    r"|show more activity"
+    r")",
+    re.IGNORECASE,
+)
+
+# Contribution graph axis labels, e.g. "Jan Feb Mar" or "Mon Wed Fri".
+_CALENDAR_LABEL = (
+    r"jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|mon|tue|wed|thu|fri|sat|sun"
+)
+_CALENDAR_PATTERN = re.compile(
+    rf"^(?:(?:{_CALENDAR_LABEL})\.?\s*)+$", re.IGNORECASE
+)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def strip_boilerplate(text: str) -> str:
+    """
+    Removes GitHub UI chrome from OCR text, collapses whitespace and drops
+    duplicate fragments (e.g. repeated pin cards). Fragments are the lines of
+    the OCR output.
+    """
+    seen = set()
+    fragments = []
+    for line in text.splitlines():
+        line = _BOILERPLATE_PATTERN.sub(" ", line)
+        line = _WHITESPACE_PATTERN.sub(" ", line).strip()
+        if not line:
+            continue
+        key = line.lower()
+        if key in _BOILERPLATE_FRAGMENTS or _CALENDAR_PATTERN.match(line):
+            continue
+        if key in seen:
+            continue
+        seen.add(key)
+        fragments.append(line)
+    return "\n".join(fragments)
+
+
+class CharacterEncoding:
+    """
+    Stand-in for a tiktoken encoding when the model's encoding cannot be loaded;
+    tiktoken downloads it on first use, which fails offline. Every chunk of
+    chars_per_token characters counts as one token, about the rate of English text.
+    """
+
+    def __init__(self, chars_per_token=4):
+        self.chars_per_token = chars_per_token
+
+    def encode(self, text):
+        size = self.chars_per_token
+        return [text[start : start + size] for start in range(0, len(text), size)]
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+def token_encoding(model):
+    """The tiktoken encoding of the model, or a CharacterEncoding estimate if it is not available."""
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        print(f"Estimating {model} tokens from characters, its encoding is not available: {e}")
+        return CharacterEncoding()
+
+
+def truncate_to_budget(text: str, encoding, max_tokens: int):
+    """Caps the text at max_tokens tokens. Returns the text and its token count."""
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text, len(tokens)
+    return encoding.decode(tokens[:max_tokens]), max_tokens
+
+
+def compact_text(text, encoding, max_tokens: int):
+    """
+    Compacts one row of OCR text for the LLM prompt.
+
+    Returns:
+        compact (str) : The compacted text.
+        original_tokens (int) : Token count of the input text.
+        compact_tokens (int) : Token count of the compacted text.
+    """
+    if not isinstance(text, str):
+        return "", 0, 0
+    original_tokens = len(encoding.encode(text))
+    compact, compact_tokens = truncate_to_budget(
+        strip_boilerplate(text), encoding, max_tokens
+    )
+    return compact, original_tokens, compact_tokens
@@ -0,0 +1,196 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.llm_inputs import is_trivially_empty
+
+
+CATEGORIES = ["Machine Learning", "Databases", "Web development"]
+NOT_APPLICABLE = "N/A"
+
+# Curated topic phrases per category. NOT_APPLICABLE holds technical and
+# non-technical topics outside the three areas, so rows made of them can be
+# answered N/A with confidence instead of being sent to the LLM.
+CATEGORY_ALIASES = {
+    "Machine Learning": [
+        "machine learning", "ml", "deep learning", "artificial intelligence", "ai",
+        "neural networks", "deep neural networks", "reinforcement learning",
+        "computer vision", "image processing", "object detection", "image segmentation",
+        "natural language processing", "nlp", "large language models", "llm", "llms",
+        "generative ai", "gpt", "chatgpt", "transformers", "bert", "diffusion models",
+        "stable diffusion", "speech recognition", "recommendation systems",
+        "recommender systems", "data science", "data mining", "pytorch", "tensorflow",
+        "keras", "scikit-learn", "sklearn", "jax", "hugging face", "huggingface",
+        "langchain", "prompt engineering", "mlops", "model training", "embeddings",
+        "vector search", "predictive modeling", "statistics", "time series forecasting",
+        "autonomous driving", "robotics", "kaggle", "pandas", "numpy", "jupyter",
+        "feature engineering", "classification", "clustering", "gan", "cnn", "rnn",
+    ],
+    "Databases": [
+        "databases", "database", "database systems", "sql", "nosql", "postgres",
+        "postgresql", "mysql", "sqlite", "mariadb", "oracle database", "mongodb",
+        "redis", "cassandra", "cockroachdb", "clickhouse", "duckdb", "elasticsearch",
+        "neo4j", "graph databases", "vector databases", "dynamodb", "snowflake",
+        "bigquery", "data warehousing", "data warehouse", "data lakes", "etl",
+        "data engineering", "query optimization", "query processing", "indexing",
+        "transactions", "distributed databases", "distributed systems", "storage engines",
+        "olap", "oltp", "key value stores", "apache spark", "spark", "hadoop", "kafka",
+        "database administration", "data modeling", "sharding", "replication",
+    ],
+    "Web development": [
+        "web development", "web", "web applications", "web apps", "frontend",
+        "front end", "backend", "back end", "full stack", "fullstack", "javascript",
+        "typescript", "html", "css", "react", "reactjs", "react.js", "next.js", "nextjs",
+        "vue", "vue.js", "angular", "svelte", "node.js", "nodejs", "node", "express",
+        "django", "flask", "fastapi", "ruby on rails", "rails", "php", "laravel",
+        "wordpress", "rest apis", "rest api", "graphql", "web design", "ui design",
+        "ux design", "tailwind", "bootstrap", "jquery", "webpack", "web3", "pwa",
+        "browser extensions", "spring boot", "asp.net", "websockets", "web scraping",
+    ],
+    NOT_APPLICABLE: [
+        "startups", "entrepreneurship", "venture capital", "product management",
+        "marketing", "finance", "investing", "blockchain", "cryptocurrency", "crypto",
+        "devops", "cloud computing", "kubernetes", "docker", "linux", "operating systems",
+        "embedded systems", "iot", "hardware", "game development", "games", "unity",
+        "mobile development", "android", "ios", "swift", "kotlin", "cybersecurity",
+        "security", "networking", "compilers", "open source", "rust", "go", "golang",
+        "c++", "java", "c", "python", "design", "music", "photography", "education",
+        "teaching", "writing", "open-source", "git", "github", "automation", "testing",
+    ],
+}
+
+_CLASSES = CATEGORIES + [NOT_APPLICABLE]
+# Phrases (bigrams) are stronger evidence than single words
+_BIGRAM_WEIGHT = 2.0
+_WORD_PATTERN = r"[a-z0-9+#.]*[a-z0-9+#]"
+
+
+def _phrase_tokens(phrase):
+    words = re.findall(_WORD_PATTERN, phrase.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _specific_tokens(aliases):
+    """
+    {label: tokens that are evidence for that class alone}. A token counts when it
+    belongs to one class only and is a whole alias ("pytorch", "computer vision")
+    or a word pair of one ("neural networks"). Single words that only occur inside
+    longer aliases ("data", "systems", "learning", "computing") are too generic to
+    recognize a topic on their own.
+    """
+    class_tokens = {
+        label: {token for phrase in aliases[label] for token in _phrase_tokens(phrase)}
+        for label in _CLASSES
+    }
+    whole_aliases = {
+        " ".join(re.findall(_WORD_PATTERN, phrase.lower()))
+        for label in _CLASSES
+        for phrase in aliases[label]
+    }
+    specific = {}
+    for label, tokens in class_tokens.items():
+        others = set().union(*(class_tokens[other] for other in _CLASSES if other != label))
+        specific[label] = {
+            token for token in tokens - others if " " in token or token in whole_aliases
+        }
+    return specific
+
+
+class KeywordTopicClassifier:
+    """
+    CPU-only classifier mapping free-text topic lists to the three technical
+    areas used by the GPT-4 categorization prompt.
+
+    Topic lists are split into comma-separated items, and each item into words
+    and word bigrams. Only tokens specific to one class are evidence (see
+    _specific_tokens); generic words like "data" or "systems" are ignored. Each
+    item votes for the class its tokens score highest, and a row is labelled
+    with every category its items voted for. Every step runs as pandas/numpy
+    operations over the whole column.
+
+    The confidence of an item is its margin, (best - runner-up) / best score, and 0
+    when it has no specific token. The confidence of a row is the mean over its
+    items, so rows with unrecognized or ambiguous items fall below the threshold
+    and go to the LLM.
+    """
+
+    def __init__(self, aliases=CATEGORY_ALIASES):
+        class_tokens = _specific_tokens(aliases)
+        vocabulary = sorted(set().union(*class_tokens.values()))
+        self.token_ids = pd.Series(np.arange(len(vocabulary)), index=vocabulary)
+
+        weights = np.zeros((len(vocabulary), len(_CLASSES)))
+        for column, label in enumerate(_CLASSES):
+            rows = self.token_ids[sorted(class_tokens[label])].to_numpy()
+            weights[rows, column] = 1.0
+        bigram = np.array([" " in token for token in vocabulary])
+        self.weights = weights * np.where(bigram, _BIGRAM_WEIGHT, 1.0)[:, None]
+
+    def classify(self, topics):
+        """
+        Returns a DataFrame aligned with topics with the columns:
+            label (str) : e.g. "Machine Learning, Databases" or "N/A".
+            confidence (float) : Mean margin of the topic items' votes, in [0, 1].
+        """
+        topics = pd.Series(list(topics), dtype=object)
+        num_rows = len(topics)
+        empty = topics.map(is_trivially_empty).to_numpy(dtype=bool)
+
+        # one row per topic item
+        items = (
+            topics.fillna("")
+            .astype(str)
+            .str.lower()
+            .str.replace(r"[\[\]()\"']", " ", regex=True)
+            .str.split(r"[,;|\n]+|\s/\s")
+            .explode()
+            .str.strip()
+        )
+        items = items[items.fillna("").str.len() > 0]
+        item_rows = items.index.to_numpy()
+        items = items.reset_index(drop=True)
+
+        # one row per word, plus bigrams of consecutive words in the same item
+        words = items.str.findall(_WORD_PATTERN).explode().dropna()
+        next_words = words.groupby(level=0).shift(-1)
+        bigrams = (words + " " + next_words).dropna()
+        tokens = pd.concat([words, bigrams])
+
+        token_ids = self.token_ids.reindex(tokens.to_numpy()).to_numpy()
+        known = ~np.isnan(token_ids)
+        token_items = tokens.index.to_numpy()[known]
+        token_ids = token_ids[known].astype(int)
+
+        # each recognized item votes for its best scoring class, by its margin over the runner-up
+        item_scores = np.zeros((len(items), len(_CLASSES)))
+        np.add.at(item_scores, token_items, self.weights[token_ids])
+        recognized_items = np.unique(token_items)
+        item_votes = item_scores[recognized_items].argmax(axis=1)
+        ranked = np.sort(item_scores[recognized_items], axis=1)
+        margins = (ranked[:, -1] - ranked[:, -2]) / ranked[:, -1]
+
+        selected = np.zeros((num_rows, len(_CLASSES)), dtype=bool)
+        selected[item_rows[recognized_items], item_votes] = True
+        selected = selected[:, : len(CATEGORIES)]
+
+        items_per_row = np.bincount(item_rows, minlength=num_rows)
+        margin_per_row = np.bincount(
+            item_rows[recognized_items], weights=margins, minlength=num_rows
+        )
+        confidence = np.divide(
+            margin_per_row,
+            items_per_row,
+            out=np.zeros(num_rows),
+            where=items_per_row > 0,
+        )
+
+        category_names = np.array(CATEGORIES, dtype=object)
+        labels = [
+            ", ".join(category_names[row]) if row.any() else NOT_APPLICABLE
+            for row in selected
+        ]
+
+        labels = np.where(empty, NOT_APPLICABLE, np.array(labels, dtype=object))
+        confidence = np.where(empty, 1.0, confidence)
+        return pd.DataFrame({"label": labels, "confidence": confidence})
@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job TEXT PRIMARY KEY,
+    config TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    job TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    PRIMARY KEY (job, unit)
+);
+CREATE TABLE IF NOT EXISTS spend (
+    job TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    usd REAL NOT NULL DEFAULT 0,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job, stage)
+);
+"""
+
+
+class WorkQueue:
+    """
+    Durable queue of work units in a SQLite file, shared by worker processes on
+    one host or, through a shared filesystem, on several hosts.
+
+    A worker claims a unit with a lease and renews it while working. Units whose
+    lease expired (the worker crashed or its host went away) are handed out
+    again, up to max_attempts times. Every claim, renewal and completion is one
+    short transaction, so SQLite's file lock is the only coordination needed.
+
+    Arguments:
+        path (str) : SQLite file of the queue, created if needed.
+        lease_seconds (float) : How long a claimed unit belongs to its worker without a renewal.
+        max_attempts (int) : Claims after which a unit that keeps failing is given up.
+    """
+
+    def __init__(self, path, lease_seconds=600.0, max_attempts=3):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # the default rollback journal also works on network filesystems, unlike WAL
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.executescript(_SCHEMA)
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can never
+        # read the same pending unit and both claim it
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def plan(self, job, config, units):
+        """
+        Sets the units of a job, as (unit, payload) pairs in merge order.
+
+        Units that already exist with the same key keep their status, so re-planning
+        an interrupted job resumes it. Units that are no longer part of the job are removed.
+        """
+        connection = self._transaction()
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO jobs (job, config) VALUES (?, ?)", (job, json.dumps(config))
+            )
+            keys = [unit for unit, _ in units]
+            existing = {
+                row[0] for row in connection.execute("SELECT unit FROM units WHERE job = ?", (job,))
+            }
+            for unit in existing - set(keys):
+                connection.execute("DELETE FROM units WHERE job = ? AND unit = ?", (job, unit))
+            for position, (unit, payload) in enumerate(units):
+                if unit in existing:
+                    # units given up by an earlier run get a fresh set of attempts
+                    connection.execute(
+                        """
+                        UPDATE units SET position = ?, payload = ?,
+                            attempts = CASE WHEN status = 'failed' THEN 0 ELSE attempts END,
+                            status = CASE WHEN status = 'failed' THEN 'pending' ELSE status END
+                        WHERE job = ? AND unit = ?
+                        """,
+                        (position, json.dumps(payload), job, unit),
+                    )
+                else:
+                    connection.execute(
+                        "INSERT INTO units (job, unit, position, payload) VALUES (?, ?, ?, ?)",
+                        (job, unit, position, json.dumps(payload)),
+                    )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def config(self, job):
+        row = self.connection.execute("SELECT config FROM jobs WHERE job = ?", (job,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def _expire(self, connection, now):
+        # expired leases go back to pending, or are given up after max_attempts claims
+        connection.execute(
+            """
+            UPDATE units SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END,
+                             lease_expires = NULL, error = 'lease expired'
+            WHERE status = 'leased' AND lease_expires < ?
+            """,
+            (self.max_attempts, now),
+        )
+
+    def expire(self):
+        """Releases the units whose lease expired, so counts() shows them as pending or failed."""
+        connection = self._transaction()
+        try:
+            self._expire(connection, time.time())
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def claim(self, owner, skip_jobs=()):
+        """
+        Claims the first pending unit, or one whose lease expired, of a job not in
+        skip_jobs. Returns (job, unit, payload), or None if there is nothing to claim right now.
+        """
+        now = time.time()
+        connection = self._transaction()
+        try:
+            self._expire(connection, now)
+            skip_jobs = list(skip_jobs)
+            row = connection.execute(
+                f"""
+                SELECT job, unit, payload FROM units
+                WHERE status = 'pending' AND attempts < ?
+                  AND job NOT IN ({", ".join("?" * len(skip_jobs))})
+                ORDER BY job, position LIMIT 1
+                """,
+                (self.max_attempts, *skip_jobs),
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    """
+                    UPDATE units SET status = 'leased', owner = ?, lease_expires = ?,
+                                     attempts = attempts + 1
+                    WHERE job = ? AND unit = ?
+                    """,
+                    (owner, now + self.lease_seconds, row[0], row[1]),
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def _update_owned(self, job, unit, owner, assignments, values):
+        """Updates a unit only if owner still holds its lease. Returns False if the lease was lost."""
+        cursor = self.connection.execute(
+            f"UPDATE units SET {assignments} WHERE job = ? AND unit = ? AND owner = ? AND status = 'leased'",
+            (*values, job, unit, owner),
+        )
+        return cursor.rowcount == 1
+
+    def renew(self, job, unit, owner):
+        return self._update_owned(
+            job, unit, owner, "lease_expires = ?", (time.time() + self.lease_seconds,)
+        )
+
+    def complete(self, job, unit, owner):
+        return self._update_owned(
+            job, unit, owner, "status = 'done', lease_expires = NULL, error = NULL", ()
+        )
+
+    def fail(self, job, unit, owner, error):
+        """Releases a unit after an error; it is retried until max_attempts claims."""
+        return self._update_owned(
+            job,
+            unit,
+            owner,
+            "status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+            "lease_expires = NULL, error = ?",
+            (self.max_attempts, str(error)),
+        )
+
+    def release(self, owner, error):
+        """
+        Releases every unit still leased by owner, whose process is known to have
+        exited, as fail() does. Returns the number of units released.
+        """
+        cursor = self.connection.execute(
+            "UPDATE units SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+            "lease_expires = NULL, error = ? WHERE owner = ? AND status = 'leased'",
+            (self.max_attempts, str(error), owner),
+        )
+        return cursor.rowcount
+
+    def add_spend(self, job, spent):
+        """Adds the LLM spend of a unit ({stage: {"usd", "tokens"}}) to the job's total."""
+        connection = self._transaction()
+        try:
+            for stage, totals in spent.items():
+                connection.execute(
+                    """
+                    INSERT INTO spend (job, stage, usd, tokens) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (job, stage) DO UPDATE
+                    SET usd = usd + excluded.usd, tokens = tokens + excluded.tokens
+                    """,
+                    (job, stage, totals["usd"], totals["tokens"]),
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def spend(self, job):
+        """The LLM spend of all units of a job so far, as {stage: {"usd", "tokens"}}."""
+        rows = self.connection.execute("SELECT stage, usd, tokens FROM spend WHERE job = ?", (job,))
+        return {stage: {"usd": usd, "tokens": tokens} for stage, usd, tokens in rows}
+
+    def jobs(self):
+        return [row[0] for row in self.connection.execute("SELECT job FROM jobs ORDER BY job")]
+
+    def counts(self, job=None):
+        """Returns {status: number of units}, for one job or all jobs."""
+        query = "SELECT status, COUNT(*) FROM units"
+        params = ()
+        if job is not None:
+            query += " WHERE job = ?"
+            params = (job,)
+        return dict(self.connection.execute(query + " GROUP BY status", params).fetchall())
+
+    def units(self, job):
+        """Returns the (unit, status, error) of every unit of a job, in merge order."""
+        return self.connection.execute(
+            "SELECT unit, status, error FROM units WHERE job = ? ORDER BY position", (job,)
+        ).fetchall()
+
+    def clear(self, job):
+        """Removes a job once its results are merged."""
+        self.connection.execute("DELETE FROM units WHERE job = ?", (job,))
+        self.connection.execute("DELETE FROM spend WHERE job = ?", (job,))
+        self.connection.execute("DELETE FROM jobs WHERE job = ?", (job,))
+
+    def close(self):
+        self.connection.close()
@@ -1,44 +1,46 @@
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 from dotenv import load_dotenv
-import numpy as np
+import matplotlib
+# headless backend, also in the worker processes
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 plt.rcParams['font.family'] = 'sans-serif'
 plt.rcParams['font.sans-serif'] = 'DejaVu Sans Mono'
 
 from wordcloud import WordCloud
 
+from utils.costar import open_costar
+from utils.progressive import read_snapshot
+from utils.results_store import RESULTS_DIR, open_aggregates, read_results, repo_full_names
 
-if not load_dotenv():
-    print(
-        "Could not load .env file or it is empty. Please check if it exists and is readable."
-    )
-    exit(1)
 
-# REPO DETAILS
-repo_url = os.environ.get('REPO_URL')
-# Parse the repository URL to extract owner and repo name
-parts = repo_url.strip("/").split("/")
-repo_name = parts[-1]
+# Colors of the slices of the starred repos chart, most starred first
+STARRED_COLORS = ["#001219", "#005F73", "#0A9396", "#94D2BD", "#E9D8A6",
+                  "#EE9B00", "#CA6702", "#BB3E03", "#AE2012", "#9B2226"]
 
 
-def plot_pie_chart(data, title, output_path):
+def plot_pie_chart(data, title, output_path, colors=None):
 
     fig, ax = plt.subplots(figsize=(12, 8))
 
     # explode first slice if it is not Other
     explode = [0] * len(data)
-    if data.index.tolist()[0] != "Other":
+    if data.index[0] != "Other":
         explode[0] = 0.1
 
-    colors = ["#005F73", "#AE2012", "#EE9B00", "#94D2BD"]
-    colors_dict = {"Web development": colors[0], "Machine Learning": colors[1], "Databases": colors[2], "Other": colors[3]}
-    colors = [colors_dict[x[0]] for x in data.index.tolist()]
+    if colors is None:
+        colors = ["#005F73", "#AE2012", "#EE9B00", "#94D2BD"]
+        colors_dict = {"Web development": colors[0], "Machine Learning": colors[1], "Databases": colors[2], "Other": colors[3]}
+        colors = [colors_dict[x] for x in data.index]
     wedges, texts, autotexts = ax.pie(data, explode=explode, colors=colors, autopct=lambda pct: "{:.1f}%".format(pct),
                                     textprops=dict(color="w"), shadow=True, startangle=90)
 
-    labels = [x[0] for x in data.index.tolist()]
+    labels = data.index.tolist()
 
     # if "Other is in the list, it will be placed at the end of the pie chart
     if "Other" in labels:
@@ -73,74 +75,166 @@ def plot_pie_chart(data, title, output_path):
     ax.axis('equal')
     plt.tight_layout()
     fig.savefig(output_path, bbox_inches='tight')
+    plt.close(fig)
 
 
-def clean_topics_list(topics_list):
-    # each row is a string of topics with various formats
-    # extract the strings "Machine Learning", "Databases", and "Web Development" into a list
-    # return the list
-    output = []
-    for row in topics_list:
-        output_row = []
-        if pd.isna(row):
-            output_row.append("Other")
-            output.append(output_row)
-            continue
-        if "Machine Learning".lower() in row.lower():
-            output_row.append("Machine Learning")
-        if "Databases".lower() in row.lower():
-            output_row.append("Databases")
-        if "Web development".lower() in row.lower():
-            output_row.append("Web development")
-        if len(output_row) == 0:
-            output_row.append("Other")
-        output.append(output_row)
-
-    return output
-
-
-if __name__ == '__main__':
-
-    output_dir = "images"
-    os.makedirs(output_dir, exist_ok=True)
+def topic_frequencies(topics):
+    """Counts the topics of a list column, case-insensitively: {topic: users}."""
+    topics = topics.explode().dropna().str.strip().str.lower()
+    return topics[topics != ""].value_counts().to_dict()
 
-    # 1. Visualize gpt-35 interests insights in a Word Cloud
 
-    gpt35_insights_df = pd.read_csv(f"results/{repo_name}_insights_gpt35.csv", dtype=str)
+def category_counts(categories):
+    """Counts the topic categories of a list column; users without any count as Other."""
+    categories = categories.map(lambda values: list(values) if len(values) else ["Other"])
+    return categories.explode().value_counts()
 
-    all_topics = gpt35_insights_df[f"{repo_name}_stargazerinsights.topics_of_interest"].tolist()
-    all_topics = [x for x in all_topics if not pd.isna(x)]
 
-    all_topics = pd.DataFrame(all_topics, columns=['Topics'])
-    # Combine all topics into a single text
-    all_topics_text = ', '.join(all_topics['Topics'].tolist())
-
-    # Generate the word cloud
-    wordcloud = WordCloud(width=1920, height=1080, background_color='white').generate(all_topics_text)
-    # Display the word cloud
-    plt.figure(figsize=(12, 8))
+def plot_word_cloud(frequencies, title, output_path):
+    wordcloud = WordCloud(width=1920, height=1080, background_color='white').generate_from_frequencies(frequencies)
+    fig = plt.figure(figsize=(12, 8))
     plt.imshow(wordcloud, interpolation='bilinear')
-    plt.title(f"Word Cloud of {repo_name} user interests", fontsize=20, weight="bold", loc="center", y=1.05)
+    plt.title(title, fontsize=20, weight="bold", loc="center", y=1.05)
     # move title to the right
     plt.axis('off')
     plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, f"{repo_name}_topics_wordcloud.png"), dpi=300)
+    fig.savefig(output_path, dpi=300)
+    plt.close(fig)
+
+
+def render_repo(repo_name, frequencies, counts, starred, output_dir):
+    """Draws the word cloud, the topic pie chart and the starred repos chart of one repo. Runs in a worker process."""
+    outputs = []
+    if frequencies:
+        path = os.path.join(output_dir, f"{repo_name}_topics_wordcloud.png")
+        plot_word_cloud(frequencies, f"Word Cloud of {repo_name} user interests", path)
+        outputs.append(path)
+    if len(counts):
+        path = os.path.join(output_dir, f"{repo_name}_topics_pie_chart.png")
+        plot_pie_chart(data=counts,
+                       title=f"Topics of Interest Distribution for {repo_name} users",
+                       output_path=path)
+        outputs.append(path)
+    if len(starred):
+        path = os.path.join(output_dir, f"{repo_name}_starred_repos_pie_chart.png")
+        # owner/name -> name, as in the legend of the other charts
+        starred = pd.Series(starred.to_numpy(), index=[name.split("/")[-1] for name in starred.index])
+        plot_pie_chart(data=starred,
+                       title=f"Top-{len(starred)} Starred Repositories by {repo_name} users",
+                       output_path=path,
+                       colors=STARRED_COLORS[:len(starred)])
+        outputs.append(path)
+    return outputs
+
+
+def top_starred(counts, full_name, k=10):
+    """The k most starred repos of a repo's stargazers, without the repo itself (owner/name, if known)."""
+    return counts[counts.index != full_name].head(k)
+
+
+def render_repos(repo_names, output_dir, workers=None):
+    """
+    Renders the charts of the repos in a process pool. The counts come from the
+    aggregate index; repos written before the index existed are counted from
+    their results with vectorized pandas operations, and their starred repos
+    from the co-star matrix.
+    """
+    aggregates = open_aggregates()
+    indexed = set(aggregates.repos())
+    full_names = repo_full_names()
+    counted = {
+        repo: (
+            # a word cloud shows at most 200 words
+            aggregates.counts(repo, "topic", limit=200).to_dict(),
+            aggregates.counts(repo, "category"),
+            top_starred(aggregates.counts(repo, "starred_repo", limit=20), full_names.get(repo)),
+        )
+        for repo in repo_names
+        if repo in indexed
+    }
+    aggregates.close()
+
+    scanned = [repo for repo in repo_names if repo not in counted]
+    if scanned:
+        topics_df = read_results("insights_gpt35", repos=scanned, columns=["topics_of_interest", "repo"])
+        categories_df = read_results("insights_gpt4", repos=scanned, columns=["categories", "repo"])
+        topics_by_repo = {repo: group["topics_of_interest"] for repo, group in topics_df.groupby("repo", observed=True)}
+        categories_by_repo = {repo: group["categories"] for repo, group in categories_df.groupby("repo", observed=True)}
+        costar = open_costar() if os.path.isdir(os.path.join(RESULTS_DIR, "details")) else None
+        empty = pd.Series([], dtype=object)
+        for repo in scanned:
+            counted[repo] = (
+                topic_frequencies(topics_by_repo.get(repo, empty)),
+                category_counts(categories_by_repo.get(repo, empty)),
+                costar.top_costarred(repo, full_name=full_names.get(repo)) if costar and repo in costar.tracked_ids else pd.Series([], dtype="int64"),
+            )
+
+    jobs = [(repo, *counted[repo], output_dir) for repo in repo_names]
+    if not jobs:
+        return []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [path for paths in executor.map(render_repo, *zip(*jobs)) for path in paths]
+
+
+def list_repos():
+    """Repos with a partition in the insights datasets."""
+    repos = set()
+    for dataset in ["insights_gpt35", "insights_gpt4"]:
+        path = os.path.join(RESULTS_DIR, dataset)
+        if os.path.isdir(path):
+            repos.update(entry[len("repo="):] for entry in os.listdir(path) if entry.startswith("repo="))
+    return sorted(repos)
 
-    # 2. Visualize gpt-4 topic insights in a pie chart
 
-    insights_df = pd.read_csv(f"results/{repo_name}_insights_gpt4.csv", dtype=str)
-    topics_df = insights_df[f"{repo_name}_stargazerinsightsgpt4.response"].tolist()
-    topics_list = clean_topics_list(topics_df)
+if __name__ == '__main__':
 
-    all_topics = []
-    for topics in topics_list:
-        all_topics.extend(topics)
+    parser = argparse.ArgumentParser(description="Charts of the stargazer insights")
+    parser.add_argument("--repos", nargs="+", help="repo names to draw; default: the repo of REPO_URL")
+    parser.add_argument("--all", action="store_true", help="draw every repo in the results datasets")
+    parser.add_argument("--workers", type=int, help="rendering processes (default: one per core)")
+    parser.add_argument(
+        "--progressive",
+        action="store_true",
+        help="draw the topic category pie chart from the latest snapshot of a --progressive run",
+    )
+    args = parser.parse_args()
 
-    all_topics = pd.DataFrame(all_topics, columns=['Topics'])
+    output_dir = "images"
+    os.makedirs(output_dir, exist_ok=True)
 
-    # Count the occurrences of each topic
-    topic_counts = all_topics.value_counts()
-    plot_pie_chart(data=topic_counts,
-                   title=f"Topics of Interest Distribution for {repo_name} users",
-                   output_path=os.path.join(output_dir, f"{repo_name}_topics_pie_chart.png"))
-    print("Results saved to images folder.")
+    if args.all:
+        repo_names = list_repos()
+    elif args.repos:
+        repo_names = args.repos
+    else:
+        if not load_dotenv():
+            print(
+                "Could not load .env file or it is empty. Please check if it exists and is readable."
+            )
+            exit(1)
+
+        # REPO DETAILS
+        repo_url = os.environ.get('REPO_URL')
+        # Parse the repository URL to extract owner and repo name
+        parts = repo_url.strip("/").split("/")
+        repo_names = [parts[-1]]
+
+    if args.progressive:
+        for repo_name in repo_names:
+            snapshot = read_snapshot(repo_name)
+            if snapshot is None:
+                print(f"No progressive snapshot of {repo_name} yet.")
+                continue
+            categories = snapshot["distributions"]["categories"]
+            topic_counts = pd.Series(categories["counts"], dtype="int64").sort_values(ascending=False)
+            status = "final" if snapshot["final"] else f"{snapshot['processed']}/{snapshot['total']} users"
+            plot_pie_chart(data=topic_counts,
+                           title=f"Topics of Interest Distribution for {repo_name} users ({status})",
+                           output_path=os.path.join(output_dir, f"{repo_name}_topics_pie_chart_progressive.png"))
+        print("Progressive charts saved to images folder.")
+        exit(0)
+
+    start = time.perf_counter()
+    paths = render_repos(repo_names, output_dir, args.workers)
+    print(f"{len(paths)} charts of {len(repo_names)} repos saved to images folder "
+          f"in {time.perf_counter() - start:.1f}s.")